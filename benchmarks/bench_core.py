@@ -0,0 +1,242 @@
+"""Benchmarks sin interfaz de las funciones principales de hiragana.py
+
+Genera un historial de estudio artificial del tamaño indicado y mide el SRS, la
+priorización adaptativa, la construcción de la lista del quiz, las estadísticas,
+los logros y el guardado/carga del archivo de datos. Los resultados se escriben en
+JSON; con --compare se comparan con una ejecución anterior y se marcan las regresiones.
+
+    python benchmarks/bench_core.py --sizes 1000 10000 --output bench.json
+    python benchmarks/bench_core.py --sizes 1000 10000 --compare baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hiragana  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25  # Empeoramiento relativo del mejor tiempo que se considera regresión
+
+def make_study_data(size, seed=0):
+    """Crea categorías (y su mazo), historial de estudio, difíciles y datos de logros artificiales
+
+    Un 80% de los elementos tiene historial; de ellos, unos dos tercios tienen fecha de
+    repaso (la mitad ya vencida) y un 5% está marcado como difícil.
+    """
+    rng = random.Random(seed)
+    per_category = max(1, size // 10)
+    categories = {}
+    for c in range(10):
+        start = c * per_category
+        end = size if c == 9 else start + per_category
+        categories[f"Categoría {c + 1}"] = [(f"item{i}", f"r{i}") for i in range(start, end)]
+    deck = hiragana.Deck(categories)
+    now = datetime.now()
+    study_history = {}
+    for prompt in deck.prompts:
+        if rng.random() >= 0.8:
+            continue
+        shown = rng.randint(1, 40)
+        incorrect = rng.randint(0, shown // 2)
+        record = {
+            "times_shown": shown,
+            "correct": shown - incorrect,
+            "incorrect": incorrect,
+            "last_shown": (now - timedelta(days=rng.randint(0, 60))).isoformat(),
+        }
+        if rng.random() < 0.66:
+            record["srs_level"] = rng.randint(0, 6)
+            record["last_review"] = record["last_shown"]
+            record["next_review"] = (now + timedelta(days=rng.randint(-10, 10))).isoformat()
+        study_history[prompt] = record
+    difficult = {prompt for prompt in study_history if rng.random() < 0.05}
+    achievement_data = {
+        'sessions_completed': 50,
+        'perfect_quiz_count': 0,
+        'max_streak': 30,
+        'study_dates': [(now - timedelta(days=d)).date().isoformat() for d in range(0, 120, 2)],
+        'total_study_time': 200,
+        'category_stats': {},
+        'all_hiragana': list(deck.prompts),
+        'studied_chars': list(study_history),
+    }
+    return categories, deck, study_history, difficult, achievement_data
+
+def measure(func, repeat, setup=None):
+    """Ejecuta `func` `repeat` veces (tras una vuelta de calentamiento) y devuelve
+    mínimo, mediana y media en milisegundos
+
+    Como `timeit`, el recolector de basura se desactiva mientras se mide cada vuelta.
+    """
+    if setup is not None:
+        setup()
+    func()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            gc.enable()
+    return {
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "repeat": repeat,
+    }
+
+def run_size(size, repeat, seed=0):
+    """Mide todos los casos con un historial de `size` elementos"""
+    categories, deck, study_history, difficult, achievement_data = make_study_data(size, seed)
+    results = {}
+
+    scheduler = hiragana.SRSScheduler()
+    results["srs_get_due_cards"] = measure(lambda: scheduler.get_due_cards(study_history), repeat)
+
+    adaptive = hiragana.AdaptiveLearning()
+    pairs = [pair for pairs_list in categories.values() for pair in pairs_list]
+    results["adaptive_sort_by_priority"] = measure(lambda: adaptive.sort_by_priority(pairs, study_history), repeat)
+
+    def new_engine():
+        engine = hiragana.QuizEngine(hiragana_categories=categories)
+        engine.study_history = study_history
+        engine.difficult_characters = set(difficult)
+        return engine
+
+    def cold_pool():
+        engine = new_engine()
+        engine.srs_mode = True
+        engine.build_pool()
+    results["quiz_pool_cold"] = measure(cold_pool, repeat)
+
+    engine = new_engine()
+    engine.filters = {"due"}
+    engine.next_question()
+    results["quiz_next_question_filtered"] = measure(engine.next_question, repeat)
+
+    results["stats_aggregation"] = measure(
+        lambda: hiragana.compute_study_stats(study_history, categories, difficult), repeat)
+
+    stats = hiragana.compute_study_stats(study_history, categories, difficult)
+    achievement_data['category_stats'] = stats["categories"]
+    achievements = hiragana.create_achievements()
+
+    def reset_achievements():
+        for achievement in achievements:
+            achievement.unlocked = False
+
+    def evaluate_achievements():
+        for achievement in achievements:
+            achievement.check_condition(achievement_data)
+    results["achievements_evaluation"] = measure(evaluate_achievements, repeat, setup=reset_achievements)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        progress_file = hiragana.ProgressFile(os.path.join(tmp, "hiragana_data.json"))
+        engine = new_engine()
+        engine.achievement_data = achievement_data
+
+        def save():
+            progress_file.save(hiragana.serialize_progress(engine, achievements), adopt=False)
+
+        def load():
+            data = progress_file.load()
+            hiragana.apply_progress(hiragana.QuizEngine(hiragana_categories=categories),
+                                    hiragana.create_achievements(), data)
+
+        results["save_data"] = measure(save, repeat)
+        results["load_data"] = measure(load, repeat)
+        results["data_file_bytes"] = os.path.getsize(progress_file.file_path)
+
+    results["history_records"] = len(study_history)
+    return results
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, seed=0):
+    """Ejecuta la batería completa y devuelve el resultado serializable"""
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "app_version": hiragana.APP_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": getattr(hiragana.np, "__version__", None),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": {str(size): run_size(size, repeat, seed) for size in sizes},
+    }
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compara con una ejecución de referencia usando el mejor tiempo de cada caso
+
+    El mínimo es mucho menos sensible que la mediana a la carga de la máquina. Devuelve
+    filas (tamaño, caso, base_ms, actual_ms, proporción, regresión); hay regresión cuando
+    el tiempo crece más de `threshold` (0.25 = 25%).
+    """
+    rows = []
+    for size, cases in current["results"].items():
+        base_cases = baseline.get("results", {}).get(size)
+        if base_cases is None:
+            continue
+        for name, result in cases.items():
+            base = base_cases.get(name)
+            if not isinstance(result, dict) or not isinstance(base, dict):
+                continue
+            ratio = result["min_ms"] / base["min_ms"] if base["min_ms"] > 0 else 1.0
+            rows.append((size, name, base["min_ms"], result["min_ms"], ratio, ratio > 1 + threshold))
+    return rows
+
+def format_comparison(rows):
+    """Tabla de texto con la comparación"""
+    lines = [f"{'tamaño':>8}  {'caso':<30} {'base ms':>10} {'actual ms':>10} {'x':>6}"]
+    for size, name, base, current, ratio, regression in rows:
+        flag = "  REGRESIÓN" if regression else ""
+        lines.append(f"{size:>8}  {name:<30} {base:>10.3f} {current:>10.3f} {ratio:>6.2f}{flag}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de hiragana.py sin interfaz")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Tamaños del historial artificial")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Repeticiones por caso")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de los datos artificiales")
+    parser.add_argument("--output", default=None, help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--compare", metavar="BASELINE", default=None,
+                        help="Compara con los resultados guardados en BASELINE y falla si hay regresiones")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Empeoramiento relativo del mejor tiempo que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare_results(results, baseline, args.threshold)
+        print(format_comparison(rows))
+        return 1 if any(row[-1] for row in rows) else 0
+
+    if not args.output:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
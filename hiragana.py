@@ -5,33 +5,145 @@ Hiragana Trainer - Aplicación para aprender y practicar hiragana
 Versión mejorada con múltiples funcionalidades avanzadas
 """
 
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
 import random
+import math
 import json
 import os
+import sys
 import time
 import csv
 import logging
+import logging.handlers
+import queue
+import atexit
 from datetime import datetime, timedelta
 import threading
 import webbrowser
+import copy
+import gzip
+import hashlib
+import heapq
+import lzma
+import re
+import uuid
+import marshal
+import mmap
+import asyncio
+import argparse
+import signal
+import struct
+import functools
+from array import array
 from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Bloqueo de archivos entre procesos (no disponible en Windows)
+except ImportError:
+    fcntl = None
+
+try:
+    import numpy as np  # Opcional: lecturas vectorizadas del registro de repasos
+except ImportError:
+    np = None
+
+try:
+    import termios  # Lectura de teclas sueltas en la interfaz de terminal (no disponible en Windows)
+    import tty
+except ImportError:
+    termios = tty = None
+
+# Tkinter se importa al crear la interfaz gráfica (load_tk); los modos de línea de
+# comandos y la interfaz de terminal (--tui) no lo cargan
+tk = ttk = messagebox = filedialog = None
+
+def load_tk():
+    """Importa Tkinter bajo demanda y lo deja en los nombres globales tk, ttk, messagebox y filedialog"""
+    global tk, ttk, messagebox, filedialog
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as tkinter_ttk, messagebox as tkinter_messagebox, filedialog as tkinter_filedialog
+        tk, ttk, messagebox, filedialog = tkinter, tkinter_ttk, tkinter_messagebox, tkinter_filedialog
+    return tk
 
 # Constantes
 APP_VERSION = "2.0.0"
+SCHEMA_VERSION = 2  # Versión del formato del archivo de datos (los archivos sin ella son la 1)
 DATA_FILE = "hiragana_data.json"
 SESSION_HISTORY_FILE = "session_history.json"
 LOG_FILE = "hiragana_trainer.log"
+LOG_MAX_BYTES = 1024 * 1024  # Tamaño máximo del log antes de rotarlo
+LOG_BACKUP_COUNT = 3  # Archivos rotados que se conservan
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+SYNC_STATE_FILE = "hiragana_sync.json"
+REVIEW_LOG_FILE = "hiragana_reviews.bin"
+ERROR_DIALOG_INTERVAL = 30  # Segundos sin repetir el diálogo de un mismo error
+PERF_MAX_TIMERS = 64  # Nombres distintos que admite el registro de rendimiento
+PERF_BUCKETS = 32  # Cubetas del histograma: potencias de 2 en microsegundos (hasta ~35 min)
+FORECAST_DAYS = 30  # Días de la previsión de repasos de la pestaña de estadísticas
+RETENTION_REFRESH_DELAY_MS = 2000  # Espera tras el arranque antes de ajustar el modelo de retención
+# Opciones de "Repasar si el recuerdo baja de": umbral del SRS para el modelo de retención
+RETENTION_THRESHOLD_CHOICES = {"Desactivado": None, "70%": 0.7, "80%": 0.8, "90%": 0.9}
+
+# Campos del historial de un carácter que gestiona el SRS
+SRS_RECORD_FIELDS = ("srs_level", "next_review", "last_review")
+CONTENT_PACK_FORMAT = 1  # Incrementar si cambia la estructura del paquete compilado
+CONTENT_PACK_CACHE = "content_pack.cache"
 
-# Configuración de logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
+# Configuración de logging: los registros se encolan y un hilo los escribe en el archivo rotado,
+# así que registrar desde la interfaz no espera nunca a disco
 logger = logging.getLogger('HiraganaTrainer')
+_log_queue = queue.SimpleQueue()
+_log_handlers = []
+_log_listener = None
+
+def configure_logging(level="INFO", log_file=LOG_FILE):
+    """Envía el logging a un QueueHandler cuyo QueueListener escribe en un archivo con rotación"""
+    global _log_listener
+    root_logger = logging.getLogger()
+    if _log_listener is None:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        _log_handlers[:] = [file_handler]
+        root_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+        _log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+        _log_listener.start()
+        atexit.register(stop_logging)
+    set_log_level(level)
+
+def set_log_level(level):
+    """Cambia el nivel de logging (nombre como "INFO" o valor numérico)"""
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    logging.getLogger().setLevel(level)
+
+def stop_logging():
+    """Detiene el hilo de logging después de escribir los registros pendientes"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+def _restart_log_listener():
+    # Tras fork el hilo del listener no existe en el hijo y el archivo heredado puede haber quedado
+    # a medio escribir: el hijo abre el log de nuevo sin rotación (solo rota el proceso principal)
+    global _log_listener
+    if _log_listener is not None:
+        # Los registros pendientes heredados ya los escribe el proceso padre
+        while not _log_queue.empty():
+            _log_queue.get_nowait()
+        parent_handler = _log_handlers[0]
+        child_handler = logging.FileHandler(parent_handler.baseFilename, encoding='utf-8')
+        child_handler.setFormatter(parent_handler.formatter)
+        _log_handlers[:] = [child_handler]
+        _log_listener = logging.handlers.QueueListener(_log_queue, child_handler)
+        _log_listener.start()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_log_listener)
 
 # Clases de excepciones personalizadas
 class HiraganaTrainerError(Exception):
@@ -46,6 +158,591 @@ class QuizGenerationError(HiraganaTrainerError):
     """Error al generar preguntas de quiz"""
     pass
 
+# Datos predeterminados de hiragana (se usan si no existen los archivos de data/)
+# Hiragana categorizado
+DEFAULT_HIRAGANA_CATEGORIES = {
+    "Básicos": [
+        ("あ", "a"), ("い", "i"), ("う", "u"), ("え", "e"), ("お", "o"),
+        ("か", "ka"), ("き", "ki"), ("く", "ku"), ("け", "ke"), ("こ", "ko"),
+        ("さ", "sa"), ("し", "shi"), ("す", "su"), ("せ", "se"), ("そ", "so"),
+        ("た", "ta"), ("ち", "chi"), ("つ", "tsu"), ("て", "te"), ("と", "to"),
+        ("な", "na"), ("に", "ni"), ("ぬ", "nu"), ("ね", "ne"), ("の", "no"),
+        ("は", "ha"), ("ひ", "hi"), ("ふ", "fu"), ("へ", "he"), ("ほ", "ho"),
+        ("ま", "ma"), ("み", "mi"), ("む", "mu"), ("め", "me"), ("も", "mo"),
+        ("や", "ya"), ("ゆ", "yu"), ("よ", "yo"),
+        ("ら", "ra"), ("り", "ri"), ("る", "ru"), ("れ", "re"), ("ろ", "ro"),
+        ("わ", "wa"), ("を", "wo"), ("ん", "n")
+    ],
+    "Con dakuten": [
+        ("が", "ga"), ("ぎ", "gi"), ("ぐ", "gu"), ("げ", "ge"), ("ご", "go"),
+        ("ざ", "za"), ("じ", "ji"), ("ず", "zu"), ("ぜ", "ze"), ("ぞ", "zo"),
+        ("だ", "da"), ("ぢ", "ji"), ("づ", "zu"), ("で", "de"), ("ど", "do"),
+        ("ば", "ba"), ("び", "bi"), ("ぶ", "bu"), ("べ", "be"), ("ぼ", "bo"),
+        ("ぱ", "pa"), ("ぴ", "pi"), ("ぷ", "pu"), ("ぺ", "pe"), ("ぽ", "po")
+    ],
+    "Combinados (yōon)": [
+        ("きゃ", "kya"), ("きゅ", "kyu"), ("きょ", "kyo"),
+        ("しゃ", "sha"), ("しゅ", "shu"), ("しょ", "sho"),
+        ("ちゃ", "cha"), ("ちゅ", "chu"), ("ちょ", "cho"),
+        ("にゃ", "nya"), ("にゅ", "nyu"), ("にょ", "nyo"),
+        ("ひゃ", "hya"), ("ひゅ", "hyu"), ("ひょ", "hyo"),
+        ("みゃ", "mya"), ("みゅ", "myu"), ("みょ", "myo"),
+        ("りゃ", "rya"), ("りゅ", "ryu"), ("りょ", "ryo"),
+        ("ぎゃ", "gya"), ("ぎゅ", "gyu"), ("ぎょ", "gyo"),
+        ("じゃ", "ja"), ("じゅ", "ju"), ("じょ", "jo"),
+        ("びゃ", "bya"), ("びゅ", "byu"), ("びょ", "byo"),
+        ("ぴゃ", "pya"), ("ぴゅ", "pyu"), ("ぴょ", "pyo")
+    ]
+}
+
+# Palabras de ejemplo para cada hiragana (solo algunas como demostración)
+DEFAULT_EXAMPLE_WORDS = {
+    # Básicos - Vowels
+    "あ": ("あめ", "ame", "lluvia"),
+    "い": ("いぬ", "inu", "perro"),
+    "う": ("うみ", "umi", "mar"),
+    "え": ("えき", "eki", "estación"),
+    "お": ("おと", "oto", "sonido"),
+
+    # Básicos - K-row
+    "か": ("かばん", "kaban", "bolso"),
+    "き": ("きって", "kitte", "sello postal"),
+    "く": ("くつ", "kutsu", "zapatos"),
+    "け": ("けいたい", "keitai", "teléfono móvil"),
+    "こ": ("こども", "kodomo", "niño"),
+
+    # Básicos - S-row
+    "さ": ("さくら", "sakura", "cerezo"),
+    "し": ("しんぶん", "shinbun", "periódico"),
+    "す": ("すし", "sushi", "sushi"),
+    "せ": ("せんせい", "sensei", "profesor"),
+    "そ": ("そら", "sora", "cielo"),
+
+    # Básicos - T-row
+    "た": ("たべもの", "tabemono", "comida"),
+    "ち": ("ちず", "chizu", "mapa"),
+    "つ": ("つくえ", "tsukue", "escritorio"),
+    "て": ("てがみ", "tegami", "carta"),
+    "と": ("とけい", "tokei", "reloj"),
+
+    # Básicos - N-row
+    "な": ("なつ", "natsu", "verano"),
+    "に": ("にく", "niku", "carne"),
+    "ぬ": ("ぬま", "numa", "pantano"),
+    "ね": ("ねこ", "neko", "gato"),
+    "の": ("のみもの", "nomimono", "bebida"),
+
+    # Básicos - H-row
+    "は": ("はな", "hana", "flor"),
+    "ひ": ("ひと", "hito", "persona"),
+    "ふ": ("ふゆ", "fuyu", "invierno"),
+    "へ": ("へや", "heya", "habitación"),
+    "ほ": ("ほん", "hon", "libro"),
+
+    # Básicos - M-row
+    "ま": ("まど", "mado", "ventana"),
+    "み": ("みず", "mizu", "agua"),
+    "む": ("むし", "mushi", "insecto"),
+    "め": ("めがね", "megane", "gafas"),
+    "も": ("もり", "mori", "bosque"),
+
+    # Básicos - Y-row
+    "や": ("やま", "yama", "montaña"),
+    "ゆ": ("ゆき", "yuki", "nieve"),
+    "よ": ("よる", "yoru", "noche"),
+
+    # Básicos - R-row
+    "ら": ("らいねん", "rainen", "próximo año"),
+    "り": ("りんご", "ringo", "manzana"),
+    "る": ("るす", "rusu", "ausencia"),
+    "れ": ("れいぞうこ", "reizouko", "refrigerador"),
+    "ろ": ("ろうそく", "rousoku", "vela"),
+
+    # Básicos - W-row and N
+    "わ": ("わたし", "watashi", "yo"),
+    "を": ("ほんをよむ", "hon wo yomu", "leer un libro"),
+    "ん": ("でんわ", "denwa", "teléfono"),
+
+    # Con dakuten - G-row
+    "が": ("がっこう", "gakkou", "escuela"),
+    "ぎ": ("ぎんこう", "ginkou", "banco"),
+    "ぐ": ("ぐんて", "gunte", "guantes"),
+    "げ": ("げんき", "genki", "energía"),
+    "ご": ("ごはん", "gohan", "arroz"),
+
+    # Con dakuten - Z-row
+    "ざ": ("ざっし", "zasshi", "revista"),
+    "じ": ("じかん", "jikan", "tiempo"),
+    "ず": ("みずうみ", "mizuumi", "lago"),
+    "ぜ": ("ぜんぶ", "zenbu", "todo"),
+    "ぞ": ("ぞう", "zou", "elefante"),
+
+    # Con dakuten - D-row
+    "だ": ("だいがく", "daigaku", "universidad"),
+    "ぢ": ("はなぢ", "hanaji", "sangrado nasal"),
+    "づ": ("みづから", "mizukara", "por uno mismo"),
+    "で": ("でんしゃ", "densha", "tren"),
+    "ど": ("どあ", "doa", "puerta"),
+
+    # Con dakuten - B-row
+    "ば": ("ばす", "basu", "autobús"),
+    "び": ("びょういん", "byouin", "hospital"),
+    "ぶ": ("ぶたにく", "butaniku", "carne de cerdo"),
+    "べ": ("べんきょう", "benkyou", "estudio"),
+    "ぼ": ("ぼうし", "boushi", "sombrero"),
+
+    # Con dakuten - P-row (handakuten)
+    "ぱ": ("ぱん", "pan", "pan"),
+    "ぴ": ("ぴかぴか", "pikapika", "brillante"),
+    "ぷ": ("プール", "puuru", "piscina"),
+    "ぺ": ("ペン", "pen", "bolígrafo"),
+    "ぽ": ("ぽけっと", "poketto", "bolsillo"),
+
+    # Combinados (yōon) - KY
+    "きゃ": ("きゃく", "kyaku", "invitado"),
+    "きゅ": ("きゅうり", "kyuuri", "pepino"),
+    "きょ": ("きょうと", "kyouto", "Kioto"),
+
+    # Combinados (yōon) - SH
+    "しゃ": ("しゃしん", "shashin", "fotografía"),
+    "しゅ": ("しゅみ", "shumi", "afición"),
+    "しょ": ("しょうゆ", "shouyu", "salsa de soja"),
+
+    # Combinados (yōon) - CH
+    "ちゃ": ("おちゃ", "ocha", "té verde"),
+    "ちゅ": ("ちゅうい", "chuui", "atención"),
+    "ちょ": ("ちょうちょ", "choucho", "mariposa"),
+
+    # Combinados (yōon) - NY
+    "にゃ": ("にゃんこ", "nyanko", "gatito"),
+    "にゅ": ("にゅうがく", "nyuugaku", "ingreso escolar"),
+    "にょ": ("にょうぼう", "nyoubou", "esposa"),
+
+    # Combinados (yōon) - HY
+    "ひゃ": ("ひゃく", "hyaku", "cien"),
+    "ひゅ": ("ひゅうが", "hyuuga", "Hyuga (nombre)"),
+    "ひょ": ("ひょう", "hyou", "leopardo"),
+
+    # Combinados (yōon) - MY
+    "みゃ": ("みゃく", "myaku", "pulso"),
+    "みゅ": ("みゅーじっく", "myuujikku", "música"),
+    "みょ": ("みょうじ", "myouji", "apellido"),
+
+    # Combinados (yōon) - RY
+    "りゃ": ("りゃくご", "ryakugo", "abreviación"),
+    "りゅ": ("りゅうがく", "ryuugaku", "estudiar en el extranjero"),
+    "りょ": ("りょうり", "ryouri", "cocina"),
+
+    # Combinados (yōon) - GY
+    "ぎゃ": ("ぎゃくてん", "gyakuten", "revés, giro"),
+    "ぎゅ": ("ぎゅうにく", "gyuuniku", "carne de vaca"),
+    "ぎょ": ("ぎょうざ", "gyouza", "empanadilla china"),
+
+    # Combinados (yōon) - J
+    "じゃ": ("じゃがいも", "jagaimo", "patata"),
+    "じゅ": ("じゅぎょう", "jugyou", "clase"),
+    "じょ": ("じょうず", "jouzu", "habilidoso"),
+
+    # Combinados (yōon) - BY
+    "びゃ": ("びゃくや", "byakuya", "noche blanca"),
+    "びゅ": ("びゅうびゅう", "byuubyuu", "silbido del viento"),
+    "びょ": ("びょうき", "byouki", "enfermedad"),
+
+    # Combinados (yōon) - PY
+    "ぴゃ": ("ぴゃのぴゃの", "pyanopyano", "débilmente"),
+    "ぴゅ": ("ぴゅあ", "pyua", "puro"),
+    "ぴょ": ("ぴょんぴょん", "pyonpyon", "saltar repetidamente"),
+}
+
+def validate_hiragana_content(hiragana_categories, example_words):
+    """Valida la estructura de categorías y ejemplos; lanza DataLoadError si no es válida"""
+    problems = []
+    if not isinstance(hiragana_categories, dict) or not hiragana_categories:
+        raise DataLoadError("hiragana.json debe ser un objeto con al menos una categoría")
+    if not isinstance(example_words, dict):
+        raise DataLoadError("examples.json debe ser un objeto")
+    
+    for category, pairs in hiragana_categories.items():
+        if not isinstance(pairs, list) or not pairs:
+            problems.append(f"categoría '{category}': se esperaba una lista de pares no vacía")
+            continue
+        for i, pair in enumerate(pairs):
+            if (not isinstance(pair, (list, tuple)) or len(pair) != 2
+                    or not all(isinstance(v, str) and v.strip() for v in pair)):
+                problems.append(f"categoría '{category}', par {i}: se esperaba [hiragana, romaji]")
+    
+    for kana, example in example_words.items():
+        if (not isinstance(example, (list, tuple)) or len(example) != 3
+                or not all(isinstance(v, str) for v in example)):
+            problems.append(f"ejemplo '{kana}': se esperaba [palabra, romaji, significado]")
+    
+    if problems:
+        shown = "; ".join(problems[:10])
+        more = f" (y {len(problems) - 10} más)" if len(problems) > 10 else ""
+        raise DataLoadError(f"Contenido no válido: {shown}{more}")
+
+def compile_content_pack(hiragana_categories, example_words):
+    """Valida el contenido y construye los índices derivados
+    
+    El paquete resultante solo contiene tipos básicos (dict, list, tuple, str) para
+    que pueda serializarse con marshal.
+    """
+    validate_hiragana_content(hiragana_categories, example_words)
+    
+    categories = {}
+    kana_to_romaji = {}
+    romaji_to_kana = {}
+    category_members = {}
+    all_kana = []
+    for category, pairs in hiragana_categories.items():
+        categories[category] = [(kana, romaji) for kana, romaji in pairs]
+        for kana, romaji in pairs:
+            # En caso de duplicados se conserva la primera aparición, como en la búsqueda lineal
+            if kana not in kana_to_romaji:
+                kana_to_romaji[kana] = romaji
+                all_kana.append(kana)
+            romaji_to_kana.setdefault(romaji, kana)
+            members = category_members.setdefault(kana, [])
+            if category not in members:
+                members.append(category)
+    
+    examples = {kana: tuple(example) for kana, example in example_words.items()}
+    orphans = [kana for kana in examples if kana not in kana_to_romaji]
+    if orphans:
+        logger.warning(f"Ejemplos sin carácter en ninguna categoría: {', '.join(orphans[:10])}")
+    
+    return {
+        "categories": categories,
+        "examples": examples,
+        "kana_to_romaji": kana_to_romaji,
+        "romaji_to_kana": romaji_to_kana,
+        "category_members": category_members,
+        "all_kana": all_kana,
+    }
+
+class ContentPack:
+    """Contenido de estudio compilado: categorías, ejemplos e índices de búsqueda"""
+    
+    def __init__(self, pack, source="predeterminado"):
+        self.hiragana_categories = pack["categories"]
+        self.example_words = pack["examples"]
+        self.kana_to_romaji = pack["kana_to_romaji"]
+        self.romaji_to_kana = pack["romaji_to_kana"]
+        self.category_members = pack["category_members"]
+        self.all_kana = pack["all_kana"]
+        self.source = source
+    
+    def categories_of(self, kana):
+        """Devuelve las categorías a las que pertenece un carácter"""
+        return self.category_members.get(kana, [])
+    
+    def example_for(self, kana):
+        """Devuelve (palabra, romaji, significado) para un carácter, o None"""
+        return self.example_words.get(kana)
+
+def _content_source_key(file_path, with_hash):
+    """Clave de un archivo fuente: tiempo de modificación, tamaño y, opcionalmente, SHA-256"""
+    stat = os.stat(file_path)
+    key = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    if with_hash:
+        with open(file_path, 'rb') as f:
+            key["sha256"] = hashlib.sha256(f.read()).hexdigest()
+    return key
+
+def _read_content_cache(cache_path, source_files):
+    """Lee el paquete compilado si sigue correspondiendo a los archivos fuente
+    
+    Si coinciden mtime y tamaño no se vuelve a leer ninguna fuente; si solo cambió
+    el mtime (copia, `touch`) se comprueba el hash antes de descartar la caché.
+    """
+    try:
+        # Una sola lectura: marshal.load sobre el archivo lee por fragmentos y es mucho más lento
+        with open(cache_path, 'rb') as f:
+            cached = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (not isinstance(cached, dict) or cached.get("format") != CONTENT_PACK_FORMAT
+            or cached.get("marshal_version") != marshal.version):
+        return None
+    
+    keys = cached.get("sources", {})
+    for file_path in source_files:
+        key = keys.get(os.path.basename(file_path))
+        if not key:
+            return None
+        current = _content_source_key(file_path, with_hash=False)
+        if current["mtime_ns"] == key["mtime_ns"] and current["size"] == key["size"]:
+            continue
+        if current["size"] != key["size"]:
+            return None
+        if _content_source_key(file_path, with_hash=True)["sha256"] != key["sha256"]:
+            return None
+    return cached["pack"]
+
+def load_content_pack(data_dir="data", use_cache=True):
+    """Carga el contenido compilado desde la caché o compila data/hiragana.json y examples.json
+    
+    Si los archivos no existen o no son válidos se usa el contenido predeterminado.
+    """
+    hiragana_file = os.path.join(data_dir, "hiragana.json")
+    examples_file = os.path.join(data_dir, "examples.json")
+    cache_path = os.path.join(data_dir, CONTENT_PACK_CACHE)
+    
+    try:
+        if os.path.exists(hiragana_file) and os.path.exists(examples_file):
+            sources = (hiragana_file, examples_file)
+            if use_cache:
+                pack = _read_content_cache(cache_path, sources)
+                if pack is not None:
+                    return ContentPack(pack, source=cache_path)
+            
+            # Calcular las claves antes de leer para no asociar una versión más nueva a la caché
+            keys = {os.path.basename(path): _content_source_key(path, with_hash=True) for path in sources}
+            with open(hiragana_file, 'r', encoding='utf-8') as f:
+                hiragana_categories = json.load(f)
+            with open(examples_file, 'r', encoding='utf-8') as f:
+                example_words = json.load(f)
+            pack = compile_content_pack(hiragana_categories, example_words)
+            
+            if use_cache:
+                try:
+                    payload = marshal.dumps({"format": CONTENT_PACK_FORMAT,
+                                             "marshal_version": marshal.version,
+                                             "sources": keys, "pack": pack})
+                    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(payload)
+                    os.replace(tmp_path, cache_path)
+                except OSError as e:
+                    logger.warning(f"No se pudo escribir la caché de contenido: {e}")
+            return ContentPack(pack, source=data_dir)
+    except Exception as e:
+        logger.error(f"Error al cargar archivos de datos: {e}")
+    
+    # Si no se pudieron cargar, usar los datos predeterminados
+    return ContentPack(compile_content_pack(DEFAULT_HIRAGANA_CATEGORIES, DEFAULT_EXAMPLE_WORDS))
+
+def load_hiragana_content(data_dir="data"):
+    """Carga las categorías de hiragana y los ejemplos desde archivos JSON o usa los predeterminados"""
+    pack = load_content_pack(data_dir)
+    return pack.hiragana_categories, pack.example_words
+
+# Bits activos de cada valor de byte (para recorrer bitsets sin desplazar el entero completo)
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+_BYTE_COUNTS = bytes(len(bits) for bits in _BYTE_BITS)
+
+class ItemSet:
+    """Conjunto de ids de un mazo representado como bitset sobre un entero de Python
+    
+    Las combinaciones (&, |, -) operan sobre el entero completo y el recorrido o el
+    sorteo de elementos se hace sobre sus bytes, sin construir listas intermedias.
+    """
+    
+    __slots__ = ("bits", "size", "_count", "_ids")
+    
+    def __init__(self, bits=0, size=0):
+        self.bits = bits
+        self.size = size
+        self._count = None
+        self._ids = None  # Ids en orden, solo para conjuntos dispersos desde los que se sortea
+    
+    @classmethod
+    def from_ids(cls, ids, size):
+        """Crea el conjunto a partir de un iterable de ids"""
+        flags = bytearray((size + 7) >> 3)
+        for item_id in ids:
+            flags[item_id >> 3] |= 1 << (item_id & 7)
+        return cls(int.from_bytes(flags, 'little'), size)
+    
+    @classmethod
+    def full(cls, size):
+        """Conjunto con todos los ids de un mazo de `size` elementos"""
+        return cls((1 << size) - 1, size)
+    
+    def __and__(self, other):
+        return ItemSet(self.bits & other.bits, max(self.size, other.size))
+    
+    def __or__(self, other):
+        return ItemSet(self.bits | other.bits, max(self.size, other.size))
+    
+    def __sub__(self, other):
+        return ItemSet(self.bits & ~other.bits, self.size)
+    
+    def __len__(self):
+        if self._count is None:
+            self._count = bin(self.bits).count("1")
+        return self._count
+    
+    def __bool__(self):
+        return self.bits != 0
+    
+    def __contains__(self, item_id):
+        return item_id >= 0 and (self.bits >> item_id) & 1 == 1
+    
+    def _bytes(self):
+        return self.bits.to_bytes((self.size + 7) >> 3, 'little')
+    
+    def __iter__(self):
+        """Recorre los ids en orden ascendente"""
+        for index, byte in enumerate(self._bytes()):
+            if byte:
+                base = index << 3
+                for bit in _BYTE_BITS[byte]:
+                    yield base + bit
+    
+    def nth(self, position):
+        """Devuelve el id que ocupa la posición indicada (en orden ascendente)"""
+        if not 0 <= position < len(self):
+            raise IndexError("posición fuera del conjunto")
+        data = self._bytes()
+        seen = 0
+        for index, count in enumerate(data.translate(_BYTE_COUNTS)):
+            if seen + count > position:
+                return (index << 3) + _BYTE_BITS[data[index]][position - seen]
+            seen += count
+        raise IndexError("posición fuera del conjunto")
+    
+    def choice(self):
+        """Elige un id al azar con probabilidad uniforme"""
+        count = len(self)
+        if not count:
+            raise IndexError("el conjunto está vacío")
+        # Con densidad suficiente basta con sortear ids y comprobar el bit
+        if count * 8 >= self.size:
+            for _ in range(32):
+                item_id = random.randrange(self.size)
+                if (self.bits >> item_id) & 1:
+                    return item_id
+        # Conjunto disperso: guardar sus ids (como mucho size / 8) para sorteos repetidos
+        if self._ids is None:
+            self._ids = array('i', self)
+        return self._ids[random.randrange(count)]
+
+# Clase para el mazo de estudio con identificadores enteros
+class Deck:
+    """Mazo de elementos (pregunta, respuesta) con identificadores enteros e índices
+    
+    Cada par distinto recibe un id en el orden de las categorías. Cada categoría se
+    guarda como bitset (`ItemSet`) y las búsquedas por hiragana o romaji usan
+    diccionarios, de modo que seleccionar y sortear preguntas no depende del tamaño
+    del mazo.
+    """
+    
+    # Por debajo de este tamaño las opciones se eligen sobre la lista completa
+    SMALL_POOL = 64
+    
+    def __init__(self, hiragana_categories):
+        self.prompts = []  # id -> hiragana (o elemento a estudiar)
+        self.answers = []  # id -> romaji (o lectura)
+        self.pair_index = {}  # (hiragana, romaji) -> id
+        self.prompt_ids = {}  # hiragana -> ids
+        self.answer_ids = {}  # romaji -> ids
+        self.category_bits = {}  # categoría -> ItemSet
+        self._selections = {}
+        
+        category_ids = {}
+        for category, pairs in hiragana_categories.items():
+            ids = []
+            for prompt, answer in pairs:
+                item_id = self.pair_index.get((prompt, answer))
+                if item_id is None:
+                    item_id = len(self.prompts)
+                    self.pair_index[(prompt, answer)] = item_id
+                    self.prompts.append(prompt)
+                    self.answers.append(answer)
+                    self.prompt_ids.setdefault(prompt, []).append(item_id)
+                    self.answer_ids.setdefault(answer, []).append(item_id)
+                ids.append(item_id)
+            category_ids[category] = ids
+        for category, ids in category_ids.items():
+            self.category_bits[category] = ItemSet.from_ids(ids, len(self.prompts))
+    
+    @classmethod
+    def synthetic(cls, size, categories=10):
+        """Crea un mazo artificial de `size` elementos repartidos en varias categorías"""
+        per_category = max(1, size // categories)
+        hiragana_categories = {}
+        for c in range(categories):
+            start = c * per_category
+            end = size if c == categories - 1 else start + per_category
+            hiragana_categories[f"Categoría {c + 1}"] = [(f"item{i}", f"r{i}") for i in range(start, end)]
+        return cls(hiragana_categories)
+    
+    def __len__(self):
+        return len(self.prompts)
+    
+    def pair(self, item_id, reverse=False):
+        """Devuelve (pregunta, respuesta) de un elemento; invertido para romaji -> hiragana"""
+        if reverse:
+            return self.answers[item_id], self.prompts[item_id]
+        return self.prompts[item_id], self.answers[item_id]
+    
+    def empty(self):
+        """Conjunto vacío del tamaño del mazo"""
+        return ItemSet(0, len(self.prompts))
+    
+    def all_items(self):
+        """Conjunto con todos los elementos del mazo"""
+        return ItemSet.full(len(self.prompts))
+    
+    def select(self, categories=None):
+        """Unión de las categorías indicadas (todas si es None); se guarda por selección"""
+        key = None if categories is None else frozenset(categories)
+        items = self._selections.get(key)
+        if items is None:
+            items = self.empty()
+            for name, bits in self.category_bits.items():
+                if key is None or name in key:
+                    items = items | bits
+            self._selections[key] = items
+        return items
+    
+    def items_for(self, values, reverse=False):
+        """Elementos cuyo hiragana (o romaji, si `reverse`) está en `values`"""
+        index = self.answer_ids if reverse else self.prompt_ids
+        return ItemSet.from_ids((item_id for value in values for item_id in index.get(value, ())),
+                                len(self.prompts))
+    
+    def pairs(self, items, reverse=False):
+        """Genera los pares (pregunta, respuesta) de un conjunto de elementos"""
+        for item_id in items:
+            yield self.pair(item_id, reverse)
+    
+    def prompt_for_answer(self, answer):
+        """Devuelve el hiragana correspondiente a un romaji (primera aparición)"""
+        ids = self.answer_ids.get(answer)
+        return self.prompts[ids[0]] if ids else None
+    
+    def sample_distractors(self, items, answer, reverse=False, count=3):
+        """Elige `count` respuestas incorrectas al azar entre los elementos de `items`
+        
+        Con selecciones grandes se sortean elementos del bitset sin construir la lista
+        de respuestas; con selecciones pequeñas se usa la lista completa.
+        """
+        values = self.prompts if reverse else self.answers
+        if len(items) > self.SMALL_POOL:
+            # Se descartan valores repetidos, no solo ids: ぢ/じ comparten "ji" y no
+            # deben aparecer dos botones iguales
+            seen = {answer}
+            options = []
+            for _ in range(count * 20):
+                value = values[items.choice()]
+                if value not in seen:
+                    seen.add(value)
+                    options.append(value)
+                    if len(options) == count:
+                        return options
+        
+        # Selección pequeña (o casi todas las respuestas iguales): usar la lista completa
+        incorrect = list(dict.fromkeys(values[item_id] for item_id in items if values[item_id] != answer))
+        if len(incorrect) >= count:
+            return random.sample(incorrect, count)
+        # Si no hay suficientes opciones, duplicar algunas
+        options = list(incorrect)
+        while len(options) < count:
+            options.append(random.choice(incorrect) if incorrect else answer)
+        return options
+
 # Clase para el sistema de repetición espaciada (SRS)
 class SRSScheduler:
     """Sistema de Repetición Espaciada para optimizar el aprendizaje"""
@@ -53,6 +750,11 @@ class SRSScheduler:
     def __init__(self):
         # Intervalos en días para las repeticiones (similar a Anki)
         self.intervals = [1, 3, 7, 14, 30, 90, 180]
+        self.clock = datetime.now  # Reloj sustituible (p. ej. por el simulador de estudiantes)
+        # Con un RetentionModel y un umbral, también vencen los caracteres cuya probabilidad
+        # estimada de recordar ha bajado de `retention_threshold`
+        self.retention_model = None
+        self.retention_threshold = None
     
     def calculate_next_review(self, char_data, correct):
         """Calcula la próxima fecha de repaso basada en el rendimiento"""
@@ -67,14 +769,16 @@ class SRSScheduler:
             char_data["srs_level"] = 0
             
         days = self.intervals[char_data["srs_level"]]
-        next_review = datetime.now() + timedelta(days=days)
+        now = self.clock()
+        next_review = now + timedelta(days=days)
         char_data["next_review"] = next_review.isoformat()
+        char_data["last_review"] = now.isoformat()
         
         return next_review
     
     def get_due_cards(self, study_history):
         """Retorna los caracteres que deben repasarse hoy"""
-        today = datetime.now()
+        today = self.clock()
         due_chars = []
         
         for char, data in study_history.items():
@@ -84,9 +788,114 @@ class SRSScheduler:
                 next_review = datetime.fromisoformat(data["next_review"])
                 if next_review <= today:
                     due_chars.append(char)
+        
+        if self.retention_model is not None and self.retention_threshold:
+            due = set(due_chars)
+            due_chars.extend(char for char in self.retention_model.items_below(self.retention_threshold, at=today)
+                             if char in study_history and char not in due)
                     
         return due_chars
 
+    def forecast(self, study_history, days=FORECAST_DAYS, simulate_lapses=False, lapse_rate=None,
+                 retention_model=None):
+        """Previsión de la carga de repasos de los próximos `days` días
+        
+        Agrupa el `next_review` de todo el historial en recuentos por día de una sola
+        pasada (histograma de NumPy sobre días; sin NumPy, un bucle equivalente). El día 0
+        incluye los repasos vencidos y los caracteres sin fecha, igual que get_due_cards.
+        
+        Con `simulate_lapses` también calcula, en valor esperado, los fallos de cada día y
+        los repasos que generan: un fallo vuelve al primer intervalo y un acierto pasa al
+        siguiente, así que los repasos de reprogramación dentro del periodo se suman. La
+        probabilidad de fallo es `lapse_rate` (por defecto 1 - SRS_TARGET_RETENTION) o,
+        para el primer repaso de cada carácter, la que estima `retention_model` para su
+        fecha. Devuelve un diccionario con `start` (fecha del día 0), `due` (recuentos
+        programados) y, si se simula, `expected` (repasos esperados) y `lapses`.
+        """
+        start = self.clock().date()
+        days = max(1, int(days))
+        lapse_rate = 1 - SRS_TARGET_RETENTION if lapse_rate is None else lapse_rate
+        records = study_history.values()
+        dates = [record.get("next_review") or "" for record in records]
+        levels = [record.get("srs_level", 0) for record in records] if simulate_lapses else ()
+        
+        if np is None:
+            due = [0] * days
+            for value in dates:
+                offset = (datetime.fromisoformat(value).date() - start).days if value else 0
+                if offset < days:
+                    due[max(offset, 0)] += 1
+            result = {"start": start, "due": due}
+            if simulate_lapses:
+                pending = [[0.0] * len(self.intervals) for _ in range(days)]
+                for value, level in zip(dates, levels):
+                    offset = (datetime.fromisoformat(value).date() - start).days if value else 0
+                    if offset < days:
+                        pending[max(offset, 0)][min(level, len(self.intervals) - 1)] += 1
+                expected, lapses = self._propagate_lapses(pending, [[lapse_rate] * len(self.intervals)] * days,
+                                                          lapse_rate)
+                result.update(expected=expected, lapses=lapses)
+            return result
+        
+        # Las fechas sin valor se marcan como NaT y cuentan como vencidas
+        moments = np.array(dates, dtype="datetime64[us]")
+        offsets = (moments.astype("datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+        offsets = np.where(np.isnat(moments), 0, np.maximum(offsets, 0))
+        in_window = offsets < days
+        due = np.bincount(offsets[in_window], minlength=days)
+        result = {"start": start, "due": due.tolist()}
+        if simulate_lapses:
+            max_level = len(self.intervals) - 1
+            level_index = np.minimum(np.asarray(levels, dtype=np.int64), max_level)[in_window]
+            offsets = offsets[in_window]
+            fail = np.full(len(offsets), float(lapse_rate))
+            if retention_model is not None and len(offsets):
+                # Las fechas son locales sin zona: se pasan a segundos epoch restando el desfase UTC
+                now = self.clock()
+                utc_offset = (now.astimezone().utcoffset() or timedelta(0)).total_seconds()
+                moments = np.where(np.isnat(moments), np.datetime64(now, "us"), moments)[in_window]
+                recall = retention_model.recall_probability([char for char, keep in zip(study_history, in_window) if keep],
+                                                            at=moments.astype(np.int64) / 1e6 - utc_offset)
+                fail = np.where(np.isnan(recall), fail, 1 - recall)
+            pending = np.zeros((days, max_level + 1))
+            failing = np.zeros((days, max_level + 1))
+            np.add.at(pending, (offsets, level_index), 1.0)
+            np.add.at(failing, (offsets, level_index), fail)
+            # Probabilidad media de fallo de cada casilla (día, nivel) programada
+            rates = np.where(pending > 0, failing / np.maximum(pending, 1e-12), lapse_rate)
+            expected, lapses = self._propagate_lapses(pending.tolist(), rates.tolist(), lapse_rate)
+            result.update(expected=expected, lapses=lapses)
+        return result
+    
+    def _propagate_lapses(self, pending, rates, lapse_rate):
+        """Propaga en valor esperado los repasos de `pending[día][nivel]` dentro del periodo
+        
+        `rates[día][nivel]` es la probabilidad de fallo de los repasos ya programados; los
+        que se generan durante la previsión usan `lapse_rate`. El bucle recorre días y
+        niveles, no caracteres.
+        """
+        days, max_level = len(pending), len(self.intervals) - 1
+        generated = [[0.0] * (max_level + 1) for _ in range(days)]
+        expected, lapses = [], []
+        for day in range(days):
+            total = failed = 0.0
+            for level in range(max_level + 1):
+                scheduled, extra = pending[day][level], generated[day][level]
+                failures = scheduled * rates[day][level] + extra * lapse_rate
+                count = scheduled + extra
+                total += count
+                failed += failures
+                retry = day + self.intervals[0]
+                if retry < days:
+                    generated[retry][0] += failures
+                next_level = min(level + 1, max_level)
+                forward = day + self.intervals[next_level]
+                if forward < days:
+                    generated[forward][next_level] += count - failures
+            expected.append(round(total, 2))
+            lapses.append(round(failed, 2))
+        return expected, lapses
+
 # Clase para algoritmo de aprendizaje adaptativo
 class AdaptiveLearning:
     """Algoritmo para priorizar caracteres según dificultad y otros factores"""
@@ -94,7 +903,24 @@ class AdaptiveLearning:
     def __init__(self):
         self.difficulty_weight = 2.0  # Peso para caracteres difíciles
         self.recency_weight = 1.5     # Peso para caracteres no vistos recientemente
-        self.frequency_weight = 1.0   # Peso para frecuencia de uso en japonés
+        self.frequency_weight = 0.0   # Peso para caracteres poco practicados (lo ajusta --optimize)
+        self.latency_weight = 0.0     # Peso para caracteres que se responden con lentitud (opcional)
+        self.clock = datetime.now
+        self.review_stats = {}        # Agregados por carácter del registro de repasos
+        self._review_stats_size = None
+    
+    def load_review_stats(self, review_log, days=90, min_new=50):
+        """Agrega el registro de repasos de los últimos `days` días para usar la latencia
+        
+        Solo se recalcula cuando el registro ha crecido al menos `min_new` eventos.
+        """
+        size = len(review_log)
+        if self._review_stats_size is not None and 0 <= size - self._review_stats_size < min_new:
+            return self.review_stats
+        since = (self.clock() - timedelta(days=days)).timestamp()
+        self.review_stats = review_log.item_stats(since)
+        self._review_stats_size = size
+        return self.review_stats
     
     def calculate_priority(self, character, history):
         """Calcula la prioridad de un carácter para ser mostrado"""
@@ -114,12 +940,21 @@ class AdaptiveLearning:
         # Factor de recencia - más tiempo sin ver = mayor prioridad
         if "last_shown" in char_data:
             last_shown = datetime.fromisoformat(char_data["last_shown"])
-            days_since = (datetime.now() - last_shown).days
+            days_since = (self.clock() - last_shown).days
             recency_factor = min(days_since / 7, 1.0) * self.recency_weight
         else:
             recency_factor = self.recency_weight
+        
+        # Factor de frecuencia - menos veces mostrado = mayor prioridad
+        frequency_factor = self.frequency_weight / (1 + char_data.get("times_shown", 0))
+        
+        # Factor de latencia - respuestas lentas (hasta 5 s) = mayor prioridad
+        latency_factor = 0
+        review = self.review_stats.get(character)
+        if review is not None:
+            latency_factor = min(review["mean_latency_ms"] / 5000, 1.0) * self.latency_weight
             
-        return difficulty_factor + recency_factor
+        return difficulty_factor + recency_factor + frequency_factor + latency_factor
     
     def sort_by_priority(self, characters, history):
         """Ordena caracteres por prioridad para optimizar el aprendizaje"""
@@ -234,56 +1069,3294 @@ def create_achievements():
         )
     ]
 
-# Funciones auxiliares para verificar logros
-def check_category_mastery(data, category, threshold):
-    """Verifica si se ha dominado una categoría"""
-    if 'category_stats' not in data:
-        return False
+# Funciones auxiliares para verificar logros
+def check_category_mastery(data, category, threshold):
+    """Verifica si se ha dominado una categoría"""
+    if 'category_stats' not in data:
+        return False
+    
+    if category not in data['category_stats']:
+        return False
+    
+    stats = data['category_stats'][category]
+    return stats.get('accuracy', 0) >= threshold
+
+def check_consecutive_days(data, days_required):
+    """Verifica si se ha estudiado durante días consecutivos"""
+    if 'study_dates' not in data or len(data['study_dates']) < days_required:
+        return False
+    
+    # Convertir fechas de texto a objetos datetime
+    study_dates = [datetime.fromisoformat(date) for date in data['study_dates']]
+    study_dates.sort()
+    
+    # Verificar secuencia consecutiva
+    max_consecutive = 1
+    current_consecutive = 1
+    
+    for i in range(1, len(study_dates)):
+        date_diff = (study_dates[i].date() - study_dates[i-1].date()).days
+        
+        if date_diff == 1:
+            current_consecutive += 1
+            max_consecutive = max(max_consecutive, current_consecutive)
+        elif date_diff > 1:
+            current_consecutive = 1
+    
+    return max_consecutive >= days_required
+
+def check_all_chars_studied(data):
+    """Verifica si se han estudiado todos los caracteres hiragana"""
+    if 'all_hiragana' not in data or 'studied_chars' not in data:
+        return False
+    
+    all_hiragana = set(data['all_hiragana'])
+    studied_chars = set(data['studied_chars'])
+    
+    return all_hiragana.issubset(studied_chars)
+
+# Transliteración romaji -> hiragana (modo de escritura romaji -> hiragana)
+KANA_ROWS = {  # Consonante -> kana de a, i, u, e, o
+    "": "あいうえお", "k": "かきくけこ", "s": "さしすせそ", "t": "たちつてと", "n": "なにぬねの",
+    "h": "はひふへほ", "m": "まみむめも", "r": "らりるれろ", "g": "がぎぐげご", "z": "ざじずぜぞ",
+    "d": "だぢづでど", "b": "ばびぶべぼ", "p": "ぱぴぷぺぽ",
+}
+
+def build_romaji_table():
+    """Tabla romaji -> kana con Hepburn, Kunrei/Nihon-shiki y las variantes habituales de los IME
+    
+    Incluye si/shi, tu/tsu, ti/chi, hu/fu, zi/ji, di/du, sya/sha, tya/cha/cya, zya/ja/jya,
+    ye, va/vi/vu/ve/vo, kana pequeños con x/l, nn y n' para ん y "-" para ー. Las consonantes
+    dobles, la n ante consonante y la n de "nn" ante vocal las resuelve RomajiTransliterator.
+    """
+    vowels = "aiueo"
+    rows = KANA_ROWS
+    table = {}
+    for consonant, kana in rows.items():
+        for vowel, char in zip(vowels, kana):
+            table[consonant + vowel] = char
+    table.update({
+        "ya": "や", "yu": "ゆ", "yo": "よ", "ye": "いぇ", "wa": "わ", "wo": "を", "wi": "うぃ", "we": "うぇ",
+        "shi": "し", "chi": "ち", "tsu": "つ", "fu": "ふ", "ji": "じ",
+        "va": "ゔぁ", "vi": "ゔぃ", "vu": "ゔ", "ve": "ゔぇ", "vo": "ゔぉ",
+        "nn": "ん", "n'": "ん", "xn": "ん", "-": "ー",
+    })
+    
+    # Yōon: consonante + y (sya, tya, zya y dya son Kunrei/Nihon-shiki)
+    small_y = dict(zip("auo", "ゃゅょ"))
+    for consonant in "kstnhmrgzdbp":
+        for vowel, small in small_y.items():
+            table[consonant + "y" + vowel] = rows[consonant][1] + small
+    # Hepburn (sha, cha, ja) y variantes de IME (jya, cya)
+    for prefix, kana in (("sh", "し"), ("ch", "ち"), ("cy", "ち"), ("j", "じ"), ("jy", "じ")):
+        for vowel, small in small_y.items():
+            table[prefix + vowel] = kana + small
+        table[prefix + "e"] = kana + "ぇ"
+    for vowel, small in zip("aieo", "ぁぃぇぉ"):
+        table["f" + vowel] = "ふ" + small
+    
+    # Kana pequeños: xa/la, xya/lya, xtu/ltsu...
+    for prefix in "xl":
+        for vowel, small in zip(vowels, "ぁぃぅぇぉ"):
+            table[prefix + vowel] = small
+        for vowel, small in small_y.items():
+            table[prefix + "y" + vowel] = small
+        table.update({prefix + "tu": "っ", prefix + "tsu": "っ", prefix + "wa": "ゎ"})
+    return table
+
+class RomajiTransliterator:
+    """Autómata finito sobre un trie de romaji que convierte texto a hiragana en O(longitud)
+    
+    Cada nodo del trie es un diccionario letra -> nodo; la clave "" guarda el kana de la
+    secuencia que termina en él. Al leer una letra que no continúa el prefijo pendiente:
+    una consonante repetida (kk, tt, tch...) produce っ, una n pendiente produce ん y
+    cualquier otro prefijo sin salida se deja tal cual. Como en los IME, "nn" produce ん
+    y la segunda n todavía puede empezar sílaba ("konnichiha" -> こんにちは, "onna" ->
+    おんな); si no la empieza se descarta ("kannji" -> かんじ, "konnnichiha" -> こんにちは).
+    Los caracteres que no son romaji
+    (kana ya convertidos, espacios) pasan sin cambios, así que la conversión se puede
+    repetir sobre el texto de un campo en cada pulsación.
+    """
+    
+    SOKUON_CONSONANTS = frozenset("bcdfghjkmprstvwyz")
+    
+    def __init__(self, table=None):
+        self.root = {}
+        for romaji, kana in (table or build_romaji_table()).items():
+            node = self.root
+            for letter in romaji:
+                node = node.setdefault(letter, {})
+            node[""] = kana
+    
+    def convert(self, text, final=True):
+        """Convierte `text` a hiragana
+        
+        Con final=False el prefijo pendiente del final se devuelve en romaji (para seguir
+        escribiendo); con final=True una n final se convierte en ん.
+        """
+        output = []
+        node, pending = self.root, ""
+        spent_n = False  # La n pendiente es la segunda de un "nn" ya escrito como ん
+        for letter in text.lower():
+            while True:
+                if pending == "n" and letter == "n":
+                    if spent_n:
+                        # "nnn": la nueva n queda pendiente en lugar de la ya escrita
+                        spent_n = False
+                    else:
+                        output.append("ん")
+                        spent_n = True
+                    break
+                child = node.get(letter)
+                if child is not None:
+                    if "" in child and len(child) == 1:
+                        # Hoja: la secuencia está completa
+                        output.append(child[""])
+                        node, pending = self.root, ""
+                    else:
+                        node, pending = child, pending + letter
+                    spent_n = False
+                    break
+                if spent_n:
+                    # La segunda n de "nn" no empieza sílaba: se descarta
+                    node, pending, spent_n = self.root, "", False
+                    continue
+                if not pending:
+                    output.append(letter)
+                    break
+                if len(pending) == 1 and pending in self.SOKUON_CONSONANTS and letter in (pending, "c"):
+                    # Consonante doble (o "tch" de Hepburn): っ y la segunda consonante sigue pendiente
+                    if letter == pending or pending == "t":
+                        output.append("っ")
+                        node, pending = self.root[letter], letter
+                        break
+                if pending == "n":
+                    output.append("ん")
+                elif "" in node:
+                    output.append(node[""])
+                else:
+                    output.append(pending)
+                # La letra actual se vuelve a procesar desde la raíz
+                node, pending = self.root, ""
+        if spent_n:
+            if not final:
+                # Se deja "nn" en romaji: la letra siguiente decide si la n empieza sílaba
+                output[-1] = "nn"
+        elif pending:
+            if final and pending == "n":
+                output.append("ん")
+            else:
+                output.append(node.get("", pending) if final else pending)
+        return "".join(output)
+
+ROMAJI_TRANSLITERATOR = RomajiTransliterator()
+
+def romaji_to_kana(text, final=True):
+    """Convierte romaji a hiragana con el transliterador compartido (ver RomajiTransliterator)"""
+    return ROMAJI_TRANSLITERATOR.convert(text, final)
+
+# Matriz de confusión (qué carácter se responde en lugar de cuál)
+CONFUSION_DISTRACTORS = 2  # Opciones de opción múltiple tomadas de las confusiones del carácter
+CONFUSION_DRILL_PAIRS = 6  # Parejas de la práctica de pares confundidos
+
+class ConfusionStore:
+    """Matriz de confusión dispersa: veces que se respondió `chosen` cuando era `expected`
+    
+    Los caracteres se internan como enteros (tabla `items`) y solo se guardan las celdas
+    no nulas, en un diccionario por fila: anotar un error es O(1) y las consultas de
+    una fila no recorren el historial. Se guarda en el archivo de progreso como
+    {"items": [...], "cells": [[fila, columna, veces], ...]}.
+    """
+    
+    def __init__(self):
+        self.items = []   # id -> carácter
+        self.index = {}   # carácter -> id
+        self.rows = {}    # id esperado -> {id elegido: veces}
+    
+    def _id(self, char):
+        item_id = self.index.get(char)
+        if item_id is None:
+            item_id = self.index[char] = len(self.items)
+            self.items.append(char)
+        return item_id
+    
+    def __len__(self):
+        return sum(len(row) for row in self.rows.values())
+    
+    def record(self, expected, chosen, count=1):
+        """Anota que se respondió `chosen` cuando la respuesta era `expected`"""
+        row = self.rows.setdefault(self._id(expected), {})
+        chosen_id = self._id(chosen)
+        row[chosen_id] = row.get(chosen_id, 0) + count
+    
+    def count(self, expected, chosen):
+        """Veces que se confundió `expected` con `chosen`"""
+        expected_id, chosen_id = self.index.get(expected), self.index.get(chosen)
+        if expected_id is None or chosen_id is None:
+            return 0
+        return self.rows.get(expected_id, {}).get(chosen_id, 0)
+    
+    def confused_with(self, expected, k=3):
+        """Los `k` caracteres que más se han respondido en lugar de `expected`: [(carácter, veces)]"""
+        row = self.rows.get(self.index.get(expected), {})
+        best = heapq.nlargest(k, row.items(), key=lambda entry: entry[1])
+        return [(self.items[chosen_id], count) for chosen_id, count in best]
+    
+    def top_pairs(self, k=CONFUSION_DRILL_PAIRS):
+        """Las `k` parejas (sin orden) más confundidas: [(a, b, veces en ambos sentidos)]"""
+        totals = defaultdict(int)
+        for expected_id, row in self.rows.items():
+            for chosen_id, count in row.items():
+                totals[(min(expected_id, chosen_id), max(expected_id, chosen_id))] += count
+        best = heapq.nlargest(k, totals.items(), key=lambda entry: entry[1])
+        return [(self.items[a], self.items[b], count) for (a, b), count in best]
+    
+    def matrix(self, chars=None, size=12):
+        """Submatriz densa para dibujar: (caracteres, filas de recuentos)
+        
+        Por defecto usa los `size` caracteres que más aparecen en confusiones.
+        """
+        if chars is None:
+            involvement = defaultdict(int)
+            for expected_id, row in self.rows.items():
+                for chosen_id, count in row.items():
+                    involvement[expected_id] += count
+                    involvement[chosen_id] += count
+            ids = [item_id for item_id, _ in heapq.nlargest(size, involvement.items(), key=lambda e: e[1])]
+            chars = [self.items[item_id] for item_id in ids]
+        ids = [self.index.get(char) for char in chars]
+        rows = [[self.rows.get(expected_id, {}).get(chosen_id, 0) if expected_id is not None and chosen_id is not None
+                 else 0 for chosen_id in ids] for expected_id in ids]
+        return chars, rows
+    
+    def to_dict(self):
+        """Forma serializable (ids enteros compactos)"""
+        return {
+            "items": list(self.items),
+            "cells": [[expected_id, chosen_id, count]
+                      for expected_id, row in self.rows.items() for chosen_id, count in row.items()],
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye la matriz de to_dict; ignora celdas no válidas"""
+        store = cls()
+        items = (data or {}).get("items", [])
+        for expected_id, chosen_id, count in (data or {}).get("cells", []):
+            if 0 <= expected_id < len(items) and 0 <= chosen_id < len(items) and count > 0:
+                store.record(items[expected_id], items[chosen_id], count)
+        return store
+
+def merge_confusions(base, local, disk):
+    """Fusión a tres bandas de matrices de confusión serializadas (se suman los incrementos locales)"""
+    merged = ConfusionStore.from_dict(disk)
+    base_store = ConfusionStore.from_dict(base)
+    local_store = ConfusionStore.from_dict(local)
+    for expected_id, row in local_store.rows.items():
+        expected = local_store.items[expected_id]
+        for chosen_id, count in row.items():
+            chosen = local_store.items[chosen_id]
+            delta = count - base_store.count(expected, chosen)
+            if delta:
+                merged.record(expected, chosen, delta)
+    return merged.to_dict()
+
+# Romanizaciones aceptadas en el modo hiragana -> romaji
+ROMANIZATION_SYSTEMS = ("hepburn", "kunrei", "nihon")
+# Sílabas que se escriben distinto según el sistema: (Hepburn, Kunrei, Nihon-shiki)
+ROMANIZATION_SPELLINGS = {
+    "し": ("shi", "si", "si"), "ち": ("chi", "ti", "ti"), "つ": ("tsu", "tu", "tu"),
+    "ふ": ("fu", "hu", "hu"), "じ": ("ji", "zi", "zi"), "ぢ": ("ji", "zi", "di"),
+    "づ": ("zu", "zu", "du"), "を": ("wo", "o", "wo"),
+}
+ROMANIZATION_NAMES = {"hepburn": "Hepburn", "kunrei": "Kunrei", "nihon": "Nihon-shiki", "item": "respuesta del mazo"}
+# Opciones de la configuración "Romanización aceptada"
+ROMANIZATION_CHOICES = {
+    "Todas": ROMANIZATION_SYSTEMS,
+    "Hepburn y Kunrei": ("hepburn", "kunrei"),
+    "Solo Hepburn": ("hepburn",),
+}
+_SMALL_Y_VOWELS = {"ゃ": "a", "ゅ": "u", "ょ": "o"}
+
+def _build_kana_romaji():
+    # Romaji básico (el mismo en los tres sistemas) de cada kana
+    table = {}
+    for consonant, kana in KANA_ROWS.items():
+        for vowel, char in zip("aiueo", kana):
+            table[char] = consonant + vowel
+    table.update({"や": "ya", "ゆ": "yu", "よ": "yo", "わ": "wa", "を": "wo", "ん": "n", "ー": "-"})
+    return table
+
+KANA_ROMAJI = _build_kana_romaji()
+
+def romanize_kana(kana, system="hepburn"):
+    """Romaniza una palabra en hiragana con el sistema indicado; None si tiene caracteres desconocidos
+    
+    Trata los yōon (きゃ -> kya, しゃ -> sha/sya), el sokuon (っ dobla la consonante
+    siguiente; "tch" en Hepburn) y la n' de Hepburn ante vocal o y.
+    """
+    column = ROMANIZATION_SYSTEMS.index(system)
+    syllables = []
+    i = 0
+    while i < len(kana):
+        char = kana[i]
+        romaji = ROMANIZATION_SPELLINGS[char][column] if char in ROMANIZATION_SPELLINGS else KANA_ROMAJI.get(char)
+        if char == "っ":
+            romaji = "っ"
+        elif romaji is None:
+            return None
+        if i + 1 < len(kana) and kana[i + 1] in _SMALL_Y_VOWELS and romaji.endswith("i") and len(romaji) > 1:
+            vowel = _SMALL_Y_VOWELS[kana[i + 1]]
+            stem = romaji[:-1]
+            romaji = stem + vowel if stem in ("sh", "ch", "j") else stem + "y" + vowel
+            i += 1
+        syllables.append(romaji)
+        i += 1
+    
+    parts = []
+    for index, romaji in enumerate(syllables):
+        following = syllables[index + 1] if index + 1 < len(syllables) else ""
+        if romaji == "っ":
+            if not following or following[0] in "aiueon-":
+                return None
+            romaji = "t" if system == "hepburn" and following.startswith("ch") else following[0]
+        elif romaji == "n" and system == "hepburn" and following[:1] in ("a", "i", "u", "e", "o", "y"):
+            romaji = "n'"
+        parts.append(romaji)
+    return "".join(parts)
+
+class AnswerMatcher:
+    """Autómatas de respuestas aceptadas en romaji para cada elemento (hiragana -> romaji)
+    
+    Para cada par (kana, respuesta del mazo) se compila una vez un trie con la respuesta
+    del mazo y la romanización de cada sistema; las hojas guardan qué sistemas producen
+    esa escritura. Comprobar una respuesta recorre el trie en O(longitud) y devuelve la
+    variante reconocida: el primer sistema activo que la produce o "item" si solo coincide
+    con la respuesta del mazo.
+    """
+    
+    def __init__(self):
+        self._automata = {}
+    
+    def compile(self, kana, answer):
+        """Trie de las escrituras aceptadas de `kana` (en caché)"""
+        key = (kana, answer)
+        root = self._automata.get(key)
+        if root is None:
+            variants = defaultdict(list)
+            variants[answer.lower()].append("item")
+            for system in ROMANIZATION_SYSTEMS:
+                romaji = romanize_kana(kana, system)
+                if romaji:
+                    variants[romaji].append(system)
+                    if "'" in romaji:
+                        variants[romaji.replace("'", "")].append(system)
+            root = {}
+            for romaji, systems in variants.items():
+                node = root
+                for letter in romaji:
+                    node = node.setdefault(letter, {})
+                node[""] = tuple(systems)
+            self._automata[key] = root
+        return root
+    
+    def match(self, kana, answer, user_answer, systems=ROMANIZATION_SYSTEMS):
+        """Variante con la que `user_answer` es correcta ("hepburn", "kunrei", "nihon" o
+        "item") o None si no se acepta con los sistemas `systems`
+        """
+        node = self.compile(kana, answer)
+        for letter in user_answer:
+            node = node.get(letter)
+            if node is None:
+                return None
+        matched = node.get("")
+        if not matched:
+            return None
+        for system in ROMANIZATION_SYSTEMS:
+            if system in matched and system in systems:
+                return system
+        return "item" if "item" in matched else None
+
+def format_romanization_counts(counts):
+    """Resumen legible de `romanization_counts` ("Hepburn 80% · Kunrei 20%"); None sin datos"""
+    total = sum(counts.values())
+    if not total:
+        return None
+    ordered = sorted(counts.items(), key=lambda entry: -entry[1])
+    return " · ".join(f"{ROMANIZATION_NAMES.get(variant, variant)} {count / total * 100:.0f}%"
+                      for variant, count in ordered)
+
+# Motor de quiz independiente de la interfaz gráfica
+class QuizEngine:
+    """Lógica de preguntas, corrección y progreso del quiz sin dependencias de Tkinter"""
+
+    # Conjuntos dinámicos que pueden combinarse con las categorías mediante `filters`
+    DYNAMIC_SETS = ("difficult", "due", "never_seen", "confused")
+    # Valores admitidos de la configuración del quiz
+    MODES = ("write", "multiple")
+    DIRECTIONS = ("hira_to_rom", "rom_to_hira")
+    ALGORITHMS = ("Estándar", "SRS Básico", "SRS Avanzado", "Personalizado")
+
+    def __init__(self, hiragana_categories=None, srs_scheduler=None, adaptive_learning=None):
+        self.hiragana_categories = hiragana_categories or {}
+        self.srs_scheduler = srs_scheduler or SRSScheduler()
+        self.adaptive_learning = adaptive_learning or AdaptiveLearning()
+
+        # Estado de aprendizaje persistente
+        self.study_history = {}
+        self.difficult_characters = set()
+        self.achievement_data = {
+            'sessions_completed': 0,
+            'perfect_quiz_count': 0,
+            'max_streak': 0,
+            'study_dates': [],
+            'total_study_time': 0,  # en minutos
+            'category_stats': {},
+            'all_hiragana': [],
+            'studied_chars': []
+        }
+
+        # Configuración del quiz
+        self.mode = "write"  # write, multiple
+        self.direction = "hira_to_rom"  # hira_to_rom, rom_to_hira
+        self.difficult_only = False
+        self.srs_mode = False
+        self.algorithm = "Estándar"
+        self.selected_categories = None  # None = todas las categorías
+        self.filters = set()  # Conjuntos dinámicos que se combinan (AND) con la selección
+        self.romanization_systems = set(ROMANIZATION_SYSTEMS)  # Sistemas aceptados en hiragana -> romaji
+        self.confusions = ConfusionStore()  # Qué carácter se responde en lugar de cuál
+        self.answer_matcher = AnswerMatcher()
+
+        # Estado de la sesión de quiz
+        self.score = 0
+        self.total_attempts = 0
+        self.streak = 0
+        self.max_streak = 0
+        self.last_answer_correct = False
+        self.correct_answers_count = {}  # Respuestas correctas consecutivas de caracteres difíciles
+        self.current_quiz_question = None
+        self.current_quiz_answer = None
+        self.current_options = []
+        self.correct_option_index = 0
+        self.question_started_at = None  # time.monotonic() al mostrar la pregunta (latencia)
+
+        # Registro binario de repasos opcional (ReviewLog); None lo desactiva
+        self.review_log = None
+
+        # Caracteres del historial modificados desde la última sincronización; con None la
+        # siguiente sincronización recorre todo el historial (al cargar, importar...)
+        self.sync_changes = None
+
+        # Avisos generados al construir la lista de preguntas (los consume la interfaz)
+        self.notices = []
+
+        # Índices derivados (se reconstruyen cuando cambian los datos de origen)
+        self._deck = None
+        self._deck_source = None
+        self._due_cache = None  # (study_history, instante, caracteres pendientes)
+        self._due_items = None  # (mazo, dirección, ItemSet de pendientes)
+        self._difficult_items = None  # (mazo, copia de difficult_characters, ItemSet)
+        self._intersections = []  # Últimas intersecciones calculadas: (conjuntos, resultado)
+        self._seen_items = None  # (mazo, historial, tamaño, dirección, ItemSet de nunca vistos)
+        self._studied_lookup = None  # (lista studied_chars, conjunto equivalente)
+
+    @property
+    def deck(self):
+        """Mazo indexado de las categorías actuales (se reconstruye si cambian)"""
+        if self._deck is None or self._deck_source is not self.hiragana_categories:
+            self._deck = Deck(self.hiragana_categories)
+            self._deck_source = self.hiragana_categories
+        return self._deck
+
+    def build_pool(self):
+        """Construye la lista de pares (pregunta, respuesta) según la configuración actual"""
+        return list(self.deck.pairs(self._select_pool(), self.direction != "hira_to_rom"))
+
+    def _select_pool(self):
+        """Devuelve el conjunto de elementos disponibles y registra los avisos para la interfaz"""
+        self.notices = []
+
+        if self.difficult_only and not self.difficult_characters:
+            self.notices.append("no_difficult")
+            self.difficult_only = False
+
+        pool = self._collect_items()
+
+        # Si está activado el SRS, filtrar por caracteres a repasar
+        if self.srs_mode and pool:
+            if self._due_chars():
+                pool = self._intersect([pool, self.dynamic_set("due")])
+            if not pool:
+                self.notices.append("srs_empty")
+                self.srs_mode = False
+                pool = self._collect_items()
+
+        if not pool:
+            self.notices.append("empty")
+        return pool
+
+    def _collect_items(self):
+        """Elementos de las categorías activas (o de los difíciles), combinados con los filtros"""
+        if self.difficult_only:
+            sets = [self.dynamic_set("difficult")]
+        else:
+            sets = [self.deck.select(self.selected_categories)]
+        sets.extend(self.dynamic_set(name) for name in sorted(self.filters))
+        return self._intersect(sets)
+
+    def _intersect(self, sets):
+        """Intersección de varios bitsets; se reutiliza mientras no cambie ninguno de ellos
+        
+        Así el resultado conserva entre preguntas su índice de sorteo (ver ItemSet.choice).
+        """
+        if len(sets) == 1:
+            return sets[0]
+        for key, items in self._intersections:
+            if len(key) == len(sets) and all(a is b for a, b in zip(key, sets)):
+                return items
+        items = sets[0]
+        for other in sets[1:]:
+            items = items & other
+        self._intersections = [(tuple(sets), items)] + self._intersections[:3]
+        return items
+
+    def dynamic_set(self, name):
+        """Devuelve como bitset uno de los conjuntos dinámicos de DYNAMIC_SETS
+        
+        "difficult": caracteres marcados como difíciles; "due": pendientes de repaso
+        SRS; "never_seen": elementos que aún no aparecen en el historial; "confused":
+        caracteres de las parejas más confundidas.
+        """
+        deck = self.deck
+        # El historial se indexa por el texto de la pregunta (romaji en rom_to_hira)
+        reverse = self.direction != "hira_to_rom"
+        if name == "difficult":
+            cached = self._difficult_items
+            if cached is None or cached[0] is not deck or cached[1] != self.difficult_characters:
+                cached = (deck, frozenset(self.difficult_characters), deck.items_for(self.difficult_characters))
+                self._difficult_items = cached
+            return cached[2]
+        if name == "due":
+            due_chars = self._due_chars()
+            cached = self._due_items
+            if cached is None or cached[0] is not deck or cached[1] != reverse:
+                cached = (deck, reverse, deck.items_for(due_chars, reverse))
+                self._due_items = cached
+            return cached[2]
+        if name == "never_seen":
+            # Las entradas del historial solo se añaden, así que basta con comparar su tamaño
+            history = self.study_history
+            cached = self._seen_items
+            if (cached is None or cached[0] is not deck or cached[1] is not history
+                    or cached[2] != len(history) or cached[3] != reverse):
+                cached = (deck, history, len(history), reverse,
+                          deck.all_items() - deck.items_for(history, reverse))
+                self._seen_items = cached
+            return cached[4]
+        if name == "confused":
+            chars = {char for a, b, _ in self.confusions.top_pairs() for char in (a, b)}
+            return deck.items_for(chars)
+        raise ValueError(f"Conjunto desconocido: {name}")
+
+    def _due_chars(self):
+        """Caracteres pendientes de repaso; se recalculan como mucho una vez por minuto
+        
+        Al corregir una respuesta con SRS el carácter se quita del conjunto, así que la
+        caché solo evita volver a recorrer todo el historial en cada pregunta.
+        """
+        now = time.monotonic()
+        cached = self._due_cache
+        if cached is None or cached[0] is not self.study_history or now - cached[1] > 60:
+            cached = (self.study_history, now, set(self.srs_scheduler.get_due_cards(self.study_history)))
+            self._due_cache = cached
+            self._due_items = None
+        return cached[2]
+
+    def refresh_due(self):
+        """Descarta la caché de pendientes (tras añadir entradas al historial o cambiar la fecha)"""
+        self._due_cache = None
+        self._due_items = None
+
+    def next_question(self):
+        """Selecciona una nueva pregunta y devuelve un diccionario con su información"""
+        pool = self._select_pool()
+        if not pool:
+            raise QuizGenerationError("No hay caracteres disponibles con la configuración actual")
+
+        deck = self.deck
+        reverse = self.direction != "hira_to_rom"
+
+        # Elegir un carácter aleatorio o según prioridad
+        if self.algorithm == "SRS Avanzado":
+            if self.review_log is not None:
+                self.adaptive_learning.load_review_stats(self.review_log)
+            questions = deck.answers if reverse else deck.prompts
+            item_id = max(
+                pool, key=lambda i: self.adaptive_learning.calculate_priority(questions[i], self.study_history))
+        else:
+            item_id = pool.choice()
+        question, answer = deck.pair(item_id, reverse)
+
+        self.current_quiz_question = question
+        self.current_quiz_answer = answer
+        self.current_options = []
+        self.correct_option_index = 0
+        self.question_started_at = time.monotonic()
+
+        if self.mode == "multiple":
+            self.current_options = self._build_options(pool, answer)
+            self.correct_option_index = self.current_options.index(answer)
+
+        return {
+            "question": question,
+            "answer": answer,
+            "options": list(self.current_options),
+            "correct_index": self.correct_option_index
+        }
+
+    def _build_options(self, pool, answer):
+        """Genera cuatro opciones mezcladas que incluyen la respuesta correcta
+        
+        Hasta CONFUSION_DISTRACTORS opciones son los caracteres que más se han respondido
+        en lugar de este; el resto se sortea entre la selección.
+        """
+        reverse = self.direction != "hira_to_rom"
+        deck = self.deck
+        options = []
+        expected = self._hiragana_for_question(self.current_quiz_question)
+        for chosen, _ in self.confusions.confused_with(expected, CONFUSION_DISTRACTORS):
+            ids = deck.prompt_ids.get(chosen)
+            value = chosen if reverse else (deck.answers[ids[0]] if ids else None)
+            if value and value != answer and value not in options:
+                options.append(value)
+        sampled = deck.sample_distractors(pool, answer, reverse, count=3 + len(options))
+        for value in sampled:
+            if len(options) < 3 and value not in options:
+                options.append(value)
+        for value in sampled:
+            # Selecciones muy pequeñas: se repiten opciones, como sample_distractors
+            if len(options) < 3:
+                options.append(value)
+        options.append(answer)
+        random.shuffle(options)
+        return options
+    
+    def _chosen_item(self, user_answer):
+        """Carácter del mazo que corresponde a una respuesta (incorrecta); None si no es ninguno"""
+        kana = romaji_to_kana(user_answer) if self.direction == "hira_to_rom" else user_answer
+        return kana if kana in self.deck.prompt_ids else None
+    
+    def confused_pairs_drill(self, pairs=CONFUSION_DRILL_PAIRS, rounds=2):
+        """Lista de pares (hiragana, romaji) que alterna los caracteres de las parejas más confundidas
+        
+        Cada ronda recorre las parejas en orden (a1, b1, a2, b2...) y las rondas alternan
+        qué miembro va primero. Devuelve una lista vacía si aún no hay confusiones.
+        """
+        deck = self.deck
+        sequence = []
+        top = [(a, b) for a, b, _ in self.confusions.top_pairs(pairs)
+               if a in deck.prompt_ids and b in deck.prompt_ids]
+        for round_index in range(rounds):
+            for a, b in top:
+                first, second = (a, b) if round_index % 2 == 0 else (b, a)
+                sequence.append(deck.pair(deck.prompt_ids[first][0]))
+                sequence.append(deck.pair(deck.prompt_ids[second][0]))
+        return sequence
+
+    def grade(self, answer):
+        """Corrige una respuesta para la pregunta actual y actualiza el progreso"""
+        if self.current_quiz_question is None:
+            raise QuizGenerationError("No hay ninguna pregunta activa")
+
+        user_answer = str(answer).strip().lower()
+        if not user_answer:
+            raise ValueError("La respuesta está vacía")
+        if self.direction == "rom_to_hira":
+            # Las respuestas escritas en romaji se comparan ya convertidas a hiragana
+            user_answer = romaji_to_kana(user_answer)
+
+        current_char = self.current_quiz_question
+        correct_answer = self.current_quiz_answer.lower()
+        variant = None
+        if self.direction == "hira_to_rom":
+            # Cualquier romanización de los sistemas activos es correcta (si/shi, tu/tsu...)
+            variant = self.answer_matcher.match(current_char, correct_answer, user_answer,
+                                                self.romanization_systems)
+            is_correct = variant is not None
+            if variant is not None:
+                counts = self.achievement_data.setdefault('romanization_counts', {})
+                counts[variant] = counts.get(variant, 0) + 1
+        else:
+            # ぢ/じ y づ/ず comparten romaji: vale cualquier kana del mazo que se lea como la pregunta
+            is_correct = user_answer == correct_answer or any(
+                self.deck.prompts[item_id] == user_answer
+                for item_id in self.deck.answer_ids.get(current_char, ()))
+        answered_at = self.srs_scheduler.clock()
+        now = answered_at.isoformat()
+
+        # Registrar en estudio
+        char_data = self.study_history.get(current_char)
+        if char_data is None:
+            char_data = {"times_shown": 0, "correct": 0, "incorrect": 0, "last_shown": now}
+            self.study_history[current_char] = char_data
+        else:
+            char_data["last_shown"] = now
+        if self.sync_changes is not None:
+            self.sync_changes.add(current_char)
+
+        # Añadir a la lista de caracteres estudiados para logros
+        self._mark_studied(current_char)
+
+        # Procesar resultado con SRS si está activado
+        if self.srs_mode:
+            self.srs_scheduler.calculate_next_review(char_data, is_correct)
+            if self._due_cache is not None and current_char in self._due_cache[2]:
+                self._due_cache[2].discard(current_char)
+                self._due_items = None
+
+        result = {
+            "correct": is_correct,
+            "question": current_char,
+            "answer": correct_answer,
+            "user_answer": user_answer,
+            "variant": variant,
+            "confused_with": None,
+            "mastered": None,
+            "marked_difficult": None,
+            "perfect_quiz": False
+        }
+
+        self.last_answer_correct = is_correct
+        if is_correct:
+            self.score += 1
+            self.streak += 1
+            self.max_streak = max(self.max_streak, self.streak)
+            char_data["correct"] += 1
+            self.achievement_data['max_streak'] = max(self.achievement_data['max_streak'], self.streak)
+
+            # Si era difícil y se responde correctamente 3 veces seguidas, lo quitamos de difíciles
+            if current_char in self.difficult_characters:
+                count = self.correct_answers_count.get(current_char, 0) + 1
+                self.correct_answers_count[current_char] = count
+                if count >= 3:
+                    self.difficult_characters.discard(current_char)
+                    self.correct_answers_count[current_char] = 0
+                    result["mastered"] = current_char
+        else:
+            self.streak = 0
+            char_data["incorrect"] += 1
+
+            # Marcar automáticamente como difícil
+            difficult_char = self._hiragana_for_question(current_char)
+            if difficult_char is not None:
+                self.difficult_characters.add(difficult_char)
+                result["marked_difficult"] = difficult_char
+            
+            # Anotar con qué carácter se ha confundido
+            chosen = self._chosen_item(user_answer)
+            if difficult_char is not None and chosen is not None and chosen != difficult_char:
+                self.confusions.record(difficult_char, chosen)
+                result["confused_with"] = chosen
+
+            # Resetear contadores de aciertos consecutivos
+            if current_char in self.correct_answers_count:
+                self.correct_answers_count[current_char] = 0
+
+        char_data["times_shown"] += 1
+        self.total_attempts += 1
+
+        if self.review_log is not None:
+            latency_ms = (time.monotonic() - self.question_started_at) * 1000 if self.question_started_at else 0
+            try:
+                self.review_log.append(current_char, REVIEW_CORRECT if is_correct else REVIEW_INCORRECT,
+                                       latency_ms, REVIEW_SOURCE_QUIZ, timestamp=answered_at.timestamp())
+            except (OSError, DataLoadError) as e:
+                logger.error(f"No se pudo anotar el repaso en el registro: {e}")
+
+        # Verificar logro de quiz perfecto (20+ preguntas con 100% acierto)
+        if (self.score >= 20 and self.score == self.total_attempts and
+                self.achievement_data['perfect_quiz_count'] == 0):
+            self.achievement_data['perfect_quiz_count'] = 1
+            result["perfect_quiz"] = True
+
+        return result
+
+    def _mark_studied(self, char):
+        """Añade `char` a achievement_data['studied_chars'] si no estaba
+        
+        La lista se consulta con un conjunto paralelo, que se rehace si la lista se
+        sustituye (al cargar o importar) o cambia de tamaño por otro camino.
+        """
+        studied = self.achievement_data['studied_chars']
+        if self._studied_lookup is None or self._studied_lookup[0] is not studied \
+                or len(self._studied_lookup[1]) != len(studied):
+            self._studied_lookup = (studied, set(studied))
+        if char not in self._studied_lookup[1]:
+            studied.append(char)
+            self._studied_lookup[1].add(char)
+
+    def record_shown(self, char, source=None):
+        """Registra que se ha mostrado una tarjeta del carácter `char` (sin respuesta)
+        
+        `source` es el origen anotado en el registro de repasos (tarjetas por defecto).
+        """
+        shown_at = self.srs_scheduler.clock()
+        now = shown_at.isoformat()
+        char_data = self.study_history.get(char)
+        if char_data is None:
+            char_data = {"times_shown": 0, "correct": 0, "incorrect": 0, "last_shown": now}
+            self.study_history[char] = char_data
+        else:
+            char_data["last_shown"] = now
+        char_data["times_shown"] += 1
+        if self.sync_changes is not None:
+            self.sync_changes.add(char)
+        self._mark_studied(char)
+        
+        if self.review_log is not None:
+            try:
+                self.review_log.append(char, REVIEW_SHOWN, 0, REVIEW_SOURCE_FLASH if source is None else source,
+                                       timestamp=shown_at.timestamp())
+            except (OSError, DataLoadError) as e:
+                logger.error(f"No se pudo anotar el repaso en el registro: {e}")
+        return char_data
+    
+    def grade_option(self, selected_idx):
+        """Corrige la opción elegida en modo de opción múltiple (IndexError si no existe)"""
+        if not 0 <= selected_idx < len(self.current_options):
+            raise IndexError(f"Opción fuera de rango: {selected_idx}")
+        return self.grade(self.current_options[selected_idx])
+
+    def _hiragana_for_question(self, question):
+        """Devuelve el hiragana asociado a una pregunta según la dirección del quiz"""
+        if self.direction == "hira_to_rom":
+            return question
+        return self.deck.prompt_for_answer(question)
+
+    def reset_quiz(self):
+        """Reinicia las estadísticas del quiz actual"""
+        self.score = 0
+        self.total_attempts = 0
+        self.streak = 0
+
+    def accuracy(self):
+        """Devuelve la precisión del quiz actual en porcentaje"""
+        if self.total_attempts > 0:
+            return (self.score / self.total_attempts) * 100
+        return 0.0
+
+# Funciones de persistencia y estadísticas compartidas por la interfaz y los servicios
+# Registro de migraciones: versión de origen -> función que lleva los datos a la siguiente
+RECORD_MIGRATIONS = {}  # Por registro de study_history (se aplican de forma perezosa)
+FILE_MIGRATIONS = {}  # Por archivo, para los campos de primer nivel (se aplican al cargar)
+
+def record_migration(from_version):
+    """Registra la migración de un registro de historial desde `from_version`"""
+    def register(func):
+        RECORD_MIGRATIONS[from_version] = func
+        return func
+    return register
+
+def file_migration(from_version):
+    """Registra la migración de los campos de primer nivel desde `from_version`"""
+    def register(func):
+        FILE_MIGRATIONS[from_version] = func
+        return func
+    return register
+
+@record_migration(1)
+def _migrate_record_v1(record):
+    """v1 -> v2: contadores siempre presentes y nivel SRS explícito si hay fecha de repaso"""
+    for key in STUDY_COUNTER_FIELDS:
+        value = record.get(key, 0)
+        record[key] = value if isinstance(value, int) and value >= 0 else 0
+    if "next_review" in record and "srs_level" not in record:
+        record["srs_level"] = 0
+
+@file_migration(1)
+def _migrate_file_v1(data):
+    """v1 -> v2: difficult_characters sin duplicados"""
+    if isinstance(data.get('difficult_characters'), list):
+        data['difficult_characters'] = list(dict.fromkeys(data['difficult_characters']))
+
+def migrate_record(record, from_version):
+    """Actualiza en sitio un registro de historial hasta SCHEMA_VERSION"""
+    for version in range(from_version, SCHEMA_VERSION):
+        migration = RECORD_MIGRATIONS.get(version)
+        if migration is not None:
+            migration(record)
+    return record
+
+class VersionedHistory(dict):
+    """Historial de estudio cuyos registros antiguos se migran la primera vez que se leen
+    
+    Abrir un archivo grande de una versión anterior no obliga a recorrerlo entero: cada
+    registro se actualiza al accederse (get, [], items, values...) y el archivo se
+    escribe en el formato nuevo en el siguiente guardado, que recorre todos los registros.
+    """
+    
+    def __init__(self, records=(), from_version=SCHEMA_VERSION):
+        super().__init__(records)
+        self.from_version = from_version
+        self.pending = set(self) if from_version < SCHEMA_VERSION else set()
+    
+    def _upgrade(self, key):
+        if key in self.pending:
+            self.pending.discard(key)
+            record = dict.get(self, key)
+            if isinstance(record, dict):
+                migrate_record(record, self.from_version)
+    
+    def __getitem__(self, key):
+        self._upgrade(key)
+        return dict.__getitem__(self, key)
+    
+    def get(self, key, default=None):
+        self._upgrade(key)
+        return dict.get(self, key, default)
+    
+    def setdefault(self, key, default=None):
+        self._upgrade(key)
+        return dict.setdefault(self, key, default)
+    
+    def pop(self, key, *default):
+        self._upgrade(key)
+        return dict.pop(self, key, *default)
+    
+    def __setitem__(self, key, value):
+        self.pending.discard(key)
+        dict.__setitem__(self, key, value)
+    
+    def _upgrade_all(self):
+        for key in list(self.pending):
+            self._upgrade(key)
+    
+    def items(self):
+        self._upgrade_all()
+        return dict.items(self)
+    
+    def values(self):
+        self._upgrade_all()
+        return dict.values(self)
+    
+    def copy(self):
+        return VersionedHistory(self.items())
+    
+    def __deepcopy__(self, memo):
+        # dict(self) copia los registros sin migrarlos; la copia hereda los pendientes
+        clone = VersionedHistory(copy.deepcopy(dict(self), memo))
+        clone.from_version = self.from_version
+        clone.pending = set(self.pending)
+        return clone
+    
+    def __reduce__(self):
+        return (VersionedHistory, (dict(self.items()),))
+
+def upgrade_progress(data, lazy=True):
+    """Lleva los datos de un archivo de progreso a SCHEMA_VERSION
+    
+    Los campos de primer nivel se migran enseguida; con lazy=True los registros de
+    study_history se envuelven en VersionedHistory y se migran al usarse.
+    """
+    version = data.get('schema_version', 1)
+    if not isinstance(version, int) or version > SCHEMA_VERSION:
+        raise DataLoadError(f"Versión de datos no compatible: {version} (esta aplicación usa {SCHEMA_VERSION})")
+    for from_version in range(version, SCHEMA_VERSION):
+        migration = FILE_MIGRATIONS.get(from_version)
+        if migration is not None:
+            migration(data)
+    
+    history = data.get('study_history')
+    if isinstance(history, dict) and version < SCHEMA_VERSION:
+        if lazy:
+            data['study_history'] = VersionedHistory(history, from_version=version)
+        else:
+            for record in history.values():
+                if isinstance(record, dict):
+                    migrate_record(record, version)
+    data['schema_version'] = SCHEMA_VERSION
+    return data
+
+def serialize_progress(engine, achievements):
+    """Prepara el progreso de un estudiante en el formato del archivo de datos"""
+    return {
+        'difficult_characters': list(engine.difficult_characters),
+        'study_history': engine.study_history,
+        'max_streak': engine.max_streak,
+        'achievements': [a.to_dict() for a in achievements],
+        'achievement_data': engine.achievement_data,
+        'confusions': engine.confusions.to_dict(),
+        'app_version': APP_VERSION,
+        'schema_version': SCHEMA_VERSION,
+        'last_save': datetime.now().isoformat()
+    }
+
+def apply_progress(engine, achievements, data):
+    """Aplica al motor y a los logros los datos leídos de un archivo de progreso"""
+    if 'difficult_characters' in data:
+        engine.difficult_characters = set(data['difficult_characters'])
+        
+    if 'study_history' in data:
+        engine.study_history = data['study_history']
+        
+    if 'max_streak' in data:
+        engine.max_streak = data['max_streak']
+    
+    if 'confusions' in data:
+        engine.confusions = ConfusionStore.from_dict(data['confusions'])
+    
+    if 'achievements' in data:
+        # Cargar logros
+        for a_data in data['achievements']:
+            for achievement in achievements:
+                if achievement.id == a_data['id']:
+                    achievement.unlocked = a_data.get('unlocked', False)
+                    achievement.unlock_date = a_data.get('unlock_date')
+    
+    if 'achievement_data' in data:
+        # Preservar la lista de todos los caracteres hiragana
+        all_hiragana = engine.achievement_data['all_hiragana']
+        engine.achievement_data = data['achievement_data']
+        engine.achievement_data['all_hiragana'] = all_hiragana
+
+def write_json_atomic(file_path, text):
+    """Escribe un archivo de texto de forma atómica (archivo temporal + reemplazo)"""
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, file_path)
+
+@contextmanager
+def locked_file(lock_path, exclusive=True):
+    """Bloqueo consultivo entre procesos sobre un archivo auxiliar (sin efecto si no hay fcntl)"""
+    with open(lock_path, 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def _merge_ordered_union(disk_items, local_items):
+    """Une dos listas conservando el orden y sin duplicados"""
+    merged = list(disk_items)
+    seen = set(merged)
+    for item in local_items:
+        if item not in seen:
+            merged.append(item)
+            seen.add(item)
+    return merged
+
+def _merge_char_record(base, local, disk):
+    """Fusiona el historial de un carácter a partir de los cambios locales desde la base"""
+    merged = dict(disk)
+    
+    # Otros campos: prevalece el valor local solo si ha cambiado desde la base
+    for key, value in local.items():
+        if key not in SRS_RECORD_FIELDS and base.get(key) != value:
+            merged[key] = value
+    
+    # Contadores: se suman los incrementos locales
+    for key in ("times_shown", "correct", "incorrect"):
+        merged[key] = disk.get(key, 0) + local.get(key, 0) - base.get(key, 0)
+    
+    # Última vez mostrado: el más reciente
+    shown = [value for value in (disk.get("last_shown"), local.get("last_shown")) if value]
+    if shown:
+        merged["last_shown"] = max(shown)
+    
+    # Campos SRS: los del último repaso registrado
+    if (local.get("last_review") or "") > (disk.get("last_review") or ""):
+        for key in SRS_RECORD_FIELDS:
+            if key in local:
+                merged[key] = local[key]
+    return merged
+
+def merge_progress(base, local, disk):
+    """Fusión a tres bandas de archivos de progreso (base = estado local del último guardado)
+    
+    Los contadores se combinan como incrementos, las fechas por máximo, los campos SRS
+    según el repaso más reciente y los conjuntos aplicando las altas y bajas locales.
+    """
+    merged = dict(disk)
+    merged.update({key: value for key, value in local.items()
+                   if key not in ('study_history', 'difficult_characters', 'achievements',
+                                  'achievement_data', 'max_streak', 'confusions')})
+    
+    # Historial de estudio
+    base_history = base.get('study_history', {})
+    disk_history = disk.get('study_history', {})
+    history = dict(disk_history)
+    for char, local_record in local.get('study_history', {}).items():
+        base_record = base_history.get(char, {})
+        if local_record != base_record:
+            history[char] = _merge_char_record(base_record, local_record, disk_history.get(char, {}))
+    merged['study_history'] = history
+    
+    # Caracteres difíciles: se aplican las altas y bajas locales sobre el disco
+    base_difficult = set(base.get('difficult_characters', []))
+    local_difficult = set(local.get('difficult_characters', []))
+    difficult = set(disk.get('difficult_characters', []))
+    difficult -= base_difficult - local_difficult
+    difficult |= local_difficult - base_difficult
+    merged['difficult_characters'] = sorted(difficult)
+    
+    merged['max_streak'] = max(disk.get('max_streak', 0), local.get('max_streak', 0))
+    
+    # Matriz de confusión: se suman los incrementos locales
+    if 'confusions' in local or 'confusions' in disk:
+        merged['confusions'] = merge_confusions(base.get('confusions'), local.get('confusions'),
+                                                disk.get('confusions'))
+    
+    # Logros: desbloqueado si lo está en cualquiera, con la fecha más antigua
+    achievements = {a['id']: dict(a) for a in disk.get('achievements', [])}
+    for a_data in local.get('achievements', []):
+        current = achievements.setdefault(a_data['id'], dict(a_data))
+        if a_data.get('unlocked'):
+            dates = [d for d in (current.get('unlock_date'), a_data.get('unlock_date')) if d]
+            current['unlocked'] = True
+            current['unlock_date'] = min(dates) if dates else None
+    merged['achievements'] = list(achievements.values())
+    
+    # Datos de logros
+    base_data = base.get('achievement_data', {})
+    local_data = local.get('achievement_data', {})
+    disk_data = disk.get('achievement_data', {})
+    achievement_data = dict(disk_data)
+    achievement_data.update(local_data)
+    for key in ('sessions_completed', 'total_study_time'):
+        achievement_data[key] = disk_data.get(key, 0) + local_data.get(key, 0) - base_data.get(key, 0)
+    for key in ('perfect_quiz_count', 'max_streak'):
+        achievement_data[key] = max(disk_data.get(key, 0), local_data.get(key, 0))
+    for key in ('study_dates', 'studied_chars'):
+        achievement_data[key] = _merge_ordered_union(disk_data.get(key, []), local_data.get(key, []))
+    base_counts = base_data.get('romanization_counts', {})
+    local_counts = local_data.get('romanization_counts', {})
+    disk_counts = disk_data.get('romanization_counts', {})
+    if local_counts or disk_counts:
+        achievement_data['romanization_counts'] = {
+            variant: disk_counts.get(variant, 0) + local_counts.get(variant, 0) - base_counts.get(variant, 0)
+            for variant in set(disk_counts) | set(local_counts)
+        }
+    merged['achievement_data'] = achievement_data
+    
+    return merged
+
+class ProgressFile:
+    """Archivo de progreso compartido entre procesos, con bloqueo y fusión al guardar
+    
+    Guarda una copia del estado local del último load/save (la base). Al guardar se
+    relee el disco bajo bloqueo exclusivo y se aplican solo los cambios locales
+    posteriores a la base, de modo que varios escritores convergen sin perder datos.
+    """
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lock_path = f"{file_path}.lock"
+        self.base = {}
+        self.external_changes = False  # El último guardado incorporó historial de otros procesos
+    
+    def _read(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def load(self):
+        """Lee el archivo bajo bloqueo compartido y lo toma como nueva base
+        
+        Los registros de versiones anteriores se migran de forma perezosa (ver
+        VersionedHistory); el archivo no se reescribe hasta el siguiente guardado.
+        """
+        with locked_file(self.lock_path, exclusive=False):
+            data = upgrade_progress(self._read())
+        self.base = copy.deepcopy(data)
+        return data
+    
+    def save(self, data, adopt=True, indent=None, replace=False):
+        """Fusiona `data` con el disco y escribe el resultado de forma atómica
+        
+        Con adopt=True el llamante sustituye su estado por el resultado devuelto;
+        con adopt=False conserva su estado local y la base pasa a ser `data`.
+        Con replace=True se escribe `data` tal cual (p. ej. al reiniciar estadísticas).
+        """
+        with locked_file(self.lock_path, exclusive=True):
+            # Se reescribe todo el archivo, así que lo leído del disco se migra por completo
+            if replace:
+                merged = data
+                self.external_changes = False
+            else:
+                disk = upgrade_progress(self._read(), lazy=False)
+                self.external_changes = disk.get('study_history', {}) != self.base.get('study_history', {})
+                merged = merge_progress(self.base, data, disk)
+            write_json_atomic(self.file_path, json.dumps(merged, ensure_ascii=False, indent=indent))
+        self.base = copy.deepcopy(merged if adopt else data)
+        return merged
+
+def compute_study_stats(study_history, hiragana_categories, difficult_characters=()):
+    """Calcula las estadísticas generales, por categoría y de caracteres difíciles"""
+    total_shown = 0
+    total_correct = 0
+    total_incorrect = 0
+    for char_data in study_history.values():
+        total_shown += char_data.get("times_shown", 0)
+        total_correct += char_data.get("correct", 0)
+        total_incorrect += char_data.get("incorrect", 0)
+    
+    # Calcular precisión solo si hay intentos
+    answered = total_correct + total_incorrect
+    accuracy = (total_correct / answered * 100) if answered > 0 else 0.0
+    
+    # Estadísticas por categoría
+    categories = {}
+    total_chars = 0
+    for category, hiragana_list in hiragana_categories.items():
+        category_correct = 0
+        category_total = 0
+        category_studied = 0
+        
+        for hiragana, _ in hiragana_list:
+            char_data = study_history.get(hiragana)
+            if char_data is not None:
+                category_correct += char_data.get("correct", 0)
+                category_total += char_data.get("correct", 0) + char_data.get("incorrect", 0)
+                category_studied += 1
+        
+        total_chars += len(hiragana_list)
+        categories[category] = {
+            "studied": category_studied,
+            "total": len(hiragana_list),
+            "accuracy": (category_correct / category_total) * 100 if category_total > 0 else 0,
+            "progress": (category_studied / len(hiragana_list)) * 100 if hiragana_list else 0
+        }
+    
+    # Caracteres difíciles ordenados por tasa de error (mayor primero)
+    difficult = []
+    for char in difficult_characters:
+        char_data = study_history.get(char)
+        if char_data is not None:
+            total = char_data.get("correct", 0) + char_data.get("incorrect", 0)
+            difficult.append((char, char_data.get("incorrect", 0) / total if total > 0 else 0))
+        else:
+            difficult.append((char, 0))
+    difficult.sort(key=lambda x: x[1], reverse=True)
+    
+    studied_chars = len(study_history)
+    return {
+        "total_shown": total_shown,
+        "total_correct": total_correct,
+        "total_incorrect": total_incorrect,
+        "accuracy": accuracy,
+        "studied_chars": studied_chars,
+        "total_chars": total_chars,
+        "progress": (studied_chars / total_chars * 100) if total_chars > 0 else 0,
+        "categories": categories,
+        "difficult": difficult
+    }
+
+# Segundos por carácter si todavía no hay tiempo de estudio registrado
+DEFAULT_SECONDS_PER_ITEM = 10.0
+
+def estimate_seconds_per_item(review_stats=None, session_seconds=0, session_items=0, min_session_items=5):
+    """Estima los segundos que dedica el usuario a cada carácter a partir de lo medido
+    
+    Con al menos `min_session_items` caracteres en la sesión actual se usa su ritmo
+    (segundos / caracteres mostrados); si no, la latencia media de las respuestas del
+    registro de repasos (`review_stats`, como lo devuelve AdaptiveLearning.load_review_stats)
+    y, sin nada medido, DEFAULT_SECONDS_PER_ITEM.
+    """
+    if session_items >= min_session_items and session_seconds > 0:
+        seconds = session_seconds / session_items
+    else:
+        answers = latency_ms = 0
+        for stats in (review_stats or {}).values():
+            count = stats["correct"] + stats["incorrect"]
+            answers += count
+            latency_ms += stats["mean_latency_ms"] * count
+        if answers <= 0 or latency_ms <= 0:
+            return DEFAULT_SECONDS_PER_ITEM
+        seconds = latency_ms / answers / 1000
+    return min(60.0, max(3.0, seconds))
+
+def _error_rate(char_data):
+    """Tasa de error de un carácter, o None si no tiene respuestas"""
+    total = char_data.get("correct", 0) + char_data.get("incorrect", 0)
+    return char_data.get("incorrect", 0) / total if total > 0 else None
+
+def plan_smart_session(deck, study_history, minutes, max_items=None, seconds_per_item=None,
+                       shares=(0.6, 0.2, 0.2), retention_model=None):
+    """Planifica una sesión inteligente que cabe en `minutes` minutos
+    
+    El tiempo (y `max_items`, si se indica) se reparte entre los caracteres con más
+    errores, los menos practicados y algunos aleatorios (60/20/20 por defecto); lo
+    que no usa un grupo pasa al siguiente. Cada elemento cuesta `seconds_per_item` multiplicado por (1 + tasa
+    de error), ya que los caracteres difíciles requieren más repeticiones. Los dos
+    primeros grupos se eligen con montículos (top-k) y los duplicados se descartan
+    con un conjunto de ids. Con un `retention_model`, el primer grupo son los caracteres
+    con menor probabilidad estimada de recordar en lugar de los de más errores. Devuelve
+    un diccionario con los ids, los pares, los segundos estimados y cuántos elementos
+    aporta cada grupo.
+    """
+    base = seconds_per_item or DEFAULT_SECONDS_PER_ITEM
+    budget = max(0.0, minutes * 60.0)
+    max_items = len(deck) if max_items is None else min(max_items, len(deck))
+    
+    chosen = set()
+    items = []
+    counts = {"errors": 0, "least_practiced": 0, "random": 0}
+    state = {"spent": 0.0, "allowance": 0.0}
+    
+    def item_cost(item_id):
+        rate = _error_rate(study_history.get(deck.prompts[item_id], {}))
+        return base * (1 + (rate or 0))
+    
+    def take(candidates, group, item_limit):
+        # Añade candidatos mientras quede presupuesto en el grupo (más lo no usado antes)
+        for item_id in candidates:
+            if len(items) >= item_limit or state["allowance"] < base:
+                return
+            if item_id in chosen:
+                continue
+            cost = item_cost(item_id)
+            if cost > state["allowance"]:
+                continue
+            chosen.add(item_id)
+            items.append(item_id)
+            counts[group] += 1
+            state["allowance"] -= cost
+            state["spent"] += cost
+    
+    # Como mucho caben budget / base elementos (el coste mínimo es `base`)
+    limit = min(max_items, int(budget // base) + 1)
+    
+    # 1. Caracteres con mayor tasa de error (los que tienen respuestas)
+    state["allowance"] += budget * shares[0]
+    def rated():
+        for char, char_data in study_history.items():
+            if char_data.get("times_shown", 0) > 0:
+                rate = _error_rate(char_data)
+                if rate is not None:
+                    yield rate, char
+    
+    if retention_model is not None:
+        worst = retention_model.weakest(limit)
+    else:
+        worst = [char for _, char in heapq.nlargest(limit, rated(), key=lambda entry: entry[0])]
+    take((item_id for char in worst for item_id in deck.prompt_ids.get(char, ())), "errors",
+         int(max_items * shares[0]))
+    
+    # 2. Caracteres menos practicados (en orden de mazo si empatan)
+    state["allowance"] += budget * shares[1]
+    least = heapq.nsmallest(limit + len(items), range(len(deck)),
+                            key=lambda i: study_history.get(deck.prompts[i], {}).get("times_shown", 0))
+    take(least, "least_practiced", int(max_items * (shares[0] + shares[1])))
+    
+    # 3. Relleno aleatorio sin barajar todo el mazo
+    state["allowance"] += budget * shares[2]
+    remaining = len(deck) - len(chosen)
+    if remaining <= 4 * limit:
+        pool = [item_id for item_id in range(len(deck)) if item_id not in chosen]
+        random.shuffle(pool)
+        take(pool, "random", max_items)
+    else:
+        take((random.randrange(len(deck)) for _ in range(8 * limit)), "random", max_items)
+    
+    return {
+        "items": items,
+        "pairs": [deck.pair(item_id) for item_id in items],
+        "seconds": state["spent"],
+        "counts": counts,
+    }
+
+# Cabecera de la exportación CSV de estadísticas
+STATS_CSV_HEADER = ["Carácter", "Veces mostrado", "Correctas", "Incorrectas", "Precisión", "Difícil"]
+
+def open_export_file(file_path, mode='w'):
+    """Abre un archivo de texto UTF-8, comprimido con gzip (.gz) o lzma (.xz/.lzma) según la extensión"""
+    lower = file_path.lower()
+    if lower.endswith(".gz"):
+        return gzip.open(file_path, mode + 't', encoding='utf-8', newline='')
+    if lower.endswith((".xz", ".lzma")):
+        return lzma.open(file_path, mode + 't', encoding='utf-8', newline='')
+    return open(file_path, mode, encoding='utf-8', newline='')
+
+def export_format_for(file_path, default="csv"):
+    """Deduce el formato de exportación (csv, json o jsonl) ignorando la compresión"""
+    name = file_path.lower()
+    for suffix in (".gz", ".xz", ".lzma"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    for format_type in ("jsonl", "json", "csv"):
+        if name.endswith("." + format_type):
+            return format_type
+    return default
+
+def iter_study_records(study_history, difficult_characters):
+    """Genera (carácter, copia de sus datos, es_difícil) sin copiar el historial completo
+    
+    Solo se toma una instantánea de las claves para poder recorrerlo mientras la
+    interfaz sigue añadiendo caracteres.
+    """
+    for char in list(study_history):
+        data = study_history.get(char)
+        if data is not None:
+            yield char, dict(data), char in difficult_characters
+
+def iter_stats_rows(records):
+    """Convierte los registros de estudio en filas de la exportación CSV"""
+    for char, data, is_difficult in records:
+        correct = data.get("correct", 0)
+        incorrect = data.get("incorrect", 0)
+        accuracy = (correct / (correct + incorrect) * 100) if (correct + incorrect) > 0 else 0
+        yield [char, data.get("times_shown", 0), correct, incorrect, f"{accuracy:.1f}%",
+               "Sí" if is_difficult else "No"]
+
+def iter_json_export(records, difficult_characters, achievement_data):
+    """Genera por fragmentos un JSON compacto compatible con `import_data`"""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    yield '{"study_history":{'
+    first = True
+    for char, data, _ in records:
+        yield ('' if first else ',') + dumps(char) + ':' + dumps(data)
+        first = False
+    yield '},"difficult_characters":' + dumps(sorted(difficult_characters))
+    yield ',"achievement_data":' + dumps(achievement_data)
+    yield ',"export_date":' + dumps(datetime.now().isoformat())
+    yield ',"app_version":' + dumps(APP_VERSION) + '}\n'
+
+def iter_jsonl_export(records, achievement_data):
+    """Genera líneas JSON: una cabecera, un registro por carácter y los logros al final"""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    yield dumps({"type": "export", "export_date": datetime.now().isoformat(),
+                 "app_version": APP_VERSION}) + '\n'
+    for char, data, is_difficult in records:
+        yield dumps({"type": "character", "char": char, "difficult": is_difficult, **data}) + '\n'
+    yield dumps({"type": "achievements", "achievement_data": achievement_data}) + '\n'
+
+def export_study_data(file_path, study_history, difficult_characters, achievement_data,
+                      format_type=None, progress=None, progress_every=500):
+    """Escribe la exportación en streaming y devuelve el número de caracteres exportados
+    
+    `format_type` (csv, json o jsonl) se deduce de la extensión si no se indica.
+    `progress(hechos, total)` se llama cada `progress_every` caracteres; el uso de
+    memoria no depende del tamaño del historial.
+    """
+    format_type = format_type or export_format_for(file_path)
+    difficult = set(difficult_characters)
+    total = len(study_history)
+    state = {"done": 0}
+    
+    def counted(records):
+        for record in records:
+            yield record
+            state["done"] += 1
+            if progress is not None and state["done"] % progress_every == 0:
+                progress(state["done"], total)
+    
+    records = counted(iter_study_records(study_history, difficult))
+    with open_export_file(file_path) as f:
+        if format_type == "csv":
+            writer = csv.writer(f)
+            writer.writerow(STATS_CSV_HEADER)
+            writer.writerows(iter_stats_rows(records))
+        elif format_type == "json":
+            f.writelines(iter_json_export(records, difficult, achievement_data))
+        elif format_type == "jsonl":
+            f.writelines(iter_jsonl_export(records, achievement_data))
+        else:
+            raise ValueError(f"Formato de exportación desconocido: {format_type}")
+    
+    if progress is not None:
+        progress(state["done"], total)
+    return state["done"]
+
+class JsonStreamReader:
+    """Lector incremental de JSON: decodifica valores de uno en uno sobre un búfer por bloques
+    
+    Permite recorrer los elementos de un objeto enorme (como `study_history`) sin
+    cargar el archivo completo en memoria.
+    """
+    
+    WHITESPACE = re.compile(r'[ \t\r\n]*')
+    
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self):
+        """Salta los espacios y devuelve el siguiente carácter ('' al final del archivo)"""
+        while True:
+            self.pos = self.WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+    
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON no válido: se esperaba '{char}'")
+        self.pos += 1
+    
+    def skip_comma(self):
+        """Consume una coma si la hay y devuelve si se encontró"""
+        if self.peek() == ",":
+            self.pos += 1
+            return True
+        return False
+    
+    def value(self):
+        """Decodifica el siguiente valor completo"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Un número al final del búfer podría continuar en el siguiente bloque
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+    
+    def iter_object(self, stream_keys=()):
+        """Recorre un objeto devolviendo (clave, valor); las claves de `stream_keys`
+        se recorren a su vez y dan (clave, (subclave, valor)) por cada elemento"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            if key in stream_keys and self.peek() == "{":
+                self.pos += 1
+                if self.peek() != "}":
+                    while True:
+                        sub_key = self.value()
+                        self.expect(":")
+                        yield key, (sub_key, self.value())
+                        if not self.skip_comma():
+                            break
+                self.expect("}")
+            else:
+                yield key, self.value()
+            if not self.skip_comma():
+                break
+        self.expect("}")
+
+# Campos de un registro de historial que se conservan al importar
+STUDY_COUNTER_FIELDS = ("times_shown", "correct", "incorrect")
+STUDY_TIMESTAMP_FIELDS = ("last_shown", "next_review", "last_review")
+
+def iter_import_records(file_path):
+    """Lee en streaming un archivo de datos (JSON o JSON Lines, opcionalmente comprimido)
+    
+    Genera tuplas (tipo, clave, valor): ("character", carácter, datos),
+    ("difficult", carácter, None) y ("field", nombre, valor) para el resto de campos.
+    """
+    format_type = export_format_for(file_path, default="json")
+    with open_export_file(file_path, 'r') as f:
+        if format_type == "jsonl":
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield "invalid", f"línea {line_number}", "JSON no válido"
+                    continue
+                if not isinstance(record, dict):
+                    yield "invalid", f"línea {line_number}", "se esperaba un objeto"
+                    continue
+                record_type = record.pop("type", "character" if "char" in record else None)
+                if record_type == "character":
+                    char = record.pop("char", None)
+                    if record.pop("difficult", False):
+                        yield "difficult", char, None
+                    yield "character", char, record
+                elif record_type == "achievements":
+                    yield "field", "achievement_data", record.get("achievement_data")
+                # Los demás tipos (cabecera, resúmenes de cohorte) no contienen progreso
+            return
+        
+        for key, value in JsonStreamReader(f).iter_object(stream_keys=("study_history",)):
+            if key == "study_history":
+                yield "character", value[0], value[1]
+            elif key == "difficult_characters" and isinstance(value, list):
+                for char in value:
+                    yield "difficult", char, None
+            else:
+                yield "field", key, value
+
+def validate_study_record(char, data):
+    """Comprueba un registro importado y devuelve una copia con solo los campos conocidos"""
+    if not isinstance(char, str) or not char.strip():
+        raise ValueError("carácter vacío o no válido")
+    if not isinstance(data, dict):
+        raise ValueError(f"{char}: se esperaba un objeto")
+    
+    record = {}
+    for key in STUDY_COUNTER_FIELDS:
+        value = data.get(key, 0)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError(f"{char}: '{key}' debe ser un entero no negativo")
+        record[key] = value
+    for key in STUDY_TIMESTAMP_FIELDS:
+        value = data.get(key)
+        if value is None:
+            continue
+        try:
+            datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{char}: '{key}' no es una fecha válida")
+        record[key] = value
+    if "srs_level" in data:
+        level = data["srs_level"]
+        if isinstance(level, bool) or not isinstance(level, int) or level < 0:
+            raise ValueError(f"{char}: 'srs_level' debe ser un entero no negativo")
+        record["srs_level"] = level
+    return record
+
+def _latest_timestamp(*values):
+    present = [value for value in values if value]
+    return max(present, key=datetime.fromisoformat) if present else None
+
+def merge_imported_record(current, incoming):
+    """Fusiona un registro importado: suma contadores, fechas más recientes y mayor nivel SRS"""
+    merged = dict(current)
+    for key in STUDY_COUNTER_FIELDS:
+        merged[key] = current.get(key, 0) + incoming.get(key, 0)
+    for key in ("last_shown", "last_review"):
+        latest = _latest_timestamp(current.get(key), incoming.get(key))
+        if latest is not None:
+            merged[key] = latest
+    
+    level = incoming.get("srs_level")
+    current_level = current.get("srs_level")
+    if level is not None and (current_level is None or level > current_level or (
+            level == current_level
+            and _latest_timestamp(current.get("next_review"), incoming.get("next_review"))
+            != current.get("next_review"))):
+        merged["srs_level"] = level
+        if "next_review" in incoming:
+            merged["next_review"] = incoming["next_review"]
+    return merged
+
+def merge_imported_achievement_data(current, incoming):
+    """Fusiona los datos de logros importados con los actuales"""
+    merged = dict(current)
+    for key in ('sessions_completed', 'total_study_time'):
+        value = incoming.get(key, 0)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            merged[key] = current.get(key, 0) + value
+    for key in ('perfect_quiz_count', 'max_streak'):
+        value = incoming.get(key, 0)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            merged[key] = max(current.get(key, 0), value)
+    for key in ('study_dates', 'studied_chars'):
+        if isinstance(incoming.get(key), list):
+            merged[key] = _merge_ordered_union(current.get(key, []), incoming[key])
+    return merged
+
+def import_study_data(file_path, study_history, difficult_characters, achievement_data,
+                      mode="merge", dry_run=False, progress=None, progress_every=1000):
+    """Importa en streaming un archivo de datos y calcula su efecto sobre el progreso actual
+    
+    `mode` es "merge" (sumar contadores, fechas más recientes, mayor nivel SRS y unión
+    de difíciles) o "replace" (sustituir el progreso por el del archivo). El estado
+    actual no se modifica: se devuelve (resumen, cambios) y los cambios se aplican con
+    `apply_import_changes`. Con `dry_run` solo se calcula el resumen y no se guarda
+    ningún registro, de modo que la memoria usada no depende del tamaño del archivo.
+    """
+    if mode not in ("merge", "replace"):
+        raise ValueError(f"Modo de importación desconocido: {mode}")
+    
+    summary = {"mode": mode, "records": 0, "invalid": 0, "errors": [], "new": 0, "updated": 0,
+               "unchanged": 0, "removed": 0, "added_shown": 0, "added_correct": 0,
+               "added_incorrect": 0, "difficult_added": 0, "achievement_data": False}
+    records = {}
+    imported_difficult = set()
+    incoming_achievements = None
+    
+    for kind, key, value in iter_import_records(file_path):
+        if kind == "invalid":
+            summary["invalid"] += 1
+            if len(summary["errors"]) < 10:
+                summary["errors"].append(f"{key}: {value}")
+            continue
+        if kind == "difficult":
+            if isinstance(key, str) and key:
+                imported_difficult.add(key)
+            continue
+        if kind == "field":
+            if key == "achievement_data" and isinstance(value, dict):
+                incoming_achievements = value
+            continue
+        
+        try:
+            record = validate_study_record(key, value)
+        except ValueError as e:
+            summary["invalid"] += 1
+            if len(summary["errors"]) < 10:
+                summary["errors"].append(str(e))
+            continue
+        
+        summary["records"] += 1
+        if progress is not None and summary["records"] % progress_every == 0:
+            progress(summary["records"])
+        
+        # Si un carácter se repite en el archivo, se fusiona con lo ya importado
+        current = records.get(key, study_history.get(key))
+        merged = record if mode == "replace" or current is None else merge_imported_record(current, record)
+        if current is None:
+            summary["new"] += 1
+        elif merged == current:
+            summary["unchanged"] += 1
+        else:
+            summary["updated"] += 1
+        for field in STUDY_COUNTER_FIELDS:
+            summary[f"added_{field.replace('times_', '')}"] += merged.get(field, 0) - (current or {}).get(field, 0)
+        if not dry_run:
+            records[key] = merged
+    
+    if mode == "replace":
+        summary["removed"] = max(0, len(study_history) - summary["updated"] - summary["unchanged"])
+    summary["difficult_added"] = len(imported_difficult - set(difficult_characters))
+    summary["achievement_data"] = incoming_achievements is not None
+    if progress is not None:
+        progress(summary["records"])
+    if dry_run:
+        return summary, None
+    
+    if mode == "replace":
+        new_achievements = incoming_achievements
+        new_difficult = imported_difficult
+    else:
+        new_achievements = (merge_imported_achievement_data(achievement_data, incoming_achievements)
+                            if incoming_achievements is not None else None)
+        new_difficult = set(difficult_characters) | imported_difficult
+    changes = {"mode": mode, "records": records, "difficult": new_difficult,
+               "achievement_data": new_achievements}
+    return summary, changes
+
+def apply_import_changes(changes, study_history, difficult_characters, achievement_data):
+    """Aplica los cambios calculados por `import_study_data` sobre el estado actual (en sitio)"""
+    if changes["mode"] == "replace":
+        study_history.clear()
+    study_history.update(changes["records"])
+    difficult_characters.clear()
+    difficult_characters.update(changes["difficult"])
+    if changes["achievement_data"] is not None:
+        achievement_data.clear()
+        achievement_data.update(changes["achievement_data"])
+
+def snapshot_progress(engine, achievements):
+    """Copia independiente del progreso actual, para calcular una importación en otro hilo"""
+    data = serialize_progress(engine, achievements)
+    data['study_history'] = dict(data['study_history'].items())
+    return copy.deepcopy(data)
+
+def merge_import_result(snapshot, live, changes):
+    """Aplica los cambios de una importación calculada sobre `snapshot` al progreso `live`
+    
+    Lo que cambió en `live` mientras se importaba (respuestas, tarjetas vistas) se
+    conserva con la misma fusión a tres bandas que usa ProgressFile al guardar.
+    """
+    imported = copy.deepcopy(snapshot)
+    difficult = set(imported['difficult_characters'])
+    apply_import_changes(changes, imported['study_history'], difficult, imported['achievement_data'])
+    imported['difficult_characters'] = sorted(difficult)
+    return merge_progress(snapshot, live, imported)
+
+def format_import_summary(summary):
+    """Texto legible del resumen de una importación (para la confirmación previa)"""
+    lines = [
+        f"Registros válidos: {summary['records']}",
+        f"Caracteres nuevos: {summary['new']}",
+        f"Caracteres modificados: {summary['updated']}",
+        f"Sin cambios: {summary['unchanged']}",
+    ]
+    if summary["mode"] == "replace":
+        lines.append(f"Caracteres que se eliminarían: {summary['removed']}")
+    lines.append(f"Veces mostrado: {summary['added_shown']:+d}, correctas: {summary['added_correct']:+d}, "
+                 f"incorrectas: {summary['added_incorrect']:+d}")
+    lines.append(f"Nuevos caracteres difíciles: {summary['difficult_added']}")
+    if summary["achievement_data"]:
+        lines.append("Incluye datos de logros")
+    if summary["invalid"]:
+        lines.append(f"Registros no válidos (se ignoran): {summary['invalid']}")
+        lines.extend(f"  - {error}" for error in summary["errors"][:3])
+    return "\n".join(lines)
+
+# Formato de los archivos de cambios de sincronización
+SYNC_FORMAT = 1
+SYNC_SRS_FIELDS = ("srs_level", "next_review", "last_review")
+
+# Claves del estado de sincronización que crecen con el historial (una entrada por carácter)
+SYNC_CHAR_KEYS = ("counters", "totals", "difficult")
+# El diario se compacta en el archivo de estado cuando supera su tamaño (y al menos esto)
+SYNC_JOURNAL_MIN_BYTES = 64 * 1024
+
+class SyncState:
+    """Estado de sincronización de una instalación
+    
+    Guarda el identificador del dispositivo, los contadores de cada dispositivo por
+    carácter (contadores que solo crecen, de modo que fusionar es tomar el máximo y
+    el orden de las fusiones no importa), sus sumas ya reflejadas en el historial,
+    las marcas de caracteres difíciles con su fecha y, para cada dispositivo remoto,
+    el último archivo de cambios aplicado.
+    
+    Para que guardar cueste según lo sincronizado y no según el tamaño del historial,
+    `save` añade a `<archivo>.journal` una línea con las entradas por carácter que han
+    cambiado (`touched`) y los datos generales (pocos, uno por dispositivo). Las líneas
+    llevan valores completos, no incrementos, así que releerlas es idempotente. Cuando
+    el diario supera al archivo de estado se reescribe este entero y se vacía el diario.
+    """
+    
+    def __init__(self, file_path=SYNC_STATE_FILE):
+        self.file_path = file_path
+        self.journal_path = f"{file_path}.journal"
+        self.data = None
+        self.touched = set()  # Caracteres cuyas entradas han cambiado desde el último guardado
+        self.flagged = set()  # Caracteres con la marca de difícil activa
+        self._state_bytes = 0
+        self._journal_bytes = 0
+    
+    def load(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            self.data = json.loads(text)
+            self._state_bytes = len(text)
+        except FileNotFoundError:
+            self.data = {}
+            self._state_bytes = 0
+        self.data.setdefault("format", SYNC_FORMAT)
+        self.data.setdefault("device_id", uuid.uuid4().hex[:12])
+        for key in ("applied",) + SYNC_CHAR_KEYS:
+            self.data.setdefault(key, {})
+        self.data.setdefault("seq", 0)
+        self.data.setdefault("achievement_counters", {})
+        self.data.setdefault("achievement_totals", [0, 0])
+        self.data.setdefault("lists_sent", {})
+        self._replay_journal()
+        self.touched = set()
+        self.flagged = {char for char, (flag, _) in self.data["difficult"].items() if flag}
+        return self.data
+    
+    def _replay_journal(self):
+        """Aplica sobre el estado cargado las líneas del diario"""
+        self._journal_bytes = 0
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Una línea a medio escribir (corte de luz) y lo que venga detrás no se aplican
+                        logger.warning("Sincronización: diario de estado incompleto en %s", self.journal_path)
+                        break
+                    self.data.update(entry["meta"])
+                    for char, values in entry["chars"].items():
+                        for key, value in zip(SYNC_CHAR_KEYS, values):
+                            if value is not None:
+                                self.data[key][char] = value
+                    self._journal_bytes += len(line)
+        except FileNotFoundError:
+            pass
+    
+    def save(self):
+        if self._journal_bytes > max(self._state_bytes, SYNC_JOURNAL_MIN_BYTES):
+            self.compact()
+            return
+        meta = {key: value for key, value in self.data.items() if key not in SYNC_CHAR_KEYS}
+        chars = {char: [self.data[key].get(char) for key in SYNC_CHAR_KEYS] for char in self.touched}
+        line = json.dumps({"meta": meta, "chars": chars}, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+        self._journal_bytes += len(line)
+        self.touched.clear()
+    
+    def compact(self):
+        """Reescribe el estado completo y vacía el diario"""
+        text = json.dumps(self.data, ensure_ascii=False, separators=(',', ':'))
+        write_json_atomic(self.file_path, text)
+        # Si se corta aquí, releer el diario sobre el estado nuevo no cambia nada
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._state_bytes = len(text)
+        self._journal_bytes = 0
+        self.touched.clear()
+    
+    @property
+    def device_id(self):
+        return self.data["device_id"]
+
+def _collect_sync_delta(sync_state, study_history, difficult_characters, achievement_data, now, changed=None):
+    """Pasa los cambios locales desde la última sincronización a los contadores de este dispositivo
+    
+    `changed` son los caracteres modificados desde entonces (QuizEngine.sync_changes); así
+    el coste depende de lo estudiado y no del tamaño del historial. Con None se revisa
+    todo el historial. `difficult_characters` es un conjunto. Devuelve el contenido del
+    archivo de cambios, o None si no hay nada nuevo.
+    """
+    state = sync_state.data
+    device = state["device_id"]
+    counters = state["counters"]
+    totals = state["totals"]
+    delta_counters = {}
+    records = {}
+    ignored = 0
+    
+    if changed is None:
+        candidates = study_history.items()
+    else:
+        candidates = ((char, study_history[char]) for char in changed if char in study_history)
+    for char, record in candidates:
+        current = [record.get(key, 0) for key in STUDY_COUNTER_FIELDS]
+        known = totals.get(char, [0, 0, 0])
+        if current == known:
+            continue
+        increments = [c - k for c, k in zip(current, known)]
+        if any(value < 0 for value in increments):
+            # Los contadores solo crecen: un reinicio local no se propaga
+            ignored += 1
+            continue
+        own = counters.setdefault(char, {}).setdefault(device, [0, 0, 0])
+        own[:] = [o + i for o, i in zip(own, increments)]
+        totals[char] = current
+        sync_state.touched.add(char)
+        delta_counters[char] = list(own)
+        records[char] = {key: record[key] for key in ("last_shown",) + SYNC_SRS_FIELDS if key in record}
+    if ignored:
+        logger.warning("Sincronización: %d caracteres con contadores menores que los sincronizados", ignored)
+    
+    # Caracteres difíciles: registro por carácter con la fecha del último cambio
+    marks = state["difficult"]
+    flagged = sync_state.flagged
+    added, removed = difficult_characters - flagged, flagged - difficult_characters
+    delta_difficult = {}
+    for char in added:
+        marks[char] = delta_difficult[char] = [True, now]
+    for char in removed:
+        marks[char] = delta_difficult[char] = [False, now]
+    flagged |= added
+    flagged -= removed
+    sync_state.touched.update(delta_difficult)
+    
+    # Datos de logros: sesiones y tiempo como contadores; rachas por máximo; listas por unión
+    achievement = {}
+    current = [achievement_data.get('sessions_completed', 0), achievement_data.get('total_study_time', 0)]
+    known = state["achievement_totals"]
+    if current != known and all(c >= k for c, k in zip(current, known)):
+        own = state["achievement_counters"].setdefault(device, [0, 0])
+        own[:] = [o + c - k for o, c, k in zip(own, current, known)]
+        state["achievement_totals"] = current
+        achievement["counters"] = list(own)
+    for key in ('study_dates', 'studied_chars'):
+        items = achievement_data.get(key, [])
+        sent = state["lists_sent"].get(key, 0)
+        if len(items) > sent:
+            achievement[key] = items[sent:]
+            state["lists_sent"][key] = len(items)
+    if achievement:
+        for key in ('max_streak', 'perfect_quiz_count'):
+            achievement[key] = achievement_data.get(key, 0)
+    
+    if not (delta_counters or delta_difficult or achievement):
+        return None
+    state["seq"] += 1
+    return {"format": SYNC_FORMAT, "device": device, "seq": state["seq"], "created": now,
+            "counters": delta_counters, "records": records, "difficult": delta_difficult,
+            "achievement": achievement}
+
+def apply_sync_delta(sync_state, delta, study_history, difficult_characters, achievement_data):
+    """Aplica un archivo de cambios de otro dispositivo; aplicarlo varias veces no cambia nada
+    
+    Devuelve el número de caracteres cuyo historial ha cambiado.
+    """
+    state = sync_state.data
+    peer = delta["device"]
+    totals = state["totals"]
+    changed = 0
+    
+    for char, values in delta.get("counters", {}).items():
+        known = state["counters"].setdefault(char, {}).setdefault(peer, [0, 0, 0])
+        increments = [max(0, v - k) for v, k in zip(values, known)]
+        if not any(increments):
+            continue
+        known[:] = [k + i for k, i in zip(known, increments)]
+        record = study_history.setdefault(char, {"times_shown": 0, "correct": 0, "incorrect": 0})
+        for key, increment in zip(STUDY_COUNTER_FIELDS, increments):
+            record[key] = record.get(key, 0) + increment
+        total = totals.setdefault(char, [0, 0, 0])
+        total[:] = [t + i for t, i in zip(total, increments)]
+        sync_state.touched.add(char)
+        changed += 1
+    
+    for char, fields in delta.get("records", {}).items():
+        record = study_history.setdefault(char, {"times_shown": 0, "correct": 0, "incorrect": 0})
+        latest = _latest_timestamp(record.get("last_shown"), fields.get("last_shown"))
+        if latest is not None:
+            record["last_shown"] = latest
+        # Campos SRS: los del repaso más reciente
+        if fields.get("last_review") and _latest_timestamp(
+                record.get("last_review"), fields["last_review"]) != record.get("last_review"):
+            for key in SYNC_SRS_FIELDS:
+                if key in fields:
+                    record[key] = fields[key]
+    
+    marks = state["difficult"]
+    for char, (flag, stamp) in delta.get("difficult", {}).items():
+        mine = marks.get(char)
+        # Gana el cambio más reciente; en caso de empate, marcar como difícil
+        if mine is None or (stamp, flag) > (mine[1], mine[0]):
+            marks[char] = [flag, stamp]
+            sync_state.touched.add(char)
+            if flag:
+                difficult_characters.add(char)
+                sync_state.flagged.add(char)
+            else:
+                difficult_characters.discard(char)
+                sync_state.flagged.discard(char)
+    
+    achievement = delta.get("achievement", {})
+    if "counters" in achievement:
+        known = state["achievement_counters"].setdefault(peer, [0, 0])
+        increments = [max(0, v - k) for v, k in zip(achievement["counters"], known)]
+        known[:] = [k + i for k, i in zip(known, increments)]
+        achievement_data['sessions_completed'] = achievement_data.get('sessions_completed', 0) + increments[0]
+        achievement_data['total_study_time'] = achievement_data.get('total_study_time', 0) + increments[1]
+        state["achievement_totals"] = [t + i for t, i in zip(state["achievement_totals"], increments)]
+    for key in ('max_streak', 'perfect_quiz_count'):
+        if key in achievement:
+            achievement_data[key] = max(achievement_data.get(key, 0), achievement[key])
+    for key in ('study_dates', 'studied_chars'):
+        if key in achievement:
+            achievement_data[key] = _merge_ordered_union(achievement_data.get(key, []), achievement[key])
+    return changed
+
+def sync_with_directory(sync_dir, study_history, difficult_characters, achievement_data, state, changed=None):
+    """Sincroniza en ambos sentidos a través de una carpeta compartida o memoria USB
+    
+    Cada dispositivo escribe sus cambios en `sync_dir/<dispositivo>/<n>.json` y lee los
+    archivos de los demás posteriores a su marca. El historial, los difíciles y los
+    datos de logros se modifican en sitio; `state` (SyncState) debe guardarse después.
+    `changed` limita los caracteres que se revisan al publicar (ver _collect_sync_delta).
+    """
+    data = state.data if state.data is not None else state.load()
+    now = datetime.now().isoformat()
+    summary = {"device": data["device_id"], "exported": 0, "seq": data["seq"],
+               "imported_files": 0, "imported_chars": 0, "peers": []}
+    
+    # 1. Publicar los cambios locales
+    delta = _collect_sync_delta(state, study_history, difficult_characters, achievement_data, now, changed)
+    if delta is not None:
+        device_dir = os.path.join(sync_dir, data["device_id"])
+        os.makedirs(device_dir, exist_ok=True)
+        write_json_atomic(os.path.join(device_dir, f"{delta['seq']:08d}.json"),
+                          json.dumps(delta, ensure_ascii=False, separators=(',', ':')))
+        summary["exported"] = len(delta["counters"])
+        summary["seq"] = delta["seq"]
+    
+    # 2. Aplicar los cambios de los demás dispositivos posteriores a su marca
+    for peer in sorted(os.listdir(sync_dir)):
+        peer_dir = os.path.join(sync_dir, peer)
+        if peer == data["device_id"] or not os.path.isdir(peer_dir):
+            continue
+        summary["peers"].append(peer)
+        applied = data["applied"].get(peer, 0)
+        pending = []
+        for name in os.listdir(peer_dir):
+            stem, ext = os.path.splitext(name)
+            if ext == ".json" and stem.isdigit() and int(stem) > applied:
+                pending.append((int(stem), name))
+        for seq, name in sorted(pending):
+            try:
+                with open(os.path.join(peer_dir, name), 'r', encoding='utf-8') as f:
+                    delta = json.load(f)
+                if delta.get("format") != SYNC_FORMAT or delta.get("device") != peer:
+                    raise ValueError("formato o dispositivo inesperado")
+            except (OSError, ValueError) as e:
+                # Se detiene en este dispositivo para no saltarse cambios
+                logger.error(f"Sincronización: no se pudo leer {peer}/{name}: {e}")
+                break
+            summary["imported_chars"] += apply_sync_delta(state, delta, study_history,
+                                                          difficult_characters, achievement_data)
+            summary["imported_files"] += 1
+            data["applied"][peer] = seq
+    
+    data["directory"] = os.path.abspath(sync_dir)
+    data["last_sync"] = now
+    return summary
+
+# Registro binario de repasos: cabecera + registros de ancho fijo
+# (marca de tiempo en ms, código del carácter, latencia en ms, resultado, origen)
+REVIEW_RECORD = struct.Struct("<qIIBB2x")
+REVIEW_LOG_MAGIC = b"HRVLOG\x00\x01"
+REVIEW_LOG_HEADER = struct.Struct("<8sII")
+REVIEW_LOG_VERSION = 1
+REVIEW_INCORRECT, REVIEW_CORRECT, REVIEW_SHOWN = 0, 1, 2
+REVIEW_SOURCE_QUIZ, REVIEW_SOURCE_FLASH = 0, 1
+REVIEW_DTYPE = (np.dtype([("ts", "<i8"), ("item", "<u4"), ("latency_ms", "<u4"),
+                          ("result", "u1"), ("source", "u1"), ("pad", "V2")])
+                if np is not None else None)
+
+class ReviewLog:
+    """Registro de repasos de solo anexado, en binario de ancho fijo y leído mediante mmap
+    
+    Cada evento ocupa REVIEW_RECORD.size bytes; los caracteres se guardan como códigos
+    enteros cuya tabla está en `<archivo>.items.json`. Las lecturas usan `mmap` y, si
+    NumPy está disponible, `np.frombuffer` sobre el mapa (sin copiar) para recorrer un
+    carácter, un intervalo de tiempo o agregar estadísticas; sin NumPy se recorren los
+    registros con `struct.iter_unpack` sobre el mismo mapa.
+    """
+    
+    def __init__(self, file_path=REVIEW_LOG_FILE):
+        self.file_path = file_path
+        self.items_path = f"{file_path}.items.json"
+        self.lock_path = f"{file_path}.lock"
+        self.items = []
+        self.codes = {}
+        self._map = None
+        self._map_size = 0
+        self._load_items()
+    
+    def _load_items(self):
+        try:
+            with open(self.items_path, 'r', encoding='utf-8') as f:
+                self.items = json.load(f)
+        except FileNotFoundError:
+            self.items = []
+        self.codes = {item: code for code, item in enumerate(self.items)}
+    
+    def _code_for(self, item):
+        """Código entero de un carácter; los nuevos se añaden a la tabla bajo bloqueo"""
+        code = self.codes.get(item)
+        if code is None:
+            self._load_items()  # Otro proceso pudo añadirlo
+            code = self.codes.get(item)
+            if code is None:
+                code = len(self.items)
+                self.items.append(item)
+                self.codes[item] = code
+                write_json_atomic(self.items_path, json.dumps(self.items, ensure_ascii=False))
+        return code
+    
+    def append(self, item, result, latency_ms=0, source=REVIEW_SOURCE_QUIZ, timestamp=None):
+        """Añade un evento de repaso al final del registro"""
+        ts = int((timestamp if timestamp is not None else time.time()) * 1000)
+        with locked_file(self.lock_path):
+            code = self._code_for(item)
+            record = REVIEW_RECORD.pack(ts, code, max(0, min(int(latency_ms), 0xFFFFFFFF)), result, source)
+            with open(self.file_path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(REVIEW_LOG_HEADER.pack(REVIEW_LOG_MAGIC, REVIEW_LOG_VERSION, REVIEW_RECORD.size))
+                f.write(record)
+    
+    def append_many(self, events):
+        """Añade varios eventos (item, resultado, latencia, origen, marca de tiempo) de una vez"""
+        with locked_file(self.lock_path):
+            packed = [REVIEW_RECORD.pack(int(ts * 1000), self._code_for(item),
+                                         max(0, min(int(latency), 0xFFFFFFFF)), result, source)
+                      for item, result, latency, source, ts in events]
+            with open(self.file_path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(REVIEW_LOG_HEADER.pack(REVIEW_LOG_MAGIC, REVIEW_LOG_VERSION, REVIEW_RECORD.size))
+                f.write(b"".join(packed))
+    
+    def __len__(self):
+        try:
+            size = os.path.getsize(self.file_path)
+        except OSError:
+            return 0
+        return max(0, (size - REVIEW_LOG_HEADER.size) // REVIEW_RECORD.size)
+    
+    def _mapped(self):
+        """Devuelve (mmap, número de registros), volviendo a mapear si el archivo creció"""
+        count = len(self)
+        if count == 0:
+            return None, 0
+        size = REVIEW_LOG_HEADER.size + count * REVIEW_RECORD.size
+        if self._map is None or self._map_size != size:
+            with open(self.file_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            magic, version, record_size = REVIEW_LOG_HEADER.unpack_from(mapped, 0)
+            if magic != REVIEW_LOG_MAGIC or record_size != REVIEW_RECORD.size:
+                raise DataLoadError(f"{self.file_path} no es un registro de repasos válido")
+            # El mapa anterior se libera cuando no queden vistas que lo usen
+            self._map, self._map_size = mapped, size
+            if len(self.items) < self._max_code_hint(count):
+                self._load_items()
+        return self._map, count
+    
+    def _max_code_hint(self, count):
+        # Basta con comprobar el último registro: los códigos nuevos se añaden al final
+        _, code, _, _, _ = REVIEW_RECORD.unpack_from(
+            self._map, REVIEW_LOG_HEADER.size + (count - 1) * REVIEW_RECORD.size)
+        return code + 1
+    
+    def columns(self):
+        """Vista estructurada (NumPy) de todos los registros sin copiarlos, o None sin NumPy"""
+        if np is None:
+            return None
+        mapped, count = self._mapped()
+        if mapped is None:
+            return np.zeros(0, dtype=REVIEW_DTYPE)
+        return np.frombuffer(mapped, dtype=REVIEW_DTYPE, count=count, offset=REVIEW_LOG_HEADER.size)
+    
+    def iter_records(self, start=0, stop=None):
+        """Genera tuplas (ts_ms, código, latencia_ms, resultado, origen) de los registros [start, stop)"""
+        mapped, count = self._mapped()
+        if mapped is None:
+            return
+        stop = count if stop is None else min(stop, count)
+        begin = REVIEW_LOG_HEADER.size + start * REVIEW_RECORD.size
+        end = REVIEW_LOG_HEADER.size + stop * REVIEW_RECORD.size
+        with memoryview(mapped) as view:
+            yield from REVIEW_RECORD.iter_unpack(view[begin:end])
+    
+    def _position_for(self, ts_ms, count):
+        """Primer registro con marca de tiempo >= ts_ms (búsqueda binaria sobre el mapa)"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if REVIEW_RECORD.unpack_from(self._map, REVIEW_LOG_HEADER.size + middle * REVIEW_RECORD.size)[0] < ts_ms:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def time_range(self, start=None, end=None):
+        """Registros con marca de tiempo en [start, end) (segundos Unix)
+        
+        Los eventos se anexan en orden cronológico, así que basta una búsqueda binaria:
+        con NumPy se devuelve una porción de la vista (sin copia); sin NumPy, una lista.
+        """
+        mapped, count = self._mapped()
+        start_ms = None if start is None else int(start * 1000)
+        end_ms = None if end is None else int(end * 1000)
+        if np is not None:
+            records = self.columns()
+            first = 0 if start_ms is None else int(np.searchsorted(records["ts"], start_ms, side="left"))
+            last = len(records) if end_ms is None else int(np.searchsorted(records["ts"], end_ms, side="left"))
+            return records[first:last]
+        if mapped is None:
+            return []
+        first = 0 if start_ms is None else self._position_for(start_ms, count)
+        last = count if end_ms is None else self._position_for(end_ms, count)
+        return list(self.iter_records(first, last))
+    
+    def item_events(self, item):
+        """Eventos de un carácter (array estructurado con NumPy, lista de tuplas sin él)"""
+        code = self.codes.get(item)
+        if code is None:
+            self._load_items()
+            code = self.codes.get(item)
+        if np is not None:
+            records = self.columns()
+            return records[records["item"] == code] if code is not None else records[:0]
+        if code is None:
+            return []
+        return [record for record in self.iter_records() if record[1] == code]
+    
+    def item_stats(self, since=None):
+        """Estadísticas por carácter: repasos, correctas, incorrectas, latencia media y último repaso
+        
+        Solo cuentan las respuestas (no las tarjetas mostradas) para correctas,
+        incorrectas y latencia. `since` limita a los eventos posteriores (segundos Unix).
+        """
+        stats = {}
+        if np is not None:
+            records = self.time_range(since)
+            if not len(records):
+                return stats
+            size = int(records["item"].max()) + 1
+            items = records["item"]
+            answered = records["result"] != REVIEW_SHOWN
+            reviews = np.bincount(items, minlength=size)
+            correct = np.bincount(items, weights=records["result"] == REVIEW_CORRECT, minlength=size)
+            answers = np.bincount(items, weights=answered, minlength=size)
+            latency = np.bincount(items, weights=np.where(answered, records["latency_ms"], 0), minlength=size)
+            last = np.zeros(size, dtype=np.int64)
+            np.maximum.at(last, items, records["ts"])
+            for code in np.nonzero(reviews)[0]:
+                code = int(code)
+                stats[self.items[code]] = {
+                    "reviews": int(reviews[code]),
+                    "correct": int(correct[code]),
+                    "incorrect": int(answers[code] - correct[code]),
+                    "mean_latency_ms": float(latency[code] / answers[code]) if answers[code] else 0.0,
+                    "last_ts": int(last[code]) / 1000,
+                }
+            return stats
+        
+        since_ms = None if since is None else int(since * 1000)
+        totals = {}
+        for ts, code, latency_ms, result, _ in self.iter_records():
+            if since_ms is not None and ts < since_ms:
+                continue
+            entry = totals.setdefault(code, [0, 0, 0, 0, 0])
+            entry[0] += 1
+            if result != REVIEW_SHOWN:
+                entry[1 if result == REVIEW_CORRECT else 2] += 1
+                entry[3] += latency_ms
+            entry[4] = max(entry[4], ts)
+        for code, (reviews, correct, incorrect, latency, last) in totals.items():
+            answers = correct + incorrect
+            stats[self.items[code]] = {"reviews": reviews, "correct": correct, "incorrect": incorrect,
+                                       "mean_latency_ms": latency / answers if answers else 0.0,
+                                       "last_ts": last / 1000}
+        return stats
+    
+    def daily_counts(self, days=30):
+        """Repasos, correctas e incorrectas por día en los últimos `days` días: [(fecha, r, c, i)]"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        first_day = today - timedelta(days=days - 1)
+        start = first_day.timestamp()
+        counts = [[0, 0, 0] for _ in range(days)]
+        
+        if np is not None:
+            records = self.time_range(start)
+            if len(records):
+                # Índice de día según la hora local del equipo
+                offset = int(first_day.timestamp() * 1000)
+                day_index = ((records["ts"] - offset) // 86400000).astype(np.int64)
+                valid = (day_index >= 0) & (day_index < days)
+                day_index = day_index[valid]
+                results = records["result"][valid]
+                reviews = np.bincount(day_index, minlength=days)
+                correct = np.bincount(day_index, weights=results == REVIEW_CORRECT, minlength=days)
+                incorrect = np.bincount(day_index, weights=results == REVIEW_INCORRECT, minlength=days)
+                counts = [[int(r), int(c), int(i)] for r, c, i in zip(reviews, correct, incorrect)]
+        else:
+            offset = int(start * 1000)
+            for ts, _, _, result, _ in self.time_range(start):
+                index = (ts - offset) // 86400000
+                if 0 <= index < days:
+                    counts[index][0] += 1
+                    if result == REVIEW_CORRECT:
+                        counts[index][1] += 1
+                    elif result == REVIEW_INCORRECT:
+                        counts[index][2] += 1
+        return [((first_day + timedelta(days=i)).strftime("%Y-%m-%d"), *counts[i]) for i in range(days)]
+
+REVIEW_RESULT_NAMES = {REVIEW_INCORRECT: "incorrect", REVIEW_CORRECT: "correct", REVIEW_SHOWN: "shown"}
+REVIEW_SOURCE_NAMES = {REVIEW_SOURCE_QUIZ: "quiz", REVIEW_SOURCE_FLASH: "flash"}
+
+def iter_review_rows(review_log):
+    """Convierte los eventos del registro de repasos en filas legibles (fecha ISO y carácter)"""
+    items = review_log.items
+    for ts, code, latency_ms, result, source in review_log.iter_records():
+        if code >= len(items):
+            review_log._load_items()
+            items = review_log.items
+        yield [datetime.fromtimestamp(ts / 1000).isoformat(timespec="milliseconds"), items[code],
+               REVIEW_RESULT_NAMES.get(result, result), latency_ms, REVIEW_SOURCE_NAMES.get(source, source)]
+
+def export_review_log(review_log, file_path, progress=None, progress_every=10000):
+    """Exporta en streaming el registro de repasos a CSV o JSON Lines (opcionalmente comprimido)"""
+    format_type = export_format_for(file_path)
+    header = ["timestamp", "char", "result", "latency_ms", "source"]
+    total = len(review_log)
+    count = 0
+    with open_export_file(file_path) as f:
+        writer = csv.writer(f) if format_type == "csv" else None
+        if writer:
+            writer.writerow(header)
+        for row in iter_review_rows(review_log):
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(dict(zip(header, row)), ensure_ascii=False) + "\n")
+            count += 1
+            if progress is not None and count % progress_every == 0:
+                progress(count, total)
+    return count
+
+def run_sync(sync_dir, data_file=DATA_FILE, state_file=SYNC_STATE_FILE):
+    """Sincroniza un archivo de datos sin interfaz (por ejemplo, desde un script del aula)"""
+    progress_file = ProgressFile(data_file)
+    data = progress_file.load() or {}
+    history = data.setdefault('study_history', {})
+    difficult = set(data.get('difficult_characters', []))
+    achievement_data = data.setdefault('achievement_data', {})
+    state = SyncState(state_file)
+    state.load()
+    
+    summary = sync_with_directory(sync_dir, history, difficult, achievement_data, state)
+    # Publicar no cambia el historial: solo hay que guardarlo si llegaron cambios de otros equipos
+    if summary["imported_files"]:
+        data['difficult_characters'] = sorted(difficult)
+        progress_file.save(data, indent=2)
+    state.save()
+    return summary
+
+# Reproducción del historial a partir de eventos de repaso (modo --replay)
+REVIEW_RESULT_CODES = {name: code for code, name in REVIEW_RESULT_NAMES.items()}
+DAY_MS = 86400000
+
+DEFAULT_REPLAY_CONFIGS = [
+    {"name": "actual", "intervals": [1, 3, 7, 14, 30, 90, 180], "difficulty_weight": 2.0, "recency_weight": 1.5},
+    {"name": "corto", "intervals": [1, 2, 4, 8, 16, 32, 64], "difficulty_weight": 2.0, "recency_weight": 3.0},
+]
+
+def load_review_events(source):
+    """Lee un flujo de eventos de repaso y lo devuelve en columnas ordenadas por tiempo
+    
+    `source` puede ser el registro binario (ReviewLog o su ruta) o una exportación CSV o
+    JSON Lines de él (también .gz/.xz). Devuelve (ts_ms, códigos, resultados, caracteres):
+    arrays de NumPy si está disponible (si no, listas) y la tabla código -> carácter.
+    """
+    if isinstance(source, ReviewLog) or not isinstance(source, str) or source.lower().endswith(".bin"):
+        review_log = source if isinstance(source, ReviewLog) else ReviewLog(source)
+        review_log._load_items()
+        names = list(review_log.items)
+        if np is not None:
+            records = review_log.columns()
+            ts, items, results = records["ts"].copy(), records["item"].astype(np.int64), records["result"].copy()
+        else:
+            ts, items, results = [], [], []
+            for timestamp, code, _, result, _ in review_log.iter_records():
+                ts.append(timestamp)
+                items.append(code)
+                results.append(result)
+    else:
+        codes = {}
+        names = []
+        ts, items, results = array('q'), array('q'), array('B')
+        with open_export_file(source, 'r') as f:
+            rows = (json.loads(line) for line in f if line.strip()) \
+                if export_format_for(source) == "jsonl" else csv.DictReader(f)
+            for row in rows:
+                code = codes.get(row["char"])
+                if code is None:
+                    code = codes[row["char"]] = len(names)
+                    names.append(row["char"])
+                stamp = row["timestamp"]
+                ts.append(int(float(stamp) * 1000) if not isinstance(stamp, str) or stamp.replace('.', '', 1).isdigit()
+                          else int(datetime.fromisoformat(stamp).timestamp() * 1000))
+                items.append(code)
+                results.append(REVIEW_RESULT_CODES[row["result"]])
+        if np is not None:
+            ts, items, results = np.frombuffer(ts, dtype=np.int64), np.frombuffer(items, dtype=np.int64), \
+                np.frombuffer(results, dtype=np.uint8)
+        else:
+            ts, items, results = list(ts), list(items), list(results)
+    
+    if np is not None:
+        order = np.argsort(ts, kind="stable")
+        return ts[order], items[order], results[order], names
+    order = sorted(range(len(ts)), key=ts.__getitem__)
+    return [ts[i] for i in order], [items[i] for i in order], [results[i] for i in order], names
+
+def _replay_columns(ts, items, results, intervals):
+    """Recorre los eventos por carácter en bloque y calcula el estado final y las medidas por repaso
+    
+    Reproduce las reglas de QuizEngine.grade con SRS: un acierto sube un nivel, un fallo
+    vuelve al 0. Para los difíciles se sigue `correct_answers_count`: un fallo marca el
+    carácter y pone la cuenta a 0, cada acierto mientras es difícil la incrementa y al
+    llegar a 3 se quita. Devuelve un diccionario de columnas por carácter y por repaso
+    (listas o arrays).
+    """
+    max_level = len(intervals) - 1
+    if np is not None:
+        interval_ms = np.asarray(intervals, dtype=np.int64) * DAY_MS
+        size = int(items.max()) + 1 if len(items) else 0
+        shown = np.bincount(items, minlength=size)
+        correct = np.bincount(items, weights=results == REVIEW_CORRECT, minlength=size).astype(np.int64)
+        incorrect = np.bincount(items, weights=results == REVIEW_INCORRECT, minlength=size).astype(np.int64)
+        last_shown = np.zeros(size, dtype=np.int64)
+        np.maximum.at(last_shown, items, ts)
+        
+        # Respuestas ordenadas por carácter y, dentro de cada uno, por tiempo
+        answered = results != REVIEW_SHOWN
+        order = np.argsort(items[answered], kind="stable")
+        item_seq, ts_seq = items[answered][order], ts[answered][order]
+        wrong = results[answered][order] == REVIEW_INCORRECT
+        n = len(item_seq)
+        position = np.arange(n)
+        first = np.r_[True, item_seq[1:] != item_seq[:-1]] if n else np.zeros(0, dtype=bool)
+        starts = np.flatnonzero(first)
+        ends = np.r_[starts[1:], n] - 1
+        group_start = np.repeat(starts, np.diff(np.r_[starts, n]))
+        # Último fallo hasta cada posición (o el inicio del grupo - 1): da la racha de aciertos
+        last_wrong = np.maximum.accumulate(np.where(wrong, position, group_start - 1)) if n else position
+        run = position - last_wrong
+        level = np.minimum(run, max_level)
+        # correct_answers_count: solo cuenta mientras el carácter es difícil, es decir, desde
+        # su último fallo, y vuelve a 0 con cada fallo; sigue difícil si no ha llegado a 3
+        difficult = (last_wrong[ends] >= starts) & (run[ends] < 3) if n else np.zeros(0, dtype=bool)
+        
+        # Cada repaso (no el primero de un carácter) frente al vencimiento según el nivel anterior
+        review = ~first
+        previous = position[review] - 1
+        due = ts_seq[previous] + interval_ms[level[previous]]
+        return {
+            "codes": np.flatnonzero(shown), "shown": shown, "correct": correct, "incorrect": incorrect,
+            "last_shown": last_shown, "srs_items": item_seq[ends], "srs_level": level[ends],
+            "last_review": ts_seq[ends], "next_review": ts_seq[ends] + interval_ms[level[ends]],
+            "difficult": item_seq[ends][difficult],
+            "review_early": ts_seq[review] < due, "review_correct": ~wrong[review],
+        }
+    
+    # Sin NumPy: una pasada por carácter sobre los eventos agrupados
+    interval_ms = [days * DAY_MS for days in intervals]
+    columns = {"codes": [], "shown": {}, "correct": {}, "incorrect": {}, "last_shown": {}, "srs_items": [],
+               "srs_level": [], "last_review": [], "next_review": [], "difficult": [],
+               "review_early": [], "review_correct": []}
+    grouped = defaultdict(list)
+    for timestamp, code, result in zip(ts, items, results):
+        grouped[code].append((timestamp, result))
+    for code in sorted(grouped):
+        events = grouped[code]
+        columns["codes"].append(code)
+        columns["shown"][code] = len(events)
+        columns["correct"][code] = sum(1 for _, result in events if result == REVIEW_CORRECT)
+        columns["incorrect"][code] = sum(1 for _, result in events if result == REVIEW_INCORRECT)
+        columns["last_shown"][code] = events[-1][0]
+        level = count = 0
+        difficult = False
+        last = None
+        for timestamp, result in events:
+            if result == REVIEW_SHOWN:
+                continue
+            if last is not None:
+                columns["review_early"].append(timestamp < last + interval_ms[level])
+                columns["review_correct"].append(result == REVIEW_CORRECT)
+            if result == REVIEW_CORRECT:
+                level = min(level + 1, max_level)
+                if difficult:
+                    count += 1
+                    if count >= 3:
+                        difficult = False
+                        count = 0
+            else:
+                level = count = 0
+                difficult = True
+            last = timestamp
+        if last is not None:
+            columns["srs_items"].append(code)
+            columns["srs_level"].append(level)
+            columns["last_review"].append(last)
+            columns["next_review"].append(last + interval_ms[level])
+            if difficult:
+                columns["difficult"].append(code)
+    return columns
+
+def _max_correct_streak(results):
+    """Racha máxima de aciertos en el orden temporal de las respuestas"""
+    if np is not None:
+        answers = results[results != REVIEW_SHOWN]
+        if not len(answers):
+            return 0
+        position = np.arange(len(answers))
+        last_wrong = np.maximum.accumulate(np.where(answers == REVIEW_INCORRECT, position, -1))
+        return int((position - last_wrong)[answers == REVIEW_CORRECT].max(initial=0))
+    best = streak = 0
+    for result in results:
+        if result == REVIEW_CORRECT:
+            streak += 1
+            best = max(best, streak)
+        elif result == REVIEW_INCORRECT:
+            streak = 0
+    return best
+
+def _iso_ms(ts_ms):
+    return datetime.fromtimestamp(int(ts_ms) / 1000).isoformat()
+
+def replay_review_events(events, intervals=None, hiragana_categories=None):
+    """Reconstruye de forma determinista el progreso a partir de un flujo de eventos
+    
+    `events` es lo que devuelve load_review_events. Devuelve un diccionario con el formato
+    del archivo de datos (study_history, difficult_characters, max_streak, achievements y
+    achievement_data). Las sesiones y el tiempo de estudio no están en el flujo y quedan a 0;
+    las fechas de desbloqueo de los logros son la del último evento.
+    """
+    ts, items, results, names = events
+    intervals = list(intervals or SRSScheduler().intervals)
+    if hiragana_categories is None:
+        hiragana_categories, _ = load_hiragana_content()
+    columns = _replay_columns(ts, items, results, intervals)
+    
+    study_history = {}
+    for code in columns["codes"]:
+        code = int(code)
+        study_history[names[code]] = {
+            "times_shown": int(columns["shown"][code]),
+            "correct": int(columns["correct"][code]),
+            "incorrect": int(columns["incorrect"][code]),
+            "last_shown": _iso_ms(columns["last_shown"][code]),
+        }
+    for code, level, last, next_review in zip(columns["srs_items"], columns["srs_level"],
+                                              columns["last_review"], columns["next_review"]):
+        study_history[names[int(code)]].update(
+            srs_level=int(level), last_review=_iso_ms(last), next_review=_iso_ms(next_review))
+    
+    # Días de estudio (fecha local) a partir de las horas distintas con actividad
+    hours = np.unique(np.asarray(ts) // 3600000).tolist() if np is not None else sorted({t // 3600000 for t in ts})
+    study_dates = sorted({datetime.fromtimestamp(hour * 3600).date().isoformat() for hour in hours})
+    
+    first_seen = {}
+    for code in (items.tolist() if np is not None else items):
+        if code not in first_seen:
+            first_seen[code] = len(first_seen)
+    achievement_data = {
+        'sessions_completed': 0,
+        'perfect_quiz_count': 0,
+        'max_streak': _max_correct_streak(results),
+        'study_dates': study_dates,
+        'total_study_time': 0,
+        'category_stats': compute_study_stats(study_history, hiragana_categories)["categories"],
+        'all_hiragana': [char for pairs in hiragana_categories.values() for char, _ in pairs],
+        'studied_chars': [names[code] for code in first_seen],
+    }
+    
+    unlock_date = _iso_ms(ts[-1]) if len(ts) else None
+    achievements = create_achievements()
+    for achievement in achievements:
+        if achievement.check_condition(achievement_data):
+            achievement.unlock_date = unlock_date
+    
+    return {
+        'difficult_characters': sorted(names[int(code)] for code in columns["difficult"]),
+        'study_history': study_history,
+        'max_streak': achievement_data['max_streak'],
+        'achievements': [a.to_dict() for a in achievements],
+        'achievement_data': achievement_data,
+        'app_version': APP_VERSION,
+        'schema_version': SCHEMA_VERSION,
+        'last_save': unlock_date,
+    }
+
+def evaluate_replay_config(events, config, horizon_days=30, top_n=10):
+    """Mide un flujo de eventos con otra configuración de intervalos y pesos de prioridad
+    
+    Por cada repaso se compara la fecha real con el vencimiento que habría fijado la
+    configuración: los repasos anticipados son carga que esa configuración evitaría, y la
+    precisión de los repasos a tiempo estima la retención en sus intervalos. Con el estado
+    final se prevé la carga de los próximos `horizon_days` días y los caracteres prioritarios.
+    """
+    ts, items, results, names = events
+    intervals = list(config.get("intervals", SRSScheduler().intervals))
+    columns = _replay_columns(ts, items, results, intervals)
+    
+    early = list(columns["review_early"]) if np is None else columns["review_early"]
+    review_correct = columns["review_correct"]
+    reviews = len(early)
+    if np is not None:
+        early_count = int(early.sum())
+        on_time_correct = int(review_correct[~early].sum())
+        early_correct = int(review_correct[early].sum())
+    else:
+        early_count = sum(early)
+        on_time_correct = sum(1 for e, c in zip(early, review_correct) if not e and c)
+        early_correct = sum(1 for e, c in zip(early, review_correct) if e and c)
+    on_time = reviews - early_count
+    
+    # Carga prevista: vencimientos por día desde el final del flujo (los atrasados cuentan el día 0)
+    end = int(ts[-1]) if len(ts) else int(time.time() * 1000)
+    due_days = [max(0, (int(next_review) - end) // DAY_MS) for next_review in columns["next_review"]]
+    forecast = [0] * horizon_days
+    for day in due_days:
+        if day < horizon_days:
+            forecast[day] += 1
+    
+    # Prioridades de AdaptiveLearning con los pesos de la configuración al final del flujo
+    adaptive = AdaptiveLearning()
+    adaptive.difficulty_weight = config.get("difficulty_weight", adaptive.difficulty_weight)
+    adaptive.recency_weight = config.get("recency_weight", adaptive.recency_weight)
+    adaptive.clock = lambda: datetime.fromtimestamp(end / 1000)
+    history = {names[int(code)]: {"times_shown": int(columns["shown"][code]),
+                                  "incorrect": int(columns["incorrect"][code]),
+                                  "last_shown": _iso_ms(columns["last_shown"][code])}
+               for code in columns["codes"]}
+    top = heapq.nlargest(top_n, history, key=lambda char: adaptive.calculate_priority(char, history))
+    
+    levels = defaultdict(int)
+    for level in columns["srs_level"]:
+        levels[int(level)] += 1
+    return {
+        "name": config.get("name", "config"),
+        "intervals": intervals,
+        "reviews": reviews,
+        "early_reviews_pct": round(early_count / reviews * 100, 2) if reviews else 0.0,
+        "on_time_retention_pct": round(on_time_correct / on_time * 100, 2) if on_time else 0.0,
+        "early_accuracy_pct": round(early_correct / early_count * 100, 2) if early_count else 0.0,
+        "due_today": forecast[0] if forecast else 0,
+        "due_next_7_days": sum(forecast[:7]),
+        f"due_next_{horizon_days}_days": sum(forecast),
+        "mean_daily_load": round(sum(forecast) / horizon_days, 2) if horizon_days else 0.0,
+        "difficult": len(columns["difficult"]),
+        "srs_levels": dict(sorted(levels.items())),
+        "top_priority": top,
+    }
+
+def default_replay_configs(data_file=DATA_FILE):
+    """Configuraciones que compara --replay por defecto: las de DEFAULT_REPLAY_CONFIGS y,
+    si el perfil tiene parámetros ajustados con --optimize, también esos
+    """
+    configs = [dict(config) for config in DEFAULT_REPLAY_CONFIGS]
+    params = load_model_params(params_path_for(data_file))
+    if params:
+        fitted = {"name": "ajustada"}
+        if params.get("srs", {}).get("intervals"):
+            fitted["intervals"] = [int(days) for days in params["srs"]["intervals"]]
+        for name in ("difficulty_weight", "recency_weight"):
+            if name in params.get("adaptive", {}):
+                fitted[name] = float(params["adaptive"][name])
+        configs.append(fitted)
+    return configs
+
+def run_replay(source, configs=None, output_file=None, horizon_days=30, data_file=DATA_FILE):
+    """Reproduce un flujo de eventos, opcionalmente escribe el progreso reconstruido y compara configuraciones"""
+    started = time.perf_counter()
+    events = load_review_events(source)
+    loaded = time.perf_counter()
+    configs = configs or default_replay_configs(data_file)
+    data = replay_review_events(events, configs[0].get("intervals"))
+    if output_file:
+        write_json_atomic(output_file, json.dumps(data, ensure_ascii=False, indent=2))
+    results = [evaluate_replay_config(events, config, horizon_days) for config in configs]
+    return {
+        "events": len(events[0]),
+        "characters": len(data['study_history']),
+        "difficult": len(data['difficult_characters']),
+        "max_streak": data['max_streak'],
+        "achievements": [a["id"] for a in data['achievements'] if a["unlocked"]],
+        "load_seconds": round(loaded - started, 3),
+        "replay_seconds": round(time.perf_counter() - loaded, 3),
+        "configs": results,
+    }
+
+def format_replay_report(report):
+    """Informe de texto con las configuraciones en columnas, una al lado de otra"""
+    configs = report["configs"]
+    lines = [f"Eventos: {report['events']}  Caracteres: {report['characters']}  "
+             f"Difíciles: {report['difficult']}  Racha máxima: {report['max_streak']}  "
+             f"(carga {report['load_seconds']} s, reproducción {report['replay_seconds']} s)", ""]
+    width = max(12, *(len(config["name"]) for config in configs),
+                *(len('/'.join(map(str, config["intervals"]))) for config in configs))
+    keys = [key for key in configs[0] if key not in ("name", "srs_levels", "top_priority", "intervals")]
+    lines.append(f"{'':<24}" + "".join(f"{config['name']:>{width + 2}}" for config in configs))
+    lines.append(f"{'intervals':<24}" + "".join(
+        f"{'/'.join(map(str, config['intervals'])):>{width + 2}}" for config in configs))
+    for key in keys:
+        lines.append(f"{key:<24}" + "".join(f"{config[key]:>{width + 2}}" for config in configs))
+    for config in configs:
+        lines.append(f"prioridad ({config['name']}): {' '.join(config['top_priority'])}")
+    return "\n".join(lines)
+
+# Ajuste de los parámetros de AdaptiveLearning y del SRS (modo --optimize)
+MODEL_PARAMS_FORMAT = 1
+SRS_TARGET_RETENTION = 0.9  # Recuerdo esperado al vencer un intervalo del SRS
+
+def params_path_for(data_file):
+    """Archivo de parámetros ajustados de un perfil (junto a su archivo de datos)"""
+    return f"{os.path.splitext(data_file)[0]}.params"
+
+def review_log_path_for(data_file):
+    """Registro de repasos de un perfil: el de la aplicación de escritorio para el archivo
+    de datos predeterminado y `<nombre>_reviews.bin` junto a cualquier otro"""
+    if os.path.abspath(data_file) == os.path.abspath(DATA_FILE):
+        return REVIEW_LOG_FILE
+    return f"{os.path.splitext(data_file)[0]}_reviews.bin"
+
+def review_features(events, max_level=6):
+    """Calcula con NumPy, para cada respuesta que no es la primera de su carácter, las
+    variables de AdaptiveLearning y del SRS en el momento de responder
     
-    if category not in data['category_stats']:
-        return False
+    Devuelve arrays: recalled (acierto), error_rate (fallos / veces mostrado hasta
+    entonces), recency (min(días desde la última vez / 7, 1)), frequency (1 / (1 + veces
+    mostrado)), level (nivel SRS previo), elapsed (días desde la respuesta anterior),
+    gap (días desde el evento anterior, sin tope) e item (código del carácter). Las
+    muestras salen agrupadas por carácter y, dentro de cada uno, en orden temporal.
+    """
+    if np is None:
+        raise HiraganaTrainerError("El ajuste de parámetros necesita NumPy (pip install numpy)")
+    ts, items, results, _ = events
+    order = np.argsort(items, kind="stable")
+    item_seq, ts_seq, result_seq = items[order], ts[order], results[order]
+    n = len(item_seq)
+    position = np.arange(n)
+    first = np.r_[True, item_seq[1:] != item_seq[:-1]] if n else np.zeros(0, dtype=bool)
+    starts = np.flatnonzero(first)
+    group_start = np.repeat(starts, np.diff(np.r_[starts, n]))
     
-    stats = data['category_stats'][category]
-    return stats.get('accuracy', 0) >= threshold
+    # Contadores de todos los eventos (también tarjetas mostradas) anteriores a cada uno
+    shown_before = position - group_start
+    wrong = result_seq == REVIEW_INCORRECT
+    wrong_before = np.cumsum(wrong) - wrong
+    wrong_before = wrong_before - wrong_before[group_start]
+    gap = np.where(first, 0, ts_seq - ts_seq[np.maximum(position - 1, 0)]) / DAY_MS
+    
+    # Secuencia de respuestas: nivel SRS previo y días desde la respuesta anterior
+    answered = result_seq != REVIEW_SHOWN
+    answer_items, answer_ts, answer_wrong = item_seq[answered], ts_seq[answered], wrong[answered]
+    m = len(answer_items)
+    answer_position = np.arange(m)
+    answer_first = np.r_[True, answer_items[1:] != answer_items[:-1]] if m else np.zeros(0, dtype=bool)
+    answer_starts = np.flatnonzero(answer_first)
+    answer_group_start = np.repeat(answer_starts, np.diff(np.r_[answer_starts, m]))
+    last_wrong = np.maximum.accumulate(np.where(answer_wrong, answer_position, answer_group_start - 1)) \
+        if m else answer_position
+    level_after = np.minimum(answer_position - last_wrong, max_level)
+    previous = np.maximum(answer_position - 1, 0)
+    
+    sample = ~answer_first & (shown_before[answered] > 0)
+    shown = shown_before[answered][sample]
+    return {
+        "recalled": ~answer_wrong[sample],
+        "error_rate": wrong_before[answered][sample] / shown,
+        "recency": np.minimum(gap[answered][sample] / 7, 1.0),
+        "frequency": 1.0 / (1.0 + shown),
+        "level": level_after[previous][sample],
+        "elapsed": (answer_ts - answer_ts[previous])[sample] / DAY_MS,
+        "gap": gap[answered][sample],
+        "item": answer_items[sample],
+    }
 
-def check_consecutive_days(data, days_required):
-    """Verifica si se ha estudiado durante días consecutivos"""
-    if 'study_dates' not in data or len(data['study_dates']) < days_required:
-        return False
+def adaptive_log_likelihood(features, difficulty_weight, recency_weight, frequency_weight, iterations=60):
+    """Log-verosimilitud del modelo P(recordar) = sigmoide(b - prioridad) con b ajustado
     
-    # Convertir fechas de texto a objetos datetime
-    study_dates = [datetime.fromisoformat(date) for date in data['study_dates']]
-    study_dates.sort()
+    La prioridad es la de AdaptiveLearning (sin el término de latencia) y el sesgo b se
+    obtiene con Newton protegido por bisección: el gradiente es decreciente en b, así que
+    cada iteración acota el óptimo y un paso que se sale del intervalo se sustituye por
+    su punto medio (Newton solo, desde lejos, puede dispararse). Devuelve
+    (log-verosimilitud, b).
+    """
+    recalled = features["recalled"]
+    priority = (difficulty_weight * features["error_rate"] + recency_weight * features["recency"]
+                + frequency_weight * features["frequency"])
+    # Fuera de [min - 40, max + 40] todas las probabilidades son 0 o 1 en coma flotante
+    low, high = float(priority.min()) - 40.0, float(priority.max()) + 40.0
+    recalled_count = float(recalled.sum())
+    bias = 0.0
+    for _ in range(iterations):
+        p = 0.5 * (1 + np.tanh((bias - priority) / 2))  # Sigmoide sin desbordamiento
+        gradient = recalled_count - float(p.sum())
+        if abs(gradient) <= 1e-9 * len(priority) or high - low < 1e-9:
+            break
+        if gradient > 0:
+            low = bias
+        else:
+            high = bias
+        hessian = float((p * (1 - p)).sum())
+        step = bias + gradient / hessian if hessian > 0 else low
+        bias = step if low < step < high else (low + high) / 2
+    z = bias - priority
+    log_likelihood = -(np.logaddexp(0, -z[recalled]).sum() + np.logaddexp(0, z[~recalled]).sum())
+    return float(log_likelihood), bias
+
+def interval_log_likelihood(features, intervals, target=SRS_TARGET_RETENTION):
+    """Log-verosimilitud de P(recordar) = target ** (días transcurridos / intervalo del nivel)"""
+    interval = np.asarray(intervals, dtype=float)[np.minimum(features["level"], len(intervals) - 1)]
+    p = np.clip(target ** (features["elapsed"] / interval), 1e-6, 1 - 1e-6)
+    recalled = features["recalled"]
+    return float(np.log(p[recalled]).sum() + np.log1p(-p[~recalled]).sum())
+
+def interval_ladder(first, growth, levels=7):
+    """Escalera de intervalos first * growth**nivel, en días enteros y estrictamente creciente"""
+    ladder = []
+    for level in range(levels):
+        days = max(1, int(round(first * growth ** level)))
+        ladder.append(max(days, ladder[-1] + 1) if ladder else days)
+    return ladder
+
+_optimizer_features = None
+
+def _init_optimizer_worker(features):
+    """Inicializa cada proceso trabajador con las variables de las respuestas"""
+    global _optimizer_features
+    _optimizer_features = features
+
+def _evaluate_candidates(task):
+    """Evalúa un lote de candidatos ("adaptive" o "intervals") en un proceso trabajador"""
+    kind, candidates = task
+    results = []
+    for candidate in candidates:
+        if kind == "adaptive":
+            log_likelihood, bias = adaptive_log_likelihood(_optimizer_features, *candidate)
+            results.append((log_likelihood, list(candidate) + [bias]))
+        else:
+            results.append((interval_log_likelihood(_optimizer_features, candidate), list(candidate)))
+    return results
+
+def optimize_parameters(sources, samples=400, workers=None, seed=0):
+    """Ajusta los pesos de AdaptiveLearning y los intervalos del SRS a registros de repasos
     
-    # Verificar secuencia consecutiva
-    max_consecutive = 1
-    current_consecutive = 1
+    `sources` son uno o varios registros (un estudiante o una cohorte). Los pesos se buscan
+    al azar y los intervalos en una rejilla (primer intervalo × crecimiento), repartiendo
+    los candidatos entre procesos; gana la mayor log-verosimilitud del recuerdo observado.
+    """
+    from concurrent.futures import ProcessPoolExecutor
     
-    for i in range(1, len(study_dates)):
-        date_diff = (study_dates[i].date() - study_dates[i-1].date()).days
-        
-        if date_diff == 1:
-            current_consecutive += 1
-            max_consecutive = max(max_consecutive, current_consecutive)
-        elif date_diff > 1:
-            current_consecutive = 1
+    if isinstance(sources, str):
+        sources = [sources]
+    default_scheduler, default_adaptive = SRSScheduler(), AdaptiveLearning()
+    parts = [review_features(load_review_events(source), len(default_scheduler.intervals) - 1)
+             for source in sources]
+    features = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    count = len(features["recalled"])
+    if count == 0:
+        raise HiraganaTrainerError("No hay repasos suficientes para ajustar los parámetros")
     
-    return max_consecutive >= days_required
+    rng = random.Random(seed)
+    defaults = (default_adaptive.difficulty_weight, default_adaptive.recency_weight,
+                default_adaptive.frequency_weight)
+    adaptive_candidates = [defaults] + [(rng.uniform(0, 5), rng.uniform(0, 5), rng.uniform(0, 5))
+                                        for _ in range(samples)]
+    interval_candidates = [list(default_scheduler.intervals)] + [
+        interval_ladder(first, growth) for first in (0.5, 1, 1.5, 2, 3, 4)
+        for growth in np.linspace(1.5, 4.0, 11).tolist()]
+    
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, len(adaptive_candidates) // (workers * 4))
+    tasks = [("adaptive", adaptive_candidates[i:i + chunk]) for i in range(0, len(adaptive_candidates), chunk)]
+    tasks += [("intervals", interval_candidates[i:i + 8]) for i in range(0, len(interval_candidates), 8)]
+    
+    started = time.perf_counter()
+    adaptive_results, interval_results = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_optimizer_worker,
+                             initargs=(features,)) as executor:
+        for task, results in zip(tasks, executor.map(_evaluate_candidates, tasks)):
+            (adaptive_results if task[0] == "adaptive" else interval_results).extend(results)
+    
+    best_adaptive = max(adaptive_results, key=lambda result: result[0])
+    best_intervals = max(interval_results, key=lambda result: result[0])
+    difficulty_weight, recency_weight, frequency_weight, bias = best_adaptive[1]
+    return {
+        "format": MODEL_PARAMS_FORMAT,
+        "fitted": datetime.now().isoformat(timespec="seconds"),
+        "sources": list(sources),
+        "reviews": count,
+        "seconds": round(time.perf_counter() - started, 2),
+        "adaptive": {
+            "difficulty_weight": round(difficulty_weight, 4),
+            "recency_weight": round(recency_weight, 4),
+            "frequency_weight": round(frequency_weight, 4),
+            "bias": round(bias, 4),
+            "log_likelihood": round(best_adaptive[0], 3),
+            "default_log_likelihood": round(adaptive_results[0][0], 3),
+        },
+        "srs": {
+            "intervals": best_intervals[1],
+            "target_retention": SRS_TARGET_RETENTION,
+            "log_likelihood": round(best_intervals[0], 3),
+            "default_log_likelihood": round(interval_results[0][0], 3),
+        },
+    }
 
-def check_all_chars_studied(data):
-    """Verifica si se han estudiado todos los caracteres hiragana"""
-    if 'all_hiragana' not in data or 'studied_chars' not in data:
-        return False
+def load_model_params(file_path):
+    """Lee los parámetros ajustados de un perfil; None si no existen o no son válidos"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("No se pudieron leer los parámetros ajustados de %s: %s", file_path, e)
+        return None
+    if params.get("format") != MODEL_PARAMS_FORMAT:
+        logger.warning("Formato de parámetros desconocido en %s", file_path)
+        return None
+    return params
+
+def apply_model_params(params, srs_scheduler=None, adaptive_learning=None):
+    """Aplica los parámetros ajustados al planificador SRS y al aprendizaje adaptativo"""
+    if srs_scheduler is not None and params.get("srs", {}).get("intervals"):
+        srs_scheduler.intervals = [int(days) for days in params["srs"]["intervals"]]
+    if adaptive_learning is not None:
+        # Un peso negativo invertiría su regla (p. ej. priorizar lo más practicado): se ignora
+        for name in ("difficulty_weight", "recency_weight", "frequency_weight"):
+            if name in params.get("adaptive", {}):
+                setattr(adaptive_learning, name, max(0.0, float(params["adaptive"][name])))
+
+# Modelo de retención: curva de olvido exponencial por carácter
+class RetentionModel:
+    """Curvas de olvido P(recordar tras t días) = exp(-t / S) ajustadas por carácter
     
-    all_hiragana = set(data['all_hiragana'])
-    studied_chars = set(data['studied_chars'])
+    La estabilidad S de todos los caracteres se ajusta a la vez a partir del registro de
+    repasos: cada respuesta (salvo la primera) es una muestra (días desde el evento
+    anterior, acierto) y se resuelve por máxima verosimilitud con iteraciones de Newton
+    vectorizadas (las sumas por carácter se hacen con np.bincount). Las respuestas
+    recientes pesan más (`decay` ** posición desde el final; con 0.99 cuentan unas 100
+    respuestas por carácter, así que uno con historial largo conserva su propia curva) y
+    una penalización tira de cada carácter hacia la estabilidad global, así que los que
+    tienen pocas respuestas no se van a los extremos. Las consultas devuelven arrays y no recorren los
+    caracteres en Python.
+    """
     
-    return all_hiragana.issubset(studied_chars)
+    MIN_STABILITY = 0.05   # días
+    MAX_STABILITY = 3650.0
+    
+    def __init__(self, names, stability, last_review, global_stability):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.stability = stability        # días, uno por carácter
+        self.last_review = last_review    # segundos epoch del último evento de cada carácter
+        self.global_stability = global_stability
+    
+    def __len__(self):
+        return len(self.names)
+    
+    @classmethod
+    def fit(cls, events, decay=0.99, prior_weight=1.0, iterations=15):
+        """Ajusta el modelo a unos eventos de load_review_events; None si no hay respuestas
+        
+        Necesita NumPy (lanza HiraganaTrainerError si falta, como review_features).
+        """
+        features = review_features(events)
+        ts, items, _, names = events
+        if not len(features["item"]) or not len(ts):
+            return None
+        size = len(names)
+        codes = features["item"].astype(np.int64)
+        elapsed = np.maximum(features["gap"], 1e-3)
+        recalled = features["recalled"]
+        
+        # Peso por recencia: las muestras vienen agrupadas por carácter y en orden temporal
+        n = len(codes)
+        last = np.r_[codes[1:] != codes[:-1], True]
+        group_end = np.flatnonzero(last)
+        end_of_sample = np.repeat(group_end, np.diff(np.r_[-1, group_end]))
+        weights = decay ** (end_of_sample - np.arange(n))
+        
+        lower, upper = -math.log(cls.MAX_STABILITY), -math.log(cls.MIN_STABILITY)
+        
+        def solve(log_rate, idx, bins, prior, tau):
+            # Newton sobre u = log(1/S): para un acierto log p = -x y para un fallo
+            # log(1 - e^-x), con x = t·e^u; el gradiente y la hessiana se suman por carácter
+            for _ in range(iterations):
+                x = np.exp(log_rate)[idx] * elapsed
+                em1 = np.expm1(np.minimum(x, 50.0))
+                gradient = np.where(recalled, -x, x / em1)
+                hessian = np.where(recalled, -x, x * (em1 - x * (em1 + 1)) / (em1 * em1))
+                g = np.bincount(idx, weights * gradient, bins) - tau * (log_rate - prior)
+                h = np.bincount(idx, weights * hessian, bins) - tau
+                log_rate = np.clip(log_rate - np.clip(g / np.minimum(h, -1e-9), -2.0, 2.0), lower, upper)
+            return log_rate
+        
+        pooled = solve(np.zeros(1), np.zeros(n, dtype=np.int64), 1, 0.0, 0.0)[0]
+        log_rate = solve(np.full(size, pooled), codes, size, pooled, prior_weight)
+        
+        last_review = np.full(size, np.nan)
+        np.fmax.at(last_review, items.astype(np.int64), ts / 1000.0)
+        seen = ~np.isnan(last_review)
+        keep = np.flatnonzero(seen)
+        return cls([names[i] for i in keep], np.exp(-log_rate[keep]), last_review[keep], float(math.exp(-pooled)))
+    
+    @classmethod
+    def from_review_log(cls, review_log):
+        """Ajusta el modelo con un ReviewLog (o su ruta); None sin NumPy o sin respuestas"""
+        if np is None:
+            return None
+        return cls.fit(load_review_events(review_log))
+    
+    def _positions(self, items):
+        # Índices de `items` en el modelo; -1 para los caracteres sin datos
+        if items is None:
+            return None
+        return np.fromiter((self.index.get(item, -1) for item in items), dtype=np.int64, count=len(items))
+    
+    def recall_probability(self, items=None, at=None):
+        """Probabilidad de recordar cada carácter en el instante `at`
+        
+        `items` es una lista de caracteres (None: todos los del modelo, en el orden de
+        `names`) y `at` una fecha, segundos epoch o un array de segundos (por defecto,
+        ahora). Los caracteres que el modelo no conoce dan NaN.
+        """
+        if at is None:
+            at = time.time()
+        elif isinstance(at, datetime):
+            at = at.timestamp()
+        positions = self._positions(items)
+        if positions is None:
+            stability, last_review = self.stability, self.last_review
+        else:
+            safe = np.maximum(positions, 0)
+            stability, last_review = self.stability[safe], self.last_review[safe]
+        elapsed = np.maximum(np.asarray(at, dtype=float) - last_review, 0.0) / 86400.0
+        recall = np.exp(-elapsed / stability)
+        if positions is not None:
+            recall = np.where(positions >= 0, recall, np.nan)
+        return recall
+    
+    def next_below(self, threshold, items=None):
+        """Segundos epoch en que la probabilidad de recordar bajará de `threshold`"""
+        positions = self._positions(items)
+        stability = self.stability if positions is None else self.stability[np.maximum(positions, 0)]
+        last_review = self.last_review if positions is None else self.last_review[np.maximum(positions, 0)]
+        moment = last_review - stability * math.log(threshold) * 86400.0
+        if positions is not None:
+            moment = np.where(positions >= 0, moment, np.nan)
+        return moment
+    
+    def items_below(self, threshold, at=None):
+        """Caracteres cuya probabilidad de recordar en `at` es menor que `threshold`"""
+        recall = self.recall_probability(at=at)
+        return [self.names[i] for i in np.flatnonzero(recall < threshold)]
+    
+    def weakest(self, k, at=None):
+        """Los `k` caracteres con menor probabilidad de recordar, del más débil al menos"""
+        recall = self.recall_probability(at=at)
+        k = min(k, len(recall))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(recall, k - 1)[:k]
+        return [self.names[i] for i in candidates[np.argsort(recall[candidates], kind="stable")]]
+    
+    def summary(self, at=None, threshold=0.5):
+        """Media de la probabilidad de recordar y cuántos caracteres están por debajo de `threshold`"""
+        recall = self.recall_probability(at=at)
+        return {
+            "items": len(recall),
+            "mean_recall": float(recall.mean()) if len(recall) else None,
+            "below": int(np.count_nonzero(recall < threshold)),
+            "global_stability": self.global_stability,
+        }
+
+# Registro de tiempos de la interfaz (ventana oculta "Rendimiento", Ctrl+Shift+P)
+class PerfRegistry:
+    """Contadores e histogramas de latencia en memoria acotada, medidos con perf_counter_ns
+    
+    Cada nombre guarda [llamadas, total, mínimo, máximo] en nanosegundos y un histograma de
+    PERF_BUCKETS cubetas donde la cubeta b cuenta las duraciones de menos de 2**b µs. Se
+    admiten como mucho PERF_MAX_TIMERS nombres; los demás se ignoran.
+    Desactivado, `timed` solo comprueba `enabled` antes de llamar a la función.
+    """
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timers = {}
+        self.started = time.time()
+    
+    def record(self, name, elapsed_ns):
+        """Añade una medida (en nanosegundos) al temporizador `name`"""
+        timer = self.timers.get(name)
+        if timer is None:
+            if len(self.timers) >= PERF_MAX_TIMERS:
+                return
+            timer = self.timers[name] = [0, 0, elapsed_ns, elapsed_ns, [0] * PERF_BUCKETS]
+        timer[0] += 1
+        timer[1] += elapsed_ns
+        if elapsed_ns < timer[2]:
+            timer[2] = elapsed_ns
+        if elapsed_ns > timer[3]:
+            timer[3] = elapsed_ns
+        timer[4][min((elapsed_ns // 1000).bit_length(), PERF_BUCKETS - 1)] += 1
+    
+    @contextmanager
+    def measure(self, name):
+        """Context manager que mide el bloque si el registro está activado"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+    
+    def reset(self):
+        self.timers.clear()
+        self.started = time.time()
+    
+    @staticmethod
+    def _percentile(histogram, count, fraction):
+        # Límite superior (en ms) de la cubeta donde cae el percentil
+        target = count * fraction
+        seen = 0
+        for bucket, hits in enumerate(histogram):
+            seen += hits
+            if seen >= target:
+                return (1 << bucket) / 1000
+        return (1 << (len(histogram) - 1)) / 1000
+    
+    def snapshot(self):
+        """Resumen serializable: por temporizador, llamadas, tiempos en ms e histograma"""
+        timers = {}
+        for name, (count, total, low, high, histogram) in sorted(self.timers.items()):
+            timers[name] = {
+                "count": count,
+                "total_ms": total / 1e6,
+                "mean_ms": total / count / 1e6,
+                "min_ms": low / 1e6,
+                "max_ms": high / 1e6,
+                "p50_ms": self._percentile(histogram, count, 0.5),
+                "p95_ms": self._percentile(histogram, count, 0.95),
+                "histogram_us": {f"<{1 << bucket}": hits for bucket, hits in enumerate(histogram) if hits}
+            }
+        return {"enabled": self.enabled, "since": datetime.fromtimestamp(self.started).isoformat(),
+                "timers": timers}
+    
+    def dump(self, file_path):
+        """Escribe el resumen en un archivo JSON"""
+        write_json_atomic(file_path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))
+
+perf_registry = PerfRegistry(enabled=os.environ.get("HIRAGANA_PERF") == "1")
+
+def timed(name=None):
+    """Decorador que registra la duración de cada llamada en `perf_registry` si está activado"""
+    def decorator(func):
+        label = name or func.__qualname__
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not perf_registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                perf_registry.record(label, time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+def _engine_attribute(name):
+    """Crea una propiedad que delega el atributo en el motor de quiz"""
+    return property(
+        lambda self: getattr(self.quiz_engine, name),
+        lambda self, value: setattr(self.quiz_engine, name, value)
+    )
 
 # Clase principal de la aplicación
 class HiraganaTrainer:
+    # Estado compartido con el motor de quiz
+    hiragana_categories = _engine_attribute('hiragana_categories')
+    study_history = _engine_attribute('study_history')
+    difficult_characters = _engine_attribute('difficult_characters')
+    achievement_data = _engine_attribute('achievement_data')
+    score = _engine_attribute('score')
+    total_attempts = _engine_attribute('total_attempts')
+    streak = _engine_attribute('streak')
+    max_streak = _engine_attribute('max_streak')
+    last_answer_correct = _engine_attribute('last_answer_correct')
+    correct_answers_count = _engine_attribute('correct_answers_count')
+    current_quiz_question = _engine_attribute('current_quiz_question')
+    current_quiz_answer = _engine_attribute('current_quiz_answer')
+    correct_option_index = _engine_attribute('correct_option_index')
+    review_log = _engine_attribute('review_log')
+
     def __init__(self, root):
         """Inicializar la aplicación de entrenamiento de hiragana"""
+        load_tk()
         self.root = root
         self.root.title(f"Entrenador de Hiragana Avanzado v{APP_VERSION}")
         self.root.geometry("1000x650")
@@ -294,6 +4367,23 @@ class HiraganaTrainer:
         if os.path.exists(icon_path):
             self.root.iconbitmap(icon_path)
         
+        # Motor de quiz independiente de la interfaz (contiene el estado de aprendizaje)
+        self.srs_scheduler = SRSScheduler()
+        self.adaptive_learning = AdaptiveLearning()
+        self.quiz_engine = QuizEngine(srs_scheduler=self.srs_scheduler,
+                                      adaptive_learning=self.adaptive_learning)
+        self.progress_file = ProgressFile(DATA_FILE)
+        self.sync_state = SyncState(SYNC_STATE_FILE)
+        self.review_log = ReviewLog(REVIEW_LOG_FILE)
+        self.model_params = load_model_params(params_path_for(DATA_FILE))
+        if self.model_params:
+            apply_model_params(self.model_params, self.srs_scheduler, self.adaptive_learning)
+        self.retention_model = None     # RetentionModel ajustado en segundo plano
+        self._retention_log_size = None
+        self._retention_executor = None  # Hilo propio del ajuste (no bloquea importar/exportar)
+        self._retention_future = None
+        self._last_error_dialog = (None, 0.0)  # Último error mostrado en un diálogo (mensaje, instante)
+        
         # Variables de control de modo
         self.in_difficult_mode = False  # Para controlar si estamos en modo difíciles
         self.random_mode = tk.BooleanVar(value=True)
@@ -308,31 +4398,13 @@ class HiraganaTrainer:
         self.delay_var = tk.DoubleVar(value=3.0)
         self.time_display = tk.StringVar(value="3.0")
         self.progress_var = tk.StringVar(value="0/0")
-        self.score = 0
-        self.total_attempts = 0
-        self.streak = 0
-        self.max_streak = 0
         self.session_chars_shown = 0
-        self.difficult_characters = set()
         self.study_mode = tk.StringVar(value="flash")  # flash, quiz, inverse
-        self.study_history = {}  # Para seguimiento del aprendizaje
-        self.last_answer_correct = False
         self.session_start_time = datetime.now()
+        self.study_time_counted_at = self.session_start_time
         
         # Inicializar componentes avanzados
-        self.srs_scheduler = SRSScheduler()
-        self.adaptive_learning = AdaptiveLearning()
         self.achievements = create_achievements()
-        self.achievement_data = {
-            'sessions_completed': 0,
-            'perfect_quiz_count': 0,
-            'max_streak': 0,
-            'study_dates': [],
-            'total_study_time': 0,  # en minutos
-            'category_stats': {},
-            'all_hiragana': [],
-            'studied_chars': []
-        }
         
         # Variables para datos de hiragana
         self.import_hiragana_data()
@@ -346,14 +4418,12 @@ class HiraganaTrainer:
         self.quiz_mode = tk.StringVar(value="write")  # write, multiple
         self.quiz_direction = tk.StringVar(value="hira_to_rom")  # hira_to_rom, rom_to_hira
         self.quiz_difficult_only = tk.BooleanVar(value=False)
-        self.correct_answers_count = {}  # Para seguimiento de respuestas correctas consecutivas
         
         # Inicializar widgets críticos como None para evitar errores
         self.quiz_entry = None
         self.submit_btn = None
         self.next_btn = None
         self.option_buttons = []
-        self.correct_option_index = 0
         self.timer_id = None
         self.session_timer_id = None
         
@@ -368,6 +4438,7 @@ class HiraganaTrainer:
         
         # Cargar datos guardados
         self.load_data()
+        self.root.after(RETENTION_REFRESH_DELAY_MS, self.refresh_retention_model)
         
         # Configurar atajos de teclado
         self.setup_keyboard_shortcuts()
@@ -377,226 +4448,12 @@ class HiraganaTrainer:
     
     def import_hiragana_data(self):
         """Importa los datos de hiragana y ejemplos desde archivos o define los predeterminados"""
-        # Intentar cargar desde archivos JSON si existen
-        data_loaded = False
-        
-        try:
-            hiragana_file = "data/hiragana.json"
-            examples_file = "data/examples.json"
-            
-            if os.path.exists(hiragana_file) and os.path.exists(examples_file):
-                with open(hiragana_file, 'r', encoding='utf-8') as f:
-                    self.hiragana_categories = json.load(f)
-                with open(examples_file, 'r', encoding='utf-8') as f:
-                    self.example_words = json.load(f)
-                data_loaded = True
-        except Exception as e:
-            logger.error(f"Error al cargar archivos de datos: {e}")
-        
-        # Si no se pudieron cargar, usar los datos predeterminados
-        if not data_loaded:
-            # Hiragana categorizado
-            self.hiragana_categories = {
-                "Básicos": [
-                    ("あ", "a"), ("い", "i"), ("う", "u"), ("え", "e"), ("お", "o"),
-                    ("か", "ka"), ("き", "ki"), ("く", "ku"), ("け", "ke"), ("こ", "ko"),
-                    ("さ", "sa"), ("し", "shi"), ("す", "su"), ("せ", "se"), ("そ", "so"),
-                    ("た", "ta"), ("ち", "chi"), ("つ", "tsu"), ("て", "te"), ("と", "to"),
-                    ("な", "na"), ("に", "ni"), ("ぬ", "nu"), ("ね", "ne"), ("の", "no"),
-                    ("は", "ha"), ("ひ", "hi"), ("ふ", "fu"), ("へ", "he"), ("ほ", "ho"),
-                    ("ま", "ma"), ("み", "mi"), ("む", "mu"), ("め", "me"), ("も", "mo"),
-                    ("や", "ya"), ("ゆ", "yu"), ("よ", "yo"),
-                    ("ら", "ra"), ("り", "ri"), ("る", "ru"), ("れ", "re"), ("ろ", "ro"),
-                    ("わ", "wa"), ("を", "wo"), ("ん", "n")
-                ],
-                "Con dakuten": [
-                    ("が", "ga"), ("ぎ", "gi"), ("ぐ", "gu"), ("げ", "ge"), ("ご", "go"),
-                    ("ざ", "za"), ("じ", "ji"), ("ず", "zu"), ("ぜ", "ze"), ("ぞ", "zo"),
-                    ("だ", "da"), ("ぢ", "ji"), ("づ", "zu"), ("で", "de"), ("ど", "do"),
-                    ("ば", "ba"), ("び", "bi"), ("ぶ", "bu"), ("べ", "be"), ("ぼ", "bo"),
-                    ("ぱ", "pa"), ("ぴ", "pi"), ("ぷ", "pu"), ("ぺ", "pe"), ("ぽ", "po")
-                ],
-                "Combinados (yōon)": [
-                    ("きゃ", "kya"), ("きゅ", "kyu"), ("きょ", "kyo"),
-                    ("しゃ", "sha"), ("しゅ", "shu"), ("しょ", "sho"),
-                    ("ちゃ", "cha"), ("ちゅ", "chu"), ("ちょ", "cho"),
-                    ("にゃ", "nya"), ("にゅ", "nyu"), ("にょ", "nyo"),
-                    ("ひゃ", "hya"), ("ひゅ", "hyu"), ("ひょ", "hyo"),
-                    ("みゃ", "mya"), ("みゅ", "myu"), ("みょ", "myo"),
-                    ("りゃ", "rya"), ("りゅ", "ryu"), ("りょ", "ryo"),
-                    ("ぎゃ", "gya"), ("ぎゅ", "gyu"), ("ぎょ", "gyo"),
-                    ("じゃ", "ja"), ("じゅ", "ju"), ("じょ", "jo"),
-                    ("びゃ", "bya"), ("びゅ", "byu"), ("びょ", "byo"),
-                    ("ぴゃ", "pya"), ("ぴゅ", "pyu"), ("ぴょ", "pyo")
-                ]
-            }
-            
-            # Palabras de ejemplo para cada hiragana (solo algunas como demostración)
-            self.example_words = {
-                # Básicos - Vowels
-                "あ": ("あめ", "ame", "lluvia"),
-                "い": ("いぬ", "inu", "perro"),
-                "う": ("うみ", "umi", "mar"),
-                "え": ("えき", "eki", "estación"),
-                "お": ("おと", "oto", "sonido"),
-                
-                # Básicos - K-row
-                "か": ("かばん", "kaban", "bolso"),
-                "き": ("きって", "kitte", "sello postal"),
-                "く": ("くつ", "kutsu", "zapatos"),
-                "け": ("けいたい", "keitai", "teléfono móvil"),
-                "こ": ("こども", "kodomo", "niño"),
-                
-                # Básicos - S-row
-                "さ": ("さくら", "sakura", "cerezo"),
-                "し": ("しんぶん", "shinbun", "periódico"),
-                "す": ("すし", "sushi", "sushi"),
-                "せ": ("せんせい", "sensei", "profesor"),
-                "そ": ("そら", "sora", "cielo"),
-                
-                # Básicos - T-row
-                "た": ("たべもの", "tabemono", "comida"),
-                "ち": ("ちず", "chizu", "mapa"),
-                "つ": ("つくえ", "tsukue", "escritorio"),
-                "て": ("てがみ", "tegami", "carta"),
-                "と": ("とけい", "tokei", "reloj"),
-                
-                # Básicos - N-row
-                "な": ("なつ", "natsu", "verano"),
-                "に": ("にく", "niku", "carne"),
-                "ぬ": ("ぬま", "numa", "pantano"),
-                "ね": ("ねこ", "neko", "gato"),
-                "の": ("のみもの", "nomimono", "bebida"),
-                
-                # Básicos - H-row
-                "は": ("はな", "hana", "flor"),
-                "ひ": ("ひと", "hito", "persona"),
-                "ふ": ("ふゆ", "fuyu", "invierno"),
-                "へ": ("へや", "heya", "habitación"),
-                "ほ": ("ほん", "hon", "libro"),
-                
-                # Básicos - M-row
-                "ま": ("まど", "mado", "ventana"),
-                "み": ("みず", "mizu", "agua"),
-                "む": ("むし", "mushi", "insecto"),
-                "め": ("めがね", "megane", "gafas"),
-                "も": ("もり", "mori", "bosque"),
-                
-                # Básicos - Y-row
-                "や": ("やま", "yama", "montaña"),
-                "ゆ": ("ゆき", "yuki", "nieve"),
-                "よ": ("よる", "yoru", "noche"),
-                
-                # Básicos - R-row
-                "ら": ("らいねん", "rainen", "próximo año"),
-                "り": ("りんご", "ringo", "manzana"),
-                "る": ("るす", "rusu", "ausencia"),
-                "れ": ("れいぞうこ", "reizouko", "refrigerador"),
-                "ろ": ("ろうそく", "rousoku", "vela"),
-                
-                # Básicos - W-row and N
-                "わ": ("わたし", "watashi", "yo"),
-                "を": ("ほんをよむ", "hon wo yomu", "leer un libro"),
-                "ん": ("でんわ", "denwa", "teléfono"),
-                
-                # Con dakuten - G-row
-                "が": ("がっこう", "gakkou", "escuela"),
-                "ぎ": ("ぎんこう", "ginkou", "banco"),
-                "ぐ": ("ぐんて", "gunte", "guantes"),
-                "げ": ("げんき", "genki", "energía"),
-                "ご": ("ごはん", "gohan", "arroz"),
-                
-                # Con dakuten - Z-row
-                "ざ": ("ざっし", "zasshi", "revista"),
-                "じ": ("じかん", "jikan", "tiempo"),
-                "ず": ("みずうみ", "mizuumi", "lago"),
-                "ぜ": ("ぜんぶ", "zenbu", "todo"),
-                "ぞ": ("ぞう", "zou", "elefante"),
-                
-                # Con dakuten - D-row
-                "だ": ("だいがく", "daigaku", "universidad"),
-                "ぢ": ("はなぢ", "hanaji", "sangrado nasal"),
-                "づ": ("みづから", "mizukara", "por uno mismo"),
-                "で": ("でんしゃ", "densha", "tren"),
-                "ど": ("どあ", "doa", "puerta"),
-                
-                # Con dakuten - B-row
-                "ば": ("ばす", "basu", "autobús"),
-                "び": ("びょういん", "byouin", "hospital"),
-                "ぶ": ("ぶたにく", "butaniku", "carne de cerdo"),
-                "べ": ("べんきょう", "benkyou", "estudio"),
-                "ぼ": ("ぼうし", "boushi", "sombrero"),
-                
-                # Con dakuten - P-row (handakuten)
-                "ぱ": ("ぱん", "pan", "pan"),
-                "ぴ": ("ぴかぴか", "pikapika", "brillante"),
-                "ぷ": ("プール", "puuru", "piscina"),
-                "ぺ": ("ペン", "pen", "bolígrafo"),
-                "ぽ": ("ぽけっと", "poketto", "bolsillo"),
-                
-                # Combinados (yōon) - KY
-                "きゃ": ("きゃく", "kyaku", "invitado"),
-                "きゅ": ("きゅうり", "kyuuri", "pepino"),
-                "きょ": ("きょうと", "kyouto", "Kioto"),
-                
-                # Combinados (yōon) - SH
-                "しゃ": ("しゃしん", "shashin", "fotografía"),
-                "しゅ": ("しゅみ", "shumi", "afición"),
-                "しょ": ("しょうゆ", "shouyu", "salsa de soja"),
-                
-                # Combinados (yōon) - CH
-                "ちゃ": ("おちゃ", "ocha", "té verde"),
-                "ちゅ": ("ちゅうい", "chuui", "atención"),
-                "ちょ": ("ちょうちょ", "choucho", "mariposa"),
-                
-                # Combinados (yōon) - NY
-                "にゃ": ("にゃんこ", "nyanko", "gatito"),
-                "にゅ": ("にゅうがく", "nyuugaku", "ingreso escolar"),
-                "にょ": ("にょうぼう", "nyoubou", "esposa"),
-                
-                # Combinados (yōon) - HY
-                "ひゃ": ("ひゃく", "hyaku", "cien"),
-                "ひゅ": ("ひゅうが", "hyuuga", "Hyuga (nombre)"),
-                "ひょ": ("ひょう", "hyou", "leopardo"),
-                
-                # Combinados (yōon) - MY
-                "みゃ": ("みゃく", "myaku", "pulso"),
-                "みゅ": ("みゅーじっく", "myuujikku", "música"),
-                "みょ": ("みょうじ", "myouji", "apellido"),
-                
-                # Combinados (yōon) - RY
-                "りゃ": ("りゃくご", "ryakugo", "abreviación"),
-                "りゅ": ("りゅうがく", "ryuugaku", "estudiar en el extranjero"),
-                "りょ": ("りょうり", "ryouri", "cocina"),
-                
-                # Combinados (yōon) - GY
-                "ぎゃ": ("ぎゃくてん", "gyakuten", "revés, giro"),
-                "ぎゅ": ("ぎゅうにく", "gyuuniku", "carne de vaca"),
-                "ぎょ": ("ぎょうざ", "gyouza", "empanadilla china"),
-                
-                # Combinados (yōon) - J
-                "じゃ": ("じゃがいも", "jagaimo", "patata"),
-                "じゅ": ("じゅぎょう", "jugyou", "clase"),
-                "じょ": ("じょうず", "jouzu", "habilidoso"),
-                
-                # Combinados (yōon) - BY
-                "びゃ": ("びゃくや", "byakuya", "noche blanca"),
-                "びゅ": ("びゅうびゅう", "byuubyuu", "silbido del viento"),
-                "びょ": ("びょうき", "byouki", "enfermedad"),
-                
-                # Combinados (yōon) - PY
-                "ぴゃ": ("ぴゃのぴゃの", "pyanopyano", "débilmente"),
-                "ぴゅ": ("ぴゅあ", "pyua", "puro"),
-                "ぴょ": ("ぴょんぴょん", "pyonpyon", "saltar repetidamente"),
-            }
-        
-        # Recopilar todos los caracteres hiragana para logros y estadísticas
-        all_hiragana = []
-        for category in self.hiragana_categories.values():
-            for hiragana, _ in category:
-                all_hiragana.append(hiragana)
+        self.content_pack = load_content_pack()
+        self.hiragana_categories = self.content_pack.hiragana_categories
+        self.example_words = self.content_pack.example_words
         
-        self.achievement_data['all_hiragana'] = all_hiragana
+        # Todos los caracteres hiragana para logros y estadísticas (índice ya compilado)
+        self.achievement_data['all_hiragana'] = list(self.content_pack.all_kana)
     
     def setup_styles(self):
         """Configura los estilos visuales mejorados para la aplicación"""
@@ -684,6 +4541,7 @@ class HiraganaTrainer:
         self.root.bind("<F1>", lambda e: self.show_help())
         self.root.bind("<Control-q>", lambda e: self.on_closing())
         self.root.bind("<Control-s>", lambda e: self.save_data())
+        self.root.bind("<Control-P>", lambda e: self.show_performance_window())  # Ctrl+Shift+P (oculto)
         
         # Atajos para modo tarjetas flash
         self.root.bind("<space>", lambda e: self.toggle_practice())
@@ -779,7 +4637,11 @@ class HiraganaTrainer:
         file_menu.add_command(label="Cargar progreso", command=self.load_data)
         file_menu.add_separator()
         file_menu.add_command(label="Exportar estadísticas", command=self.export_statistics)
+        file_menu.add_command(label="Exportar datos (JSON)", command=lambda: self.export_statistics("json"))
+        file_menu.add_command(label="Exportar datos (JSON Lines)", command=lambda: self.export_statistics("jsonl"))
+        file_menu.add_command(label="Exportar historial de repasos", command=self.export_review_history)
         file_menu.add_command(label="Importar datos", command=self.import_data)
+        file_menu.add_command(label="Sincronizar con carpeta...", command=self.sync_data)
         file_menu.add_separator()
         file_menu.add_command(label="Salir", command=self.on_closing, 
                              accelerator="Ctrl+Q")
@@ -811,6 +4673,8 @@ class HiraganaTrainer:
         menubar.add_cascade(label="Herramientas", menu=tools_menu)
         tools_menu.add_command(label="Generador de sesión inteligente", 
                               command=self.generate_smart_session)
+        tools_menu.add_command(label="Práctica de pares confundidos",
+                              command=self.start_confusion_drill)
         tools_menu.add_command(label="Planificador de estudio", 
                               command=self.setup_study_plan)
         tools_menu.add_command(label="Ver logros", command=self.show_achievements)
@@ -1292,6 +5156,23 @@ class HiraganaTrainer:
         self.difficult_stats.pack(fill=tk.X)
         self.difficult_stats.config(state=tk.DISABLED)
         
+        # Previsión de repasos (franja de calendario)
+        forecast_frame = ttk.LabelFrame(stats_container, text=f"Previsión de Repasos ({FORECAST_DAYS} días)",
+                                        padding=10)
+        forecast_frame.pack(fill=tk.X, pady=5)
+        
+        self.forecast_lapses_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            forecast_frame,
+            text="Simular fallos esperados",
+            variable=self.forecast_lapses_var,
+            command=self.draw_forecast_strip
+        ).pack(anchor=tk.W)
+        
+        self.forecast_canvas = tk.Canvas(forecast_frame, height=62, highlightthickness=0, background="#f0f0f5")
+        self.forecast_canvas.pack(fill=tk.X)
+        self.forecast_canvas.bind("<Configure>", lambda event: self.draw_forecast_strip())
+        
         # Botones de acciones
         buttons_frame = ttk.Frame(stats_container)
         buttons_frame.pack(pady=10)
@@ -1395,11 +5276,46 @@ class HiraganaTrainer:
         
         ttk.Label(learning_frame, text="Algoritmo adaptativo:").pack(side=tk.LEFT, padx=(0, 10))
         
-        algo_types = ['Estándar', 'SRS Básico', 'SRS Avanzado', 'Personalizado']
         self.algo_var = tk.StringVar(value='Estándar')
-        algo_combo = ttk.Combobox(learning_frame, textvariable=self.algo_var, values=algo_types, state="readonly", width=15)
+        algo_combo = ttk.Combobox(learning_frame, textvariable=self.algo_var, values=list(QuizEngine.ALGORITHMS),
+                                  state="readonly", width=15)
         algo_combo.pack(side=tk.LEFT)
         
+        # Nivel de registro
+        log_frame = ttk.Frame(behavior_frame)
+        log_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(log_frame, text="Nivel de registro:").pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.log_level_var = tk.StringVar(value='INFO')
+        log_combo = ttk.Combobox(log_frame, textvariable=self.log_level_var, values=LOG_LEVELS, state="readonly", width=15)
+        log_combo.pack(side=tk.LEFT)
+        log_combo.bind("<<ComboboxSelected>>", lambda e: set_log_level(self.log_level_var.get()))
+        
+        # Romanizaciones aceptadas en hiragana -> romaji
+        romanization_frame = ttk.Frame(behavior_frame)
+        romanization_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(romanization_frame, text="Romanización aceptada:").pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.romanization_var = tk.StringVar(value='Todas')
+        romanization_combo = ttk.Combobox(romanization_frame, textvariable=self.romanization_var,
+                                          values=list(ROMANIZATION_CHOICES), state="readonly", width=15)
+        romanization_combo.pack(side=tk.LEFT)
+        romanization_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_romanization_setting())
+        
+        # Repasar antes de tiempo los caracteres que el modelo de retención da por olvidados
+        retention_frame = ttk.Frame(behavior_frame)
+        retention_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(retention_frame, text="Repasar si el recuerdo baja de:").pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.retention_threshold_var = tk.StringVar(value='Desactivado')
+        retention_combo = ttk.Combobox(retention_frame, textvariable=self.retention_threshold_var,
+                                       values=list(RETENTION_THRESHOLD_CHOICES), state="readonly", width=15)
+        retention_combo.pack(side=tk.LEFT)
+        retention_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_retention_setting())
+        
         # Planificación de estudio
         plan_frame = ttk.LabelFrame(settings_container, text="Planificación de Estudio", padding=10)
         plan_frame.pack(fill=tk.X, pady=5)
@@ -1547,6 +5463,7 @@ class HiraganaTrainer:
                 
                 # Si está en modo adaptativo avanzado, ordenar por prioridad
                 if hasattr(self, 'algo_var') and self.algo_var.get() == "SRS Avanzado":
+                    self.adaptive_learning.load_review_stats(self.review_log)
                     self.practice_list = self.adaptive_learning.sort_by_priority(
                         self.practice_list, self.study_history)
                 
@@ -1569,8 +5486,8 @@ class HiraganaTrainer:
     def apply_srs_filter(self):
         """Filtra la lista de práctica según el sistema SRS"""
         try:
-            # Obtener caracteres que deben repasarse hoy
-            due_chars = self.srs_scheduler.get_due_cards(self.study_history)
+            # Obtener caracteres que deben repasarse hoy (conjunto: se consulta por cada par)
+            due_chars = set(self.srs_scheduler.get_due_cards(self.study_history))
             
             if not due_chars:
                 messagebox.showinfo("SRS", "¡Felicidades! No hay caracteres pendientes para repasar hoy.")
@@ -1595,6 +5512,7 @@ class HiraganaTrainer:
         except Exception as e:
             self.log_error(f"Error al aplicar filtro SRS: {str(e)}")
     
+    @timed()
     def practice_hiragana(self):
         """Función principal para la práctica de hiragana"""
         try:
@@ -1641,10 +5559,11 @@ class HiraganaTrainer:
                 # Guardar el ID del temporizador para poder cancelarlo después
                 self.timer_id = self.root.after(delay_ms, self.practice_hiragana)
         except Exception as e:
-            self.log_error(f"Error en la práctica: {str(e)}")
+            self.log_error(f"Error en la práctica: {str(e)}", show_to_user=False)
             self.is_running = False
             if hasattr(self, 'start_button') and self.start_button is not None:
                 self.start_button.config(text="Iniciar")
+    @timed()
     def animate_card(self, hiragana, romanji):
         """Animación suave para la transición de tarjetas"""
         try:
@@ -1793,13 +5712,10 @@ class HiraganaTrainer:
     def update_hiragana_list(self):
         """Actualiza la lista de hiragana según las categorías seleccionadas"""
         try:
-            # Limpiar la lista actual
-            self.hiragana_list = []
-            
-            # Agregar los hiragana de las categorías seleccionadas
-            for category, var in self.category_vars.items():
-                if var.get():
-                    self.hiragana_list.extend(self.hiragana_categories[category])
+            # Recorrer una sola vez la unión (bitset) de las categorías seleccionadas
+            selected = [category for category, var in self.category_vars.items() if var.get()]
+            deck = self.quiz_engine.deck
+            self.hiragana_list = list(deck.pairs(deck.select(selected)))
             
             # Reiniciar índices y actualizar progreso
             self.current_index = 0
@@ -1868,6 +5784,7 @@ class HiraganaTrainer:
         except Exception as e:
             self.log_error(f"Error al marcar carácter: {str(e)}")
     
+    @timed()
     def update_difficult_chars_display(self):
         """Actualiza la visualización de caracteres difíciles"""
         # Limpiar el frame
@@ -1942,11 +5859,8 @@ class HiraganaTrainer:
                 return
                 
             # Crear una lista con solo los caracteres difíciles
-            difficult_list = []
-            for category in self.hiragana_categories.values():
-                for pair in category:
-                    if pair[0] in self.difficult_characters:
-                        difficult_list.append(pair)
+            deck = self.quiz_engine.deck
+            difficult_list = list(deck.pairs(deck.items_for(self.difficult_characters)))
             
             if not difficult_list:
                 messagebox.showinfo("Advertencia", "No se encontraron caracteres difíciles en las categorías seleccionadas.")
@@ -2027,40 +5941,29 @@ class HiraganaTrainer:
                 else:  # modo inverso
                     current_char = current_pair[1]  # Hiragana
                 
-                if current_char not in self.study_history:
-                    self.study_history[current_char] = {
-                        "times_shown": 0, 
-                        "correct": 0, 
-                        "incorrect": 0,
-                        "last_shown": datetime.now().isoformat()
-                    }
-                else:
-                    self.study_history[current_char]["last_shown"] = datetime.now().isoformat()
-                    
-                self.study_history[current_char]["times_shown"] += 1
-                
-                # Añadir a la lista de caracteres estudiados para logros
-                if current_char not in self.achievement_data['studied_chars']:
-                    self.achievement_data['studied_chars'].append(current_char)
+                # Historial, caracteres estudiados y registro de repasos (en el motor)
+                self.quiz_engine.record_shown(current_char)
             
             # Actualizar estadísticas de sesión en tiempo real
             self.update_session_stats()
         except Exception as e:
-            logger.error(f"Error al registrar carácter: {str(e)}")
+            logger.error("Error al registrar carácter: %s", e)
     
     def update_session_stats(self):
         """Actualiza las estadísticas de la sesión actual en tiempo real"""
         try:
             # Calcular estadísticas
-            session_duration = datetime.now() - self.session_start_time
+            now = datetime.now()
+            session_duration = now - self.session_start_time
             minutes = session_duration.total_seconds() / 60
             
             chars_per_minute = 0
             if minutes > 0:
                 chars_per_minute = self.session_chars_shown / minutes
                 
-            # Actualizar datos para logros
-            self.achievement_data['total_study_time'] += minutes / 60  # Convertir a horas
+            # Actualizar datos para logros: solo el tiempo desde la última actualización (en horas)
+            self.achievement_data['total_study_time'] += (now - self.study_time_counted_at).total_seconds() / 3600
+            self.study_time_counted_at = now
                 
             # Actualizar texto de estadísticas
             stats_text = (
@@ -2079,7 +5982,7 @@ class HiraganaTrainer:
             self.stats_text.insert(tk.END, stats_text)
             self.stats_text.config(state=tk.DISABLED)
         except Exception as e:
-            logger.error(f"Error al actualizar estadísticas de sesión: {str(e)}")
+            logger.error("Error al actualizar estadísticas de sesión: %s", e)
     
     # ==== Funciones de modo quiz ====
     
@@ -2100,7 +6003,7 @@ class HiraganaTrainer:
                 # Modo de escritura
                 ttk.Label(
                     self.quiz_response_frame,
-                    text=f"Escribe la {'pronunciación (romanji)' if self.quiz_direction.get() == 'hira_to_rom' else 'sílaba (hiragana)'}:",
+                    text=f"Escribe la {'pronunciación (romanji)' if self.quiz_direction.get() == 'hira_to_rom' else 'sílaba (hiragana, o en romaji y se convierte)'}:",
                     font=("Arial", 12, "bold")
                 ).pack(pady=(0, 10))
                 
@@ -2113,6 +6016,9 @@ class HiraganaTrainer:
                 )
                 self.quiz_entry.pack(pady=5)
                 self.quiz_entry.bind("<Return>", self.check_answer)
+                if self.quiz_direction.get() == "rom_to_hira":
+                    # Convertir a hiragana mientras se escribe en romaji
+                    self.quiz_entry.bind("<KeyRelease>", self.transliterate_quiz_entry)
                 
                 quiz_btn_frame = ttk.Frame(self.quiz_response_frame)
                 quiz_btn_frame.pack(pady=10)
@@ -2160,96 +6066,68 @@ class HiraganaTrainer:
                     btn.grid(row=row, column=col, padx=10, pady=5)
                     self.option_buttons.append(btn)
             
-            logger.info(f"Interfaz de quiz actualizada en modo: {self.quiz_mode.get()}")
+            logger.debug("Interfaz de quiz actualizada en modo: %s", self.quiz_mode.get())
             
         except Exception as e:
-            self.log_error(f"Error al actualizar la interfaz del quiz: {str(e)}")
+            self.log_error(f"Error al actualizar la interfaz del quiz: {str(e)}", show_to_user=False)
+    def _sync_quiz_engine(self):
+        """Copia la configuración de la interfaz al motor de quiz"""
+        engine = self.quiz_engine
+        engine.mode = self.quiz_mode.get()
+        engine.direction = self.quiz_direction.get()
+        engine.difficult_only = self.quiz_difficult_only.get()
+        engine.srs_mode = self.srs_mode.get()
+        engine.algorithm = self.algo_var.get() if hasattr(self, 'algo_var') else "Estándar"
+        engine.selected_categories = {category for category, var in self.category_vars.items() if var.get()}
+    
+    def _show_quiz_notices(self):
+        """Muestra al usuario los avisos generados por el motor de quiz"""
+        for notice in self.quiz_engine.notices:
+            if notice == "no_difficult":
+                messagebox.showinfo("Sin caracteres difíciles", "No hay caracteres marcados como difíciles.")
+                self.quiz_difficult_only.set(False)
+            elif notice == "srs_empty":
+                messagebox.showinfo("SRS", "No hay caracteres programados para hoy con la configuración actual.")
+                self.srs_mode.set(False)
+            elif notice == "empty":
+                messagebox.showinfo("Sin caracteres", "No hay caracteres disponibles con la configuración actual.")
+        self.quiz_engine.notices = []
+    
     def update_quiz_questions(self):
         """Actualiza la lista de preguntas disponibles para el quiz"""
         try:
-            # Si solo caracteres difíciles está activado
-            if self.quiz_difficult_only.get():
-                if not self.difficult_characters:
-                    messagebox.showinfo("Sin caracteres difíciles", "No hay caracteres marcados como difíciles.")
-                    self.quiz_difficult_only.set(False)
-                    return
-                    
-                # Crear lista con caracteres difíciles
-                self.quiz_available_chars = []
-                for category in self.hiragana_categories.values():
-                    for pair in category:
-                        if pair[0] in self.difficult_characters:
-                            if self.quiz_direction.get() == "hira_to_rom":
-                                self.quiz_available_chars.append(pair)  # hiragana -> romanji
-                            else:
-                                self.quiz_available_chars.append((pair[1], pair[0]))  # romanji -> hiragana
-            else:
-                # Usar todas las categorías seleccionadas
-                self.quiz_available_chars = []
-                for category, var in self.category_vars.items():
-                    if var.get():
-                        for pair in self.hiragana_categories[category]:
-                            if self.quiz_direction.get() == "hira_to_rom":
-                                self.quiz_available_chars.append(pair)  # hiragana -> romanji
-                            else:
-                                self.quiz_available_chars.append((pair[1], pair[0]))  # romanji -> hiragana
-            
-            # Si está activado el SRS, filtrar por caracteres a repasar
-            if self.srs_mode.get():
-                due_chars = self.srs_scheduler.get_due_cards(self.study_history)
-                if due_chars:
-                    self.quiz_available_chars = [pair for pair in self.quiz_available_chars 
-                                              if pair[0] in due_chars]
-            
-            if not self.quiz_available_chars:
-                if self.srs_mode.get():
-                    messagebox.showinfo("SRS", "No hay caracteres programados para hoy con la configuración actual.")
-                    self.srs_mode.set(False)
-                else:
-                    messagebox.showinfo("Sin caracteres", "No hay caracteres disponibles con la configuración actual.")
-                
-                # Volver a cargar todos los caracteres
-                self.update_quiz_questions()
+            self._sync_quiz_engine()
+            self.quiz_available_chars = self.quiz_engine.build_pool()
+            self._show_quiz_notices()
         except Exception as e:
             self.log_error(f"Error al actualizar preguntas: {str(e)}")
     
+    @timed()
     def load_quiz_question(self):
         """Carga una nueva pregunta de quiz según la configuración actual"""
         try:
-            # Actualizar lista de preguntas disponibles
-            self.update_quiz_questions()
+            self._sync_quiz_engine()
+            try:
+                question_data = self.quiz_engine.next_question()
+            except QuizGenerationError:
+                question_data = None
+            self._show_quiz_notices()
             
             # Verificar si hay caracteres disponibles
-            if not hasattr(self, 'quiz_available_chars') or not self.quiz_available_chars:
+            if question_data is None:
                 if hasattr(self, 'quiz_char_label') and self.quiz_char_label is not None:
                     self.quiz_char_label.config(text="")
                 if hasattr(self, 'quiz_result_var') and self.quiz_result_var is not None:
                     self.quiz_result_var.set("No hay caracteres disponibles")
                 return
             
-            # Elegir un carácter aleatorio o según prioridad
-            try:
-                if hasattr(self, 'algo_var') and self.algo_var.get() == "SRS Avanzado":
-                    # Ordenar por prioridad y tomar el primero
-                    sorted_chars = self.adaptive_learning.sort_by_priority(
-                        self.quiz_available_chars, self.study_history)
-                    question, answer = sorted_chars[0]
-                else:
-                    # Elegir aleatoriamente
-                    random_idx = random.randint(0, len(self.quiz_available_chars) - 1)
-                    question, answer = self.quiz_available_chars[random_idx]
-            except Exception as e:
-                logger.error(f"Error al seleccionar carácter: {e}")
-                question, answer = self.quiz_available_chars[0]  # Usar el primero como fallback
+            question = question_data["question"]
+            answer = question_data["answer"]
             
             # Mostrar la pregunta si existe el widget
             if hasattr(self, 'quiz_char_label') and self.quiz_char_label is not None:
                 self.quiz_char_label.config(text=question)
             
-            # Guardar la respuesta correcta
-            self.current_quiz_answer = answer
-            self.current_quiz_question = question
-            
             # Limpiar resultado anterior si existe
             if hasattr(self, 'quiz_result_var') and self.quiz_result_var is not None:
                 self.quiz_result_var.set("")
@@ -2262,71 +6140,60 @@ class HiraganaTrainer:
                         self.quiz_entry.delete(0, tk.END)
                         self.quiz_entry.focus_set()
                     except Exception as e:
-                        logger.error(f"Error al manipular quiz_entry: {e}")
+                        logger.error("Error al manipular quiz_entry: %s", e)
                 
                 if hasattr(self, 'submit_btn') and self.submit_btn is not None:
                     try:
                         self.submit_btn.config(state=tk.NORMAL)
                     except Exception as e:
-                        logger.error(f"Error al configurar submit_btn: {e}")
+                        logger.error("Error al configurar submit_btn: %s", e)
                 
                 if hasattr(self, 'next_btn') and self.next_btn is not None:
                     try:
                         self.next_btn.config(state=tk.DISABLED)
                     except Exception as e:
-                        logger.error(f"Error al configurar next_btn: {e}")
+                        logger.error("Error al configurar next_btn: %s", e)
             else:
                 # Modo opción múltiple con botones directos
-                try:
-                    if not hasattr(self, 'option_buttons') or not self.option_buttons:
-                        logger.warning("No se encontraron option_buttons")
-                        return
-                    
-                    # Generar opciones incorrectas
-                    all_answers = [pair[1] if self.quiz_direction.get() == "hira_to_rom" else pair[0] 
-                                for pair in self.quiz_available_chars]
-                    incorrect_options = [opt for opt in all_answers if opt != answer]
-                    
-                    # Seleccionar 3 opciones aleatorias
-                    if len(incorrect_options) >= 3:
-                        random.shuffle(incorrect_options)
-                        options = incorrect_options[:3] + [answer]
-                    else:
-                        # Si no hay suficientes opciones, duplicar algunas
-                        options = incorrect_options + [answer]
-                        while len(options) < 4:
-                            if incorrect_options:
-                                options.append(random.choice(incorrect_options))
-                            else:
-                                # Si no hay opciones incorrectas (muy improbable), rellenar con la respuesta
-                                options.append(answer)
-                    
-                    # Mezclar las opciones
-                    random.shuffle(options)
-                    
-                    # Guardar el índice de la respuesta correcta
-                    self.correct_option_index = options.index(answer)
-                    
-                    # Actualizar los botones con las opciones
-                    for i, option in enumerate(options):
-                        if i < len(self.option_buttons):
-                            self.option_buttons[i].config(text=option, state=tk.NORMAL, style="TButton")
-                    
-                except Exception as e:
-                    logger.error(f"Error al generar opciones múltiples: {e}")
-                    # En caso de error, simplemente usar opciones genéricas
-                    for i in range(min(4, len(self.option_buttons))):
-                        self.option_buttons[i].config(
-                            text=f"Opción {i+1}" if i != 0 else answer, 
-                            state=tk.NORMAL, 
-                            style="TButton"
-                        )
-                    self.correct_option_index = 0
+                if not hasattr(self, 'option_buttons') or not self.option_buttons:
+                    logger.warning("No se encontraron option_buttons")
+                    return
+                
+                # Actualizar los botones con las opciones generadas por el motor
+                for i, option in enumerate(question_data["options"]):
+                    if i < len(self.option_buttons):
+                        self.option_buttons[i].config(text=option, state=tk.NORMAL, style="TButton")
                     
-            logger.info(f"Pregunta cargada: {question} -> {answer}")
+            logger.debug("Pregunta cargada: %s -> %s", question, answer)
             
         except Exception as e:
-            self.log_error(f"Error al cargar pregunta: {str(e)}")
+            self.log_error(f"Error al cargar pregunta: {str(e)}", show_to_user=False)
+    
+    def _apply_grade_result(self, result):
+        """Refleja en la interfaz el resultado de una respuesta corregida por el motor"""
+        if result["correct"] and result.get("user_answer") != result["answer"] and result.get("variant"):
+            # Aceptada con otra romanización: se muestra también la del mazo
+            self.quiz_result_var.set(f"¡Correcto! ({ROMANIZATION_NAMES.get(result['variant'], result['variant'])}; "
+                                     f"también: {result['answer']})")
+        elif result["correct"]:
+            self.quiz_result_var.set("¡Correcto!")
+        else:
+            self.quiz_result_var.set(f"Incorrecto. La respuesta es: {result['answer']}")
+        
+        if result["mastered"] is not None or result["marked_difficult"] is not None:
+            self.update_difficult_chars_display()
+        
+        if result["mastered"] is not None:
+            messagebox.showinfo("¡Mejorado!", 
+                               f"El carácter '{result['mastered']}' ya no está marcado como difícil después de 3 respuestas correctas.")
+        
+        self.update_quiz_stats()
+        
+        # Verificar logro de quiz perfecto (20+ preguntas con 100% acierto)
+        if result["perfect_quiz"]:
+            self.check_achievements()
+    
+    @timed()
     def check_answer(self, event=None):
         """Comprueba la respuesta escrita por el usuario"""
         try:
@@ -2335,96 +6202,33 @@ class HiraganaTrainer:
             if not user_answer:
                 messagebox.showinfo("Respuesta vacía", "Por favor, escribe una respuesta.")
                 return
-                
-            correct_answer = self.current_quiz_answer.lower()
-            
-            # Registrar en estudio
-            current_char = self.current_quiz_question
-            if current_char not in self.study_history:
-                self.study_history[current_char] = {
-                    "times_shown": 0, 
-                    "correct": 0, 
-                    "incorrect": 0,
-                    "last_shown": datetime.now().isoformat()
-                }
-            else:
-                self.study_history[current_char]["last_shown"] = datetime.now().isoformat()
-            
-            # Añadir a la lista de caracteres estudiados para logros
-            if current_char not in self.achievement_data['studied_chars']:
-                self.achievement_data['studied_chars'].append(current_char)
-            
-            # Procesar resultado con SRS si está activado
-            is_correct = user_answer == correct_answer
-            if self.srs_mode.get():
-                self.srs_scheduler.calculate_next_review(
-                    self.study_history[current_char], is_correct)
-            
-            if is_correct:
-                self.quiz_result_var.set("¡Correcto!")
-                self.last_answer_correct = True
-                self.score += 1
-                self.streak += 1
-                self.max_streak = max(self.max_streak, self.streak)
-                self.study_history[current_char]["correct"] += 1
-                
-                # Actualizar estadísticas para logros
-                self.achievement_data['max_streak'] = max(
-                    self.achievement_data['max_streak'], self.streak)
-                
-                # Si era difícil y se responde correctamente 3 veces seguidas, lo quitamos de difíciles
-                if current_char in self.difficult_characters:
-                    if not hasattr(self, 'correct_answers_count'):
-                        self.correct_answers_count = {}
-                    
-                    self.correct_answers_count[current_char] = self.correct_answers_count.get(current_char, 0) + 1
-                    
-                    if self.correct_answers_count.get(current_char, 0) >= 3:
-                        self.difficult_characters.remove(current_char)
-                        self.update_difficult_chars_display()
-                        messagebox.showinfo("¡Mejorado!", 
-                                           f"El carácter '{current_char}' ya no está marcado como difícil después de 3 respuestas correctas.")
-                        self.correct_answers_count[current_char] = 0
-            else:
-                self.quiz_result_var.set(f"Incorrecto. La respuesta es: {correct_answer}")
-                self.last_answer_correct = False
-                self.streak = 0
-                self.study_history[current_char]["incorrect"] += 1
-                
-                # Marcar automáticamente como difícil
-                if self.quiz_direction.get() == "hira_to_rom":
-                    self.difficult_characters.add(current_char)
-                else:
-                    # Buscar el hiragana correspondiente al romanji
-                    for cat in self.hiragana_categories.values():
-                        for h, r in cat:
-                            if r == current_char:
-                                self.difficult_characters.add(h)
-                                break
-                
-                self.update_difficult_chars_display()
-                
-                # Resetear contadores de aciertos consecutivos
-                if hasattr(self, 'correct_answers_count') and current_char in self.correct_answers_count:
-                    self.correct_answers_count[current_char] = 0
-            
-            # Actualizar estadísticas
-            self.study_history[current_char]["times_shown"] += 1
-            self.total_attempts += 1
-            self.update_quiz_stats()
             
-            # Verificar logro de quiz perfecto (20+ preguntas con 100% acierto)
-            if (self.score >= 20 and self.score == self.total_attempts and 
-                self.achievement_data['perfect_quiz_count'] == 0):
-                self.achievement_data['perfect_quiz_count'] = 1
-                self.check_achievements()
+            self._sync_quiz_engine()
+            result = self.quiz_engine.grade(user_answer)
+            self._apply_grade_result(result)
             
             # Deshabilitar el botón de enviar y habilitar el de siguiente
             self.submit_btn.config(state=tk.DISABLED)
             self.next_btn.config(state=tk.NORMAL)
             self.next_btn.focus_set()
         except Exception as e:
-            self.log_error(f"Error al comprobar respuesta: {str(e)}")
+            self.log_error(f"Error al comprobar respuesta: {str(e)}", show_to_user=False)
+    
+    def transliterate_quiz_entry(self, event=None):
+        """Convierte a hiragana el romaji escrito en quiz_entry, dejando en romaji lo que aún
+        puede formar una sílaba (p. ej. "ky")
+        """
+        entry = self.quiz_entry
+        if entry is None:
+            return
+        text = entry.get()
+        converted = romaji_to_kana(text, final=False)
+        if converted != text:
+            # Conservar la posición del cursor respecto al final del texto
+            after_cursor = len(text) - entry.index(tk.INSERT)
+            entry.delete(0, tk.END)
+            entry.insert(0, converted)
+            entry.icursor(max(0, len(converted) - after_cursor))
     
     def check_answer_from_button(self, selected_idx):
         """Comprueba la respuesta seleccionada directamente con un botón"""
@@ -2433,102 +6237,17 @@ class HiraganaTrainer:
             for btn in self.option_buttons:
                 btn.config(state=tk.DISABLED)
             
-            # Obtener la respuesta seleccionada
-            selected_text = self.option_buttons[selected_idx].cget("text")
-            correct_text = self.current_quiz_answer
-            
-            # Registrar en estudio
-            current_char = self.current_quiz_question
-            if current_char not in self.study_history:
-                self.study_history[current_char] = {
-                    "times_shown": 0, 
-                    "correct": 0, 
-                    "incorrect": 0,
-                    "last_shown": datetime.now().isoformat()
-                }
-            else:
-                self.study_history[current_char]["last_shown"] = datetime.now().isoformat()
-            
-            # Añadir a la lista de caracteres estudiados para logros
-            if current_char not in self.achievement_data['studied_chars']:
-                self.achievement_data['studied_chars'].append(current_char)
-                
-            # Determinar si la respuesta es correcta
-            is_correct = selected_text == correct_text
+            self._sync_quiz_engine()
+            result = self.quiz_engine.grade_option(selected_idx)
             
-            # Procesar resultado con SRS si está activado
-            if self.srs_mode.get():
-                self.srs_scheduler.calculate_next_review(
-                    self.study_history[current_char], is_correct)
-                    
-            # Comprobar si es correcta
-            if is_correct:
-                # Respuesta correcta
-                self.quiz_result_var.set("¡Correcto!")
-                self.last_answer_correct = True
-                self.score += 1
-                self.streak += 1
-                self.max_streak = max(self.max_streak, self.streak)
-                self.study_history[current_char]["correct"] += 1
-                
-                # Actualizar estadísticas para logros
-                self.achievement_data['max_streak'] = max(
-                    self.achievement_data['max_streak'], self.streak)
-                
-                # Cambiar color del botón
+            # Resaltar visualmente la respuesta elegida y, si falla, la correcta
+            if result["correct"]:
                 self.option_buttons[selected_idx].config(style="Correct.TButton")
-                
-                # Si era difícil y se responde correctamente 3 veces seguidas
-                if current_char in self.difficult_characters:
-                    if not hasattr(self, 'correct_answers_count'):
-                        self.correct_answers_count = {}
-                    
-                    self.correct_answers_count[current_char] = self.correct_answers_count.get(current_char, 0) + 1
-                    
-                    if self.correct_answers_count.get(current_char, 0) >= 3:
-                        self.difficult_characters.remove(current_char)
-                        self.update_difficult_chars_display()
-                        messagebox.showinfo("¡Mejorado!", 
-                                           f"El carácter '{current_char}' ya no está marcado como difícil después de 3 respuestas correctas.")
-                        self.correct_answers_count[current_char] = 0
             else:
-                # Respuesta incorrecta
-                self.quiz_result_var.set(f"Incorrecto. La respuesta es: {correct_text}")
-                self.last_answer_correct = False
-                self.streak = 0
-                self.study_history[current_char]["incorrect"] += 1
-                
-                # Marcar como difícil
-                if self.quiz_direction.get() == "hira_to_rom":
-                    self.difficult_characters.add(current_char)
-                else:
-                    # Buscar el hiragana correspondiente al romanji
-                    for cat in self.hiragana_categories.values():
-                        for h, r in cat:
-                            if r == current_char:
-                                self.difficult_characters.add(h)
-                                break
-                
-                # Resaltar visualmente la respuesta incorrecta y la correcta
                 self.option_buttons[selected_idx].config(style="Incorrect.TButton")
-                
-                # Buscar y resaltar la opción correcta
                 self.option_buttons[self.correct_option_index].config(style="Correct.TButton")
-                
-                # Resetear contadores de aciertos consecutivos
-                if hasattr(self, 'correct_answers_count') and current_char in self.correct_answers_count:
-                    self.correct_answers_count[current_char] = 0
-            
-            # Actualizar estadísticas
-            self.study_history[current_char]["times_shown"] += 1
-            self.total_attempts += 1
-            self.update_quiz_stats()
             
-            # Verificar logro de quiz perfecto
-            if (self.score >= 20 and self.score == self.total_attempts and 
-                self.achievement_data['perfect_quiz_count'] == 0):
-                self.achievement_data['perfect_quiz_count'] = 1
-                self.check_achievements()
+            self._apply_grade_result(result)
             
             # Avanzar automáticamente después de un tiempo
             self.root.after(1500, self.next_quiz_question)
@@ -2546,7 +6265,7 @@ class HiraganaTrainer:
         self.attempts_var.set(str(self.total_attempts))
         
         if self.total_attempts > 0:
-            accuracy = (self.score / self.total_attempts) * 100
+            accuracy = self.quiz_engine.accuracy()
             self.accuracy_var.set(f"{accuracy:.1f}%")
             
             # Actualizar barra de progreso
@@ -2562,9 +6281,7 @@ class HiraganaTrainer:
     def reset_quiz(self):
         """Reinicia las estadísticas del quiz actual y comienza uno nuevo"""
         if messagebox.askyesno("Confirmar", "¿Quieres reiniciar las estadísticas del quiz actual?"):
-            self.score = 0
-            self.total_attempts = 0
-            self.streak = 0
+            self.quiz_engine.reset_quiz()
             
             # Actualizar estadísticas
             self.update_quiz_stats()
@@ -2574,33 +6291,25 @@ class HiraganaTrainer:
     
     # ==== Funciones de estadísticas y logros ====
     
+    @timed()
     def update_stats_display(self):
         """Actualiza la visualización de estadísticas en la pestaña correspondiente"""
         try:
-            # Estadísticas generales
-            total_shown = sum(char_data.get("times_shown", 0) for char_data in self.study_history.values())
-            total_correct = sum(char_data.get("correct", 0) for char_data in self.study_history.values())
-            total_incorrect = sum(char_data.get("incorrect", 0) for char_data in self.study_history.values())
-            
-            # Calcular precisión solo si hay intentos
-            if total_correct + total_incorrect > 0:
-                accuracy = (total_correct / (total_correct + total_incorrect) * 100)
-                accuracy_text = f"{accuracy:.1f}%"
-            else:
-                accuracy_text = "0.0%"
+            stats = compute_study_stats(self.study_history, self.hiragana_categories,
+                                        self.difficult_characters)
             
-            # Calcular progreso total
+            # Estadísticas generales
             total_chars = len(self.achievement_data['all_hiragana'])
-            studied_chars = len(self.study_history)
+            studied_chars = stats["studied_chars"]
             progress_percent = (studied_chars / total_chars * 100) if total_chars > 0 else 0
             
             # Generar texto para mostrar
             general_stats_text = (
                 f"Total de caracteres estudiados: {studied_chars}/{total_chars} ({progress_percent:.1f}%)\n"
-                f"Total de repeticiones: {total_shown}\n"
-                f"Respuestas correctas: {total_correct}\n"
-                f"Respuestas incorrectas: {total_incorrect}\n"
-                f"Precisión general: {accuracy_text}\n"
+                f"Total de repeticiones: {stats['total_shown']}\n"
+                f"Respuestas correctas: {stats['total_correct']}\n"
+                f"Respuestas incorrectas: {stats['total_incorrect']}\n"
+                f"Precisión general: {stats['accuracy']:.1f}%\n"
                 f"Mejor racha: {self.max_streak}\n"
                 f"Caracteres difíciles: {len(self.difficult_characters)}\n\n"
                 f"Tiempo total de estudio: {self.achievement_data['total_study_time']:.1f} horas\n"
@@ -2608,6 +6317,18 @@ class HiraganaTrainer:
                 f"Logros desbloqueados: {sum(1 for a in self.achievements if a.unlocked)}/{len(self.achievements)}"
             )
             
+            romanization = format_romanization_counts(self.achievement_data.get('romanization_counts', {}))
+            if romanization:
+                general_stats_text += f"\nRomanización usada: {romanization}"
+            
+            retention = self.retention_model.summary() if self.retention_model else None
+            if retention and retention["items"]:
+                general_stats_text += (
+                    f"\n\nRecuerdo estimado hoy: {retention['mean_recall'] * 100:.1f}%\n"
+                    f"Caracteres por debajo del 50%: {retention['below']}/{retention['items']}\n"
+                    f"Estabilidad media de la memoria: {retention['global_stability']:.1f} días"
+                )
+            
             self.general_stats.config(state=tk.NORMAL)
             self.general_stats.delete(1.0, tk.END)
             self.general_stats.insert(tk.END, general_stats_text)
@@ -2616,37 +6337,18 @@ class HiraganaTrainer:
             # Estadísticas por categoría
             category_stats_text = ""
             
-            # Recopilar estadísticas por categoría
-            category_data = {}
-            for category, hiragana_list in self.hiragana_categories.items():
-                category_correct = 0
-                category_total = 0
-                category_studied = 0
-                
-                for hiragana, _ in hiragana_list:
-                    if hiragana in self.study_history:
-                        char_data = self.study_history[hiragana]
-                        category_correct += char_data.get("correct", 0)
-                        category_total += char_data.get("correct", 0) + char_data.get("incorrect", 0)
-                        category_studied += 1
-                
-                category_accuracy = 0
-                if category_total > 0:
-                    category_accuracy = (category_correct / category_total) * 100
-                
-                category_progress = (category_studied / len(hiragana_list)) * 100
-                
+            for category, category_data in stats["categories"].items():
                 # Guardar datos para logros
                 if category not in self.achievement_data['category_stats']:
                     self.achievement_data['category_stats'][category] = {}
                     
-                self.achievement_data['category_stats'][category]['accuracy'] = category_accuracy
-                self.achievement_data['category_stats'][category]['progress'] = category_progress
+                self.achievement_data['category_stats'][category]['accuracy'] = category_data["accuracy"]
+                self.achievement_data['category_stats'][category]['progress'] = category_data["progress"]
                 
                 category_stats_text += (
                     f"{category}:\n"
-                    f"  Progreso: {category_studied}/{len(hiragana_list)} ({category_progress:.1f}%)\n"
-                    f"  Precisión: {category_accuracy:.1f}%\n\n"
+                    f"  Progreso: {category_data['studied']}/{category_data['total']} ({category_data['progress']:.1f}%)\n"
+                    f"  Precisión: {category_data['accuracy']:.1f}%\n\n"
                 )
             
             self.category_stats.config(state=tk.NORMAL)
@@ -2657,24 +6359,16 @@ class HiraganaTrainer:
             # Lista de caracteres difíciles
             difficult_text = ""
             
-            if self.difficult_characters:
-                # Ordenar los caracteres difíciles por tasa de error
-                difficult_with_data = []
-                for char in self.difficult_characters:
-                    if char in self.study_history:
-                        char_data = self.study_history[char]
-                        total = char_data.get("correct", 0) + char_data.get("incorrect", 0)
-                        error_rate = char_data.get("incorrect", 0) / total if total > 0 else 0
-                        difficult_with_data.append((char, error_rate))
-                    else:
-                        difficult_with_data.append((char, 0))
-                
-                # Ordenar por tasa de error (mayor primero)
-                difficult_with_data.sort(key=lambda x: x[1], reverse=True)
-                
-                for i, (char, error_rate) in enumerate(difficult_with_data):
+            if stats["difficult"]:
+                # Probabilidad de recordar de todos los difíciles en una sola consulta
+                recall = self.retention_model.recall_probability([char for char, _ in stats["difficult"]]) \
+                    if self.retention_model else None
+                for i, (char, error_rate) in enumerate(stats["difficult"]):
                     # Formatear para mostrar organizadamente en columnas
-                    difficult_text += f"{char} ({error_rate*100:.0f}%)\t"
+                    if recall is not None and not math.isnan(recall[i]):
+                        difficult_text += f"{char} ({error_rate*100:.0f}%, recuerdo {recall[i]*100:.0f}%)\t"
+                    else:
+                        difficult_text += f"{char} ({error_rate*100:.0f}%)\t"
                     if (i + 1) % 5 == 0:
                         difficult_text += "\n"
             else:
@@ -2685,11 +6379,16 @@ class HiraganaTrainer:
             self.difficult_stats.insert(tk.END, difficult_text)
             self.difficult_stats.config(state=tk.DISABLED)
             
+            self.draw_forecast_strip()
+            
+            # Reajustar el modelo de retención si hay bastantes repasos nuevos
+            self.refresh_retention_model()
+            
             # Verificar logros después de actualizar estadísticas
             self.check_achievements()
             
         except Exception as e:
-            self.log_error(f"Error al actualizar estadísticas: {str(e)}")
+            self.log_error(f"Error al actualizar estadísticas: {str(e)}", show_to_user=False)
     
     def check_achievements(self):
         """Verifica si se ha desbloqueado algún logro nuevo"""
@@ -2860,6 +6559,42 @@ class HiraganaTrainer:
             command=achievements_window.destroy
         ).pack(pady=10)
     
+    def draw_forecast_strip(self):
+        """Dibuja la previsión de repasos como una franja de calendario coloreada por carga"""
+        canvas = getattr(self, 'forecast_canvas', None)
+        if canvas is None:
+            return
+        try:
+            simulate = self.forecast_lapses_var.get()
+            forecast = self.srs_scheduler.forecast(self.study_history, FORECAST_DAYS, simulate_lapses=simulate,
+                                                   retention_model=self.retention_model)
+            counts = forecast["expected"] if simulate else forecast["due"]
+            canvas.delete("all")
+            width = max(canvas.winfo_width(), FORECAST_DAYS * 12)
+            cell = width / len(counts)
+            peak = max(max(counts), 1)
+            for day, count in enumerate(counts):
+                # Interpolar entre el fondo y el color de acento según la carga del día
+                level = count / peak
+                color = "#%02x%02x%02x" % tuple(int(low + (high - low) * level)
+                                                for low, high in zip((0xf0, 0xf0, 0xf5), (0x4a, 0x86, 0xe8)))
+                x0 = day * cell
+                canvas.create_rectangle(x0, 0, x0 + cell - 1, 34, fill=color, outline="#ffffff")
+                if count:
+                    canvas.create_text(x0 + cell / 2, 17, text=f"{count:.0f}", font=("Arial", 7),
+                                       fill="#ffffff" if level > 0.5 else "#333333")
+                date = forecast["start"] + timedelta(days=day)
+                if day % 7 == 0:
+                    canvas.create_text(x0 + 2, 46, text=date.strftime("%d/%m"), anchor=tk.W, font=("Arial", 8),
+                                       fill="#666666")
+            summary = f"Mañana: {counts[1]:.0f} · Próximos 7 días: {sum(counts[:7]):.0f}" if len(counts) > 7 \
+                else f"Total: {sum(counts):.0f}"
+            if simulate:
+                summary += f" · Fallos esperados: {sum(forecast['lapses']):.0f}"
+            canvas.create_text(width, 46, text=summary, anchor=tk.E, font=("Arial", 8), fill="#333333")
+        except Exception as e:
+            self.log_error(f"Error al dibujar la previsión de repasos: {e}", show_to_user=False)
+    
     def show_stats_graphs(self):
         """Muestra gráficos de estadísticas"""
         try:
@@ -3001,11 +6736,121 @@ class HiraganaTrainer:
                 canvas3.get_tk_widget().pack(fill=tk.BOTH, expand=True)
             else:
                 ttk.Label(errors_tab, text="No hay suficientes datos para mostrar esta gráfica.").pack(expand=True)
+            
+            # Tab de repasos por día (desde el registro binario de repasos)
+            reviews_tab = ttk.Frame(graph_notebook)
+            graph_notebook.add(reviews_tab, text="Repasos por Día")
+            
+            daily = self.review_log.daily_counts(30)
+            if any(reviews for _, reviews, _, _ in daily):
+                days = [day[5:] for day, _, _, _ in daily]
+                correct = [c for _, _, c, _ in daily]
+                incorrect = [i for _, _, _, i in daily]
+                shown = [r - c - i for _, r, c, i in daily]
+                
+                fig4, ax4 = plt.subplots(figsize=(8, 4))
+                ax4.bar(days, correct, color='lightgreen', label='Correctas')
+                ax4.bar(days, incorrect, bottom=correct, color='lightcoral', label='Incorrectas')
+                ax4.bar(days, shown, bottom=[c + i for c, i in zip(correct, incorrect)],
+                        color='skyblue', label='Tarjetas')
+                
+                ax4.set_ylabel('Repasos')
+                ax4.set_title('Repasos de los Últimos 30 Días')
+                ax4.tick_params(axis='x', labelrotation=90, labelsize=7)
+                ax4.legend()
+                fig4.tight_layout()
+                
+                canvas4 = FigureCanvasTkAgg(fig4, master=reviews_tab)
+                canvas4.draw()
+                canvas4.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            else:
+                ttk.Label(reviews_tab, text="Aún no hay repasos registrados.").pack(expand=True)
+            
+            # Gráfico 5: Mapa de calor de confusiones (de la matriz dispersa, sin recorrer el historial)
+            confusion_tab = ttk.Frame(graph_notebook)
+            graph_notebook.add(confusion_tab, text="Confusiones")
+            
+            chars, counts = self.quiz_engine.confusions.matrix()
+            if chars:
+                fig5, ax5 = plt.subplots(figsize=(6, 5))
+                heatmap = ax5.imshow(counts, cmap='Reds')
+                ax5.set_xticks(range(len(chars)))
+                ax5.set_yticks(range(len(chars)))
+                ax5.set_xticklabels(chars)
+                ax5.set_yticklabels(chars)
+                ax5.set_xlabel('Respuesta elegida')
+                ax5.set_ylabel('Respuesta correcta')
+                ax5.set_title('Caracteres Confundidos')
+                for row, row_counts in enumerate(counts):
+                    for column, count in enumerate(row_counts):
+                        if count:
+                            ax5.text(column, row, str(count), ha='center', va='center', fontsize=8)
+                fig5.colorbar(heatmap, ax=ax5)
+                fig5.tight_layout()
+                
+                canvas5 = FigureCanvasTkAgg(fig5, master=confusion_tab)
+                canvas5.draw()
+                canvas5.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            else:
+                ttk.Label(confusion_tab, text="Aún no hay confusiones registradas.").pack(expand=True)
         except Exception as e:
             self.log_error(f"Error al generar gráficos: {str(e)}")
     
+    def show_performance_window(self):
+        """Ventana oculta "Rendimiento" con los tiempos de `perf_registry` (Ctrl+Shift+P)"""
+        try:
+            perf_window = tk.Toplevel(self.root)
+            perf_window.title("Rendimiento")
+            perf_window.geometry("760x360")
+            
+            columns = ("count", "mean", "p50", "p95", "max")
+            headings = ("Llamadas", "Media (ms)", "p50 (ms)", "p95 (ms)", "Máx. (ms)")
+            tree = ttk.Treeview(perf_window, columns=columns, height=12)
+            tree.heading("#0", text="Función")
+            tree.column("#0", width=260)
+            for column, heading in zip(columns, headings):
+                tree.heading(column, text=heading)
+                tree.column(column, width=90, anchor=tk.E)
+            tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            
+            enabled_var = tk.BooleanVar(value=perf_registry.enabled)
+            
+            def refresh():
+                if not perf_window.winfo_exists():
+                    return
+                tree.delete(*tree.get_children())
+                for name, timer in perf_registry.snapshot()["timers"].items():
+                    tree.insert("", tk.END, text=name, values=(
+                        timer["count"], f"{timer['mean_ms']:.3f}", f"{timer['p50_ms']:.3f}",
+                        f"{timer['p95_ms']:.3f}", f"{timer['max_ms']:.3f}"))
+                perf_window.after(1000, refresh)
+            
+            def dump():
+                file_path = filedialog.asksaveasfilename(
+                    defaultextension=".json", filetypes=[("JSON files", "*.json")],
+                    initialfile=f"hiragana_perf_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+                if file_path:
+                    perf_registry.dump(file_path)
+                    self.status_text.set(f"Tiempos guardados en {file_path}")
+            
+            buttons_frame = ttk.Frame(perf_window)
+            buttons_frame.pack(pady=(0, 10))
+            ttk.Checkbutton(buttons_frame, text="Medir tiempos", variable=enabled_var,
+                            command=lambda: setattr(perf_registry, "enabled", enabled_var.get())
+                            ).pack(side=tk.LEFT, padx=5)
+            ttk.Button(buttons_frame, text="Reiniciar", command=perf_registry.reset).pack(side=tk.LEFT, padx=5)
+            ttk.Button(buttons_frame, text="Exportar JSON", command=dump).pack(side=tk.LEFT, padx=5)
+            ttk.Button(buttons_frame, text="Cerrar", command=perf_window.destroy).pack(side=tk.LEFT, padx=5)
+            
+            refresh()
+        except Exception as e:
+            self.log_error(f"Error al mostrar el rendimiento: {str(e)}")
+    
     def export_statistics(self, format_type="csv"):
-        """Exporta las estadísticas a un archivo"""
+        """Exporta las estadísticas a un archivo (CSV, JSON o JSON Lines, opcionalmente comprimido)
+        
+        La escritura se hace en un hilo aparte y el progreso se muestra en la barra de estado.
+        """
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"hiragana_stats_{timestamp}.{format_type}"
@@ -3013,76 +6858,218 @@ class HiraganaTrainer:
             # Pedir al usuario la ubicación para guardar
             file_path = filedialog.asksaveasfilename(
                 defaultextension=f".{format_type}",
-                filetypes=[(f"{format_type.upper()} files", f"*.{format_type}")],
+                filetypes=[(f"{format_type.upper()} files", f"*.{format_type}"),
+                           (f"{format_type.upper()} gzip", f"*.{format_type}.gz"),
+                           (f"{format_type.upper()} xz", f"*.{format_type}.xz")],
                 initialfile=filename
             )
             
             if not file_path:
                 return
             
-            if format_type == "csv":
-                with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["Carácter", "Veces mostrado", "Correctas", "Incorrectas", "Precisión", "Difícil"])
-                    
-                    for char, data in self.study_history.items():
-                        times = data.get("times_shown", 0)
-                        correct = data.get("correct", 0)
-                        incorrect = data.get("incorrect", 0)
-                        accuracy = (correct / (correct + incorrect) * 100) if (correct + incorrect) > 0 else 0
-                        is_difficult = "Sí" if char in self.difficult_characters else "No"
-                        
-                        writer.writerow([char, times, correct, incorrect, f"{accuracy:.1f}%", is_difficult])
-                    
-                messagebox.showinfo("Exportación completa", f"Estadísticas exportadas a {file_path}")
-            elif format_type == "json":
-                export_data = {
-                    "study_history": self.study_history,
-                    "difficult_characters": list(self.difficult_characters),
-                    "achievement_data": self.achievement_data,
-                    "export_date": datetime.now().isoformat(),
-                    "app_version": APP_VERSION
-                }
-                
-                with open(file_path, 'w', encoding='utf-8') as jsonfile:
-                    json.dump(export_data, jsonfile, ensure_ascii=False, indent=2)
-                    
-                messagebox.showinfo("Exportación completa", f"Datos exportados a {file_path}")
+            # Los datos pequeños se copian aquí; el historial se recorre en el hilo sin copiarlo
+            difficult = set(self.difficult_characters)
+            achievements = copy.deepcopy(self.achievement_data)
+            total = len(self.study_history)
+            
+            def task(progress):
+                return export_study_data(file_path, self.study_history, difficult, achievements,
+                                         format_type=export_format_for(file_path, format_type),
+                                         progress=lambda done, _: progress(done, total))
+            
+            def done(count, error):
+                if error is not None:
+                    self.status_text.set("Error en la exportación")
+                    self.log_error(f"Error al exportar estadísticas: {error}")
+                else:
+                    self.status_text.set(f"Exportados {count} caracteres")
+                    messagebox.showinfo("Exportación completa", f"Estadísticas exportadas a {file_path}")
+            
+            self.run_background_task("Exportando", task, done)
+        except Exception as e:
+            self.log_error(f"Error al exportar estadísticas: {str(e)}")
+    
+    def export_review_history(self, format_type="csv"):
+        """Exporta el registro de repasos (un evento por fila) en un hilo aparte"""
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=f".{format_type}",
+                filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl"),
+                           ("CSV gzip", "*.csv.gz"), ("JSON Lines gzip", "*.jsonl.gz")],
+                initialfile=f"hiragana_reviews_{timestamp}.{format_type}"
+            )
+            
+            if not file_path:
+                return
+            
+            # Instancia propia: el hilo mapea el archivo sin compartir el mmap de la interfaz
+            review_log = ReviewLog(self.review_log.file_path)
+            
+            def task(progress):
+                return export_review_log(review_log, file_path, progress=progress)
+            
+            def done(count, error):
+                if error is not None:
+                    self.status_text.set("Error en la exportación")
+                    self.log_error(f"Error al exportar el historial de repasos: {error}")
+                else:
+                    self.status_text.set(f"Exportados {count} repasos")
+                    messagebox.showinfo("Exportación completa", f"Historial de repasos exportado a {file_path}")
+            
+            self.run_background_task("Exportando repasos", task, done)
         except Exception as e:
-            self.log_error(f"Error al exportar estadísticas: {str(e)}")
+            self.log_error(f"Error al exportar el historial de repasos: {str(e)}")
+    
+    def run_background_task(self, label, task, on_done):
+        """Ejecuta `task(progress)` en un hilo y llama a `on_done(resultado, error)` en el hilo de Tk
+        
+        El progreso (`progress(hechos, total=None)`) se muestra en la barra de estado
+        consultándolo periódicamente, sin llamar a Tkinter desde el hilo de trabajo.
+        """
+        if getattr(self, 'background_thread', None) is not None and self.background_thread.is_alive():
+            messagebox.showinfo("Tarea en curso", "Espera a que termine la exportación o importación actual.")
+            return False
+        
+        state = {"done": 0, "total": None, "finished": False, "result": None, "error": None}
+        
+        def progress(done, total=None):
+            state["done"] = done
+            state["total"] = total
+        
+        def worker():
+            try:
+                state["result"] = task(progress)
+            except Exception as e:
+                state["error"] = str(e)
+            finally:
+                state["finished"] = True
+        
+        def poll():
+            if not state["finished"]:
+                total = f"/{state['total']}" if state["total"] else ""
+                self.status_text.set(f"{label}... {state['done']}{total}")
+                self.root.after(100, poll)
+                return
+            on_done(state["result"], state["error"])
+        
+        self.background_thread = threading.Thread(target=worker, daemon=True)
+        self.background_thread.start()
+        self.root.after(100, poll)
+        return True
+    
+    def refresh_retention_model(self, min_new=50):
+        """Reajusta en segundo plano el modelo de retención si el registro de repasos ha
+        crecido al menos `min_new` eventos desde el último ajuste
+        
+        Sin NumPy no hace nada. El ajuste se ejecuta en su propio ThreadPoolExecutor, así
+        que no ocupa el hilo de las importaciones y exportaciones ni escribe en la barra de
+        estado; el modelo nuevo se asigna al planificador SRS y a la interfaz desde el hilo
+        de Tk.
+        """
+        if np is None:
+            return
+        size = len(self.review_log)
+        if self._retention_log_size is not None and 0 <= size - self._retention_log_size < min_new:
+            return
+        if self._retention_future is not None and not self._retention_future.done():
+            return
+        self._retention_log_size = size
+        
+        if self._retention_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._retention_executor = ThreadPoolExecutor(max_workers=1)
+        future = self._retention_executor.submit(RetentionModel.from_review_log, self.review_log.file_path)
+        self._retention_future = future
+        
+        def poll():
+            if not future.done():
+                self.root.after(200, poll)
+                return
+            try:
+                model = future.result()
+            except Exception as e:
+                self._retention_log_size = None
+                self.log_error(f"Error al ajustar el modelo de retención: {e}", show_to_user=False)
+                return
+            self.retention_model = model
+            self.srs_scheduler.retention_model = model
+            if self.srs_scheduler.retention_threshold:
+                self.quiz_engine.refresh_due()
+            self.update_stats_display()
+        
+        self.root.after(200, poll)
     
     def import_data(self):
-        """Importa datos de un archivo JSON"""
+        """Importa datos de un archivo JSON o JSON Lines (también .gz/.xz) fusionándolos o reemplazándolos
+        
+        Primero se lee el archivo en streaming para mostrar un resumen de los cambios;
+        después se aplica el modo elegido. La lectura se hace en segundo plano.
+        """
         try:
             file_path = filedialog.askopenfilename(
-                filetypes=[("JSON files", "*.json")],
+                filetypes=[("Datos JSON", "*.json *.jsonl *.json.gz *.jsonl.gz *.json.xz *.jsonl.xz"),
+                           ("Todos los archivos", "*.*")],
                 title="Selecciona un archivo de datos para importar"
             )
             
             if not file_path:
                 return
-                
-            with open(file_path, 'r', encoding='utf-8') as jsonfile:
-                import_data = json.load(jsonfile)
             
-            # Verificar si es un archivo de datos válido
-            if "study_history" not in import_data:
-                messagebox.showerror("Error de importación", "El archivo no contiene datos válidos.")
-                return
+            def preview_task(progress):
+                return import_study_data(file_path, self.study_history, self.difficult_characters,
+                                         self.achievement_data, dry_run=True, progress=progress)
             
-            # Confirmar importación
-            if not messagebox.askyesno("Confirmar importación", 
-                                     "¿Estás seguro de importar estos datos? Se sobrescribirán tus datos actuales."):
+            self.run_background_task("Analizando importación", preview_task,
+                                     lambda result, error: self._confirm_import(file_path, result, error))
+        except Exception as e:
+            self.log_error(f"Error al importar datos: {str(e)}")
+    
+    def _confirm_import(self, file_path, result, error):
+        """Muestra el resumen de la importación y aplica el modo elegido por el usuario"""
+        if error is not None:
+            self.status_text.set("Error en la importación")
+            self.log_error(f"Error al importar datos: {error}")
+            return
+        
+        summary, _ = result
+        self.status_text.set("Listo")
+        if not summary["records"] and not summary["achievement_data"]:
+            messagebox.showerror("Error de importación", "El archivo no contiene datos válidos.\n\n"
+                                 + format_import_summary(summary))
+            return
+        
+        # Sí = fusionar, No = reemplazar, Cancelar = no importar
+        choice = messagebox.askyesnocancel(
+            "Confirmar importación",
+            format_import_summary(summary)
+            + "\n\n¿Fusionar con tus datos actuales?\n"
+            "Sí: sumar contadores y conservar lo más reciente.\n"
+            "No: reemplazar tus datos actuales por los del archivo.")
+        if choice is None:
+            return
+        mode = "merge" if choice else "replace"
+        # El hilo trabaja sobre una copia: se puede seguir respondiendo mientras importa
+        snapshot = snapshot_progress(self.quiz_engine, self.achievements)
+        
+        def apply_task(progress):
+            return import_study_data(file_path, snapshot['study_history'],
+                                     set(snapshot['difficult_characters']),
+                                     snapshot['achievement_data'], mode=mode, progress=progress)
+        
+        def done(result, error):
+            if error is not None:
+                self.status_text.set("Error en la importación")
+                self.log_error(f"Error al importar datos: {error}")
                 return
-                
-            # Importar datos
-            self.study_history = import_data.get("study_history", {})
-            
-            if "difficult_characters" in import_data:
-                self.difficult_characters = set(import_data["difficult_characters"])
-            
-            if "achievement_data" in import_data:
-                self.achievement_data = import_data["achievement_data"]
+            summary, changes = result
+            live = serialize_progress(self.quiz_engine, self.achievements)
+            apply_progress(self.quiz_engine, self.achievements,
+                           merge_import_result(snapshot, live, changes))
+            self.quiz_engine.sync_changes = None  # La importación cambia registros sin pasar por grade
+            if mode == "replace":
+                # Guardar sin fusionar: la fusión con el disco recuperaría los registros eliminados
+                self.save_data(replace=True)
             
             # Actualizar interfaz
             self.update_difficult_chars_display()
@@ -3091,16 +7078,51 @@ class HiraganaTrainer:
             # Verificar logros
             self.check_achievements()
             
+            self.status_text.set(f"Importados {summary['records']} caracteres")
             messagebox.showinfo("Importación completa", "Datos importados correctamente.")
+        
+        self.run_background_task("Importando", apply_task, done)
+    
+    def sync_data(self):
+        """Sincroniza el progreso con otras instalaciones a través de una carpeta compartida o USB"""
+        try:
+            if self.sync_state.data is None:
+                self.sync_state.load()
+            directory = filedialog.askdirectory(
+                title="Selecciona la carpeta de sincronización",
+                initialdir=self.sync_state.data.get("directory")
+            )
+            if not directory:
+                return
+            
+            summary = sync_with_directory(directory, self.study_history, self.difficult_characters,
+                                          self.achievement_data, self.sync_state, self.quiz_engine.sync_changes)
+            self.quiz_engine.sync_changes = set()
+            
+            # Guardar primero el progreso: el estado de sincronización describe lo ya guardado
+            if not self.save_data():
+                self.sync_state.data = None  # Descartar el estado en memoria; se relee del disco
+                self.quiz_engine.sync_changes = None
+                return
+            self.sync_state.save()
+            
+            self.update_stats_display()
+            self.check_achievements()
+            self.status_text.set("Sincronización completada")
+            messagebox.showinfo("Sincronización",
+                                f"Caracteres enviados: {summary['exported']}\n"
+                                f"Archivos recibidos: {summary['imported_files']} "
+                                f"de {len(summary['peers'])} dispositivos\n"
+                                f"Caracteres actualizados: {summary['imported_chars']}")
         except Exception as e:
-            self.log_error(f"Error al importar datos: {str(e)}")
+            self.log_error(f"Error al sincronizar: {str(e)}")
     
     def reset_all_stats(self):
         """Reinicia todas las estadísticas y el historial de estudio"""
         if messagebox.askyesno("Confirmar", 
                              "¿Estás seguro de que quieres reiniciar TODAS las estadísticas?\n\n"
-                             "Esto borrará todo el historial de estudio, la lista de caracteres difíciles "
-                             "y el progreso de los logros.",
+                             "Esto borrará todo el historial de estudio, la lista de caracteres difíciles, "
+                             "las confusiones registradas y el progreso de los logros.",
                              icon=messagebox.WARNING):
             # Reiniciar estadísticas actuales
             self.score = 0
@@ -3109,6 +7131,7 @@ class HiraganaTrainer:
             self.max_streak = 0
             self.session_chars_shown = 0
             self.session_start_time = datetime.now()
+            self.study_time_counted_at = self.session_start_time
             
             # Reiniciar historial de estudio
             self.study_history = {}
@@ -3117,6 +7140,9 @@ class HiraganaTrainer:
             self.difficult_characters.clear()
             self.update_difficult_chars_display()
             
+            # Limpiar la matriz de confusiones (se guarda vacía y sustituye a la del archivo)
+            self.quiz_engine.confusions = ConfusionStore()
+            
             # Reiniciar logros
             for achievement in self.achievements:
                 achievement.unlocked = False
@@ -3139,8 +7165,8 @@ class HiraganaTrainer:
             self.update_session_stats()
             self.update_stats_display()
             
-            # Guardar datos reiniciados
-            self.save_data()
+            # Guardar datos reiniciados (sustituyendo los del archivo)
+            self.save_data(replace=True)
             
             messagebox.showinfo("Completado", "Todas las estadísticas han sido reiniciadas.")
     
@@ -3357,6 +7383,16 @@ class HiraganaTrainer:
         except Exception as e:
             logger.error(f"Error al mostrar recordatorio: {str(e)}")
     
+    def apply_romanization_setting(self):
+        """Aplica al motor los sistemas de romanización elegidos en la configuración"""
+        systems = ROMANIZATION_CHOICES.get(self.romanization_var.get(), ROMANIZATION_SYSTEMS)
+        self.quiz_engine.romanization_systems = set(systems)
+    
+    def apply_retention_setting(self):
+        """Aplica al SRS el umbral de recuerdo elegido (los caracteres por debajo también vencen)"""
+        self.srs_scheduler.retention_threshold = RETENTION_THRESHOLD_CHOICES.get(self.retention_threshold_var.get())
+        self.quiz_engine.refresh_due()
+    
     def save_settings(self):
         """Guarda la configuración actual"""
         try:
@@ -3368,7 +7404,10 @@ class HiraganaTrainer:
                 "algorithm": self.algo_var.get(),
                 "session_duration": self.session_duration_var.get(),
                 "chars_per_session": self.chars_per_session_var.get(),
-                "reminder_enabled": self.reminder_var.get()
+                "reminder_enabled": self.reminder_var.get(),
+                "log_level": self.log_level_var.get(),
+                "romanization": self.romanization_var.get(),
+                "retention_threshold": self.retention_threshold_var.get()
             }
             
             # Guardar plan de estudio si está configurado
@@ -3414,6 +7453,18 @@ class HiraganaTrainer:
                 if "chars_per_session" in settings:
                     self.chars_per_session_var.set(settings["chars_per_session"])
                 
+                if settings.get("log_level") in LOG_LEVELS:
+                    self.log_level_var.set(settings["log_level"])
+                    set_log_level(settings["log_level"])
+                
+                if settings.get("romanization") in ROMANIZATION_CHOICES:
+                    self.romanization_var.set(settings["romanization"])
+                    self.apply_romanization_setting()
+                
+                if settings.get("retention_threshold") in RETENTION_THRESHOLD_CHOICES:
+                    self.retention_threshold_var.set(settings["retention_threshold"])
+                    self.apply_retention_setting()
+                
                 if "reminder_enabled" in settings:
                     self.reminder_var.set(settings["reminder_enabled"])
                     
@@ -3436,8 +7487,14 @@ class HiraganaTrainer:
             self.session_duration_var.set(15)
             self.chars_per_session_var.set(20)
             self.reminder_var.set(False)
+            self.log_level_var.set("INFO")
+            self.romanization_var.set("Todas")
+            self.retention_threshold_var.set("Desactivado")
             
             # Aplicar cambios
+            set_log_level("INFO")
+            self.apply_romanization_setting()
+            self.apply_retention_setting()
             self.change_theme()
             self.update_font_size()
             
@@ -3455,63 +7512,19 @@ class HiraganaTrainer:
     def generate_smart_session(self):
         """Genera una sesión de estudio inteligente basada en el rendimiento"""
         try:
-            # Identificar caracteres con mayor tasa de error
-            chars_with_errors = []
-            
-            for char, data in self.study_history.items():
-                if data.get("times_shown", 0) > 0:
-                    correct = data.get("correct", 0)
-                    incorrect = data.get("incorrect", 0)
-                    total = correct + incorrect
-                    
-                    if total > 0:
-                        error_rate = incorrect / total
-                        chars_with_errors.append((char, error_rate))
-            
-            # Ordenar por tasa de error (mayor primero)
-            chars_with_errors.sort(key=lambda x: x[1], reverse=True)
-            
-            # Número de caracteres por sesión (configurable)
+            # Duración y número máximo de caracteres por sesión (configurables)
+            minutes = getattr(self, 'session_duration_var', tk.IntVar(value=15)).get()
             chars_per_session = getattr(self, 'chars_per_session_var', tk.IntVar(value=20)).get()
+            review_stats = None
+            if self.review_log is not None:
+                review_stats = self.adaptive_learning.load_review_stats(self.review_log)
+            seconds_per_item = estimate_seconds_per_item(
+                review_stats, (datetime.now() - self.session_start_time).total_seconds(), self.session_chars_shown)
             
-            # Decidir qué caracteres incluir en la sesión
-            session_chars = []
-            
-            # 60% de caracteres con más errores
-            error_count = min(int(chars_per_session * 0.6), len(chars_with_errors))
-            if error_count > 0:
-                problem_chars = [c for c, _ in chars_with_errors[:error_count]]
-                for cat in self.hiragana_categories.values():
-                    for pair in cat:
-                        if pair[0] in problem_chars and pair not in session_chars:
-                            session_chars.append(pair)
-            
-            # 20% de caracteres poco practicados
-            least_practiced = []
-            for cat in self.hiragana_categories.values():
-                for pair in cat:
-                    char = pair[0]
-                    times_shown = self.study_history.get(char, {}).get("times_shown", 0)
-                    least_practiced.append((pair, times_shown))
-            
-            least_practiced.sort(key=lambda x: x[1])  # Ordenar por veces mostradas (menor primero)
-            
-            # Agregar caracteres poco practicados que no estén ya en la sesión
-            rare_count = min(int(chars_per_session * 0.2), len(least_practiced))
-            for pair, _ in least_practiced[:rare_count]:
-                if pair not in session_chars:
-                    session_chars.append(pair)
-            
-            # 20% de caracteres aleatorios
-            all_pairs = []
-            for cat in self.hiragana_categories.values():
-                all_pairs.extend(cat)
-                
-            # Mezclar y agregar caracteres restantes
-            random.shuffle(all_pairs)
-            for pair in all_pairs:
-                if pair not in session_chars and len(session_chars) < chars_per_session:
-                    session_chars.append(pair)
+            plan = plan_smart_session(self.quiz_engine.deck, self.study_history, minutes,
+                                      max_items=chars_per_session, seconds_per_item=seconds_per_item,
+                                      retention_model=self.retention_model)
+            session_chars = plan["pairs"]
             
             # Crear sesión
             if session_chars:
@@ -3527,12 +7540,14 @@ class HiraganaTrainer:
                 self.session_chars_shown = 0
                 
                 # Mostrar mensaje informativo
+                counts = plan["counts"]
                 messagebox.showinfo("Sesión Inteligente", 
-                                   f"Se ha creado una sesión inteligente con {len(session_chars)} caracteres.\n\n"
+                                   f"Se ha creado una sesión inteligente con {len(session_chars)} caracteres "
+                                   f"(unos {plan['seconds'] / 60:.0f} de {minutes} minutos).\n\n"
                                    f"Esta sesión incluye:\n"
-                                   f"- Caracteres con mayor tasa de error\n"
-                                   f"- Caracteres menos practicados\n"
-                                   f"- Algunos caracteres aleatorios para variedad\n\n"
+                                   f"- {counts['errors']} caracteres con mayor tasa de error\n"
+                                   f"- {counts['least_practiced']} caracteres menos practicados\n"
+                                   f"- {counts['random']} caracteres aleatorios para variedad\n\n"
                                    f"Haz clic en 'Iniciar' para comenzar.")
                                    
                 # Cambiar a la pestaña de tarjetas flash
@@ -3542,6 +7557,29 @@ class HiraganaTrainer:
         except Exception as e:
             self.log_error(f"Error al generar sesión inteligente: {str(e)}")
     
+    def start_confusion_drill(self):
+        """Prepara en tarjetas una práctica que alterna los caracteres que más se confunden entre sí"""
+        try:
+            session_chars = self.quiz_engine.confused_pairs_drill()
+            if not session_chars:
+                messagebox.showinfo("Pares Confundidos",
+                                    "Aún no hay confusiones registradas. Aparecen al fallar en el quiz.")
+                return
+            
+            # Sin mezclar: el orden alterna los miembros de cada pareja
+            self.hiragana_list = session_chars
+            self.current_index = 0
+            self.update_progress()
+            self.session_chars_shown = 0
+            
+            pairs = ", ".join(f"{a}/{b}" for a, b, _ in self.quiz_engine.confusions.top_pairs())
+            messagebox.showinfo("Pares Confundidos",
+                                f"Se ha creado una práctica con {len(session_chars)} tarjetas de las parejas "
+                                f"que más confundes: {pairs}.\n\nHaz clic en 'Iniciar' para comenzar.")
+            self.notebook.select(0)
+        except Exception as e:
+            self.log_error(f"Error al crear la práctica de pares confundidos: {str(e)}")
+    
     # ==== Funciones de ayuda y soporte ====
     
     def show_help(self):
@@ -3844,10 +7882,23 @@ class HiraganaTrainer:
         ).pack(side=tk.LEFT, padx=5)
     
     def log_error(self, error_msg, show_to_user=True):
-        """Registra un error en el log y muestra un mensaje al usuario si corresponde"""
-        logger.error(error_msg)
-        if show_to_user:
-            messagebox.showerror("Error", error_msg)
+        """Registra un error en el log y lo comunica al usuario
+        
+        Con `show_to_user=False` (rutas que se ejecutan en cada pregunta o tarjeta) el mensaje
+        solo aparece en la barra de estado. Los diálogos no se repiten para el mismo mensaje
+        mientras no pasen ERROR_DIALOG_INTERVAL segundos, para no encadenar ventanas modales.
+        """
+        logger.error("%s", error_msg)
+        if hasattr(self, 'status_text'):
+            self.status_text.set(error_msg)
+        if not show_to_user:
+            return
+        now = time.monotonic()
+        last_msg, last_time = self._last_error_dialog
+        if error_msg == last_msg and now - last_time < ERROR_DIALOG_INTERVAL:
+            return
+        self._last_error_dialog = (error_msg, now)
+        messagebox.showerror("Error", error_msg)
     
     # ==== Funciones de carga/guardado de datos ====
     
@@ -3856,32 +7907,8 @@ class HiraganaTrainer:
         try:
             # Cargar datos de estudio
             if os.path.exists(DATA_FILE):
-                with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    if 'difficult_characters' in data:
-                        self.difficult_characters = set(data['difficult_characters'])
-                        
-                    if 'study_history' in data:
-                        self.study_history = data['study_history']
-                        
-                    if 'max_streak' in data:
-                        self.max_streak = data['max_streak']
-                    
-                    if 'achievements' in data:
-                        # Cargar logros
-                        achievement_data = data['achievements']
-                        for a_data in achievement_data:
-                            for achievement in self.achievements:
-                                if achievement.id == a_data['id']:
-                                    achievement.unlocked = a_data.get('unlocked', False)
-                                    achievement.unlock_date = a_data.get('unlock_date')
-                    
-                    if 'achievement_data' in data:
-                        # Preservar la lista de todos los caracteres hiragana
-                        all_hiragana = self.achievement_data['all_hiragana']
-                        self.achievement_data = data['achievement_data']
-                        self.achievement_data['all_hiragana'] = all_hiragana
+                data = self.progress_file.load()
+                apply_progress(self.quiz_engine, self.achievements, data)
                 
                 # Actualizar visualización
                 self.update_difficult_chars_display()
@@ -3893,32 +7920,33 @@ class HiraganaTrainer:
         except Exception as e:
             self.log_error(f"Error al cargar datos: {e}")
     
-    def save_data(self):
-        """Guarda los datos de historial de estudio y configuración"""
+    @timed()
+    def save_data(self, replace=False):
+        """Guarda los datos de historial de estudio y configuración
+        
+        Salvo con replace=True, los cambios se fusionan con los que otras instancias
+        hayan guardado en DATA_FILE desde la última carga.
+        """
         try:
             # Preparar datos para guardar
-            achievement_data = [a.to_dict() for a in self.achievements]
-            
-            data = {
-                'difficult_characters': list(self.difficult_characters),
-                'study_history': self.study_history,
-                'max_streak': self.max_streak,
-                'achievements': achievement_data,
-                'achievement_data': self.achievement_data,
-                'app_version': APP_VERSION,
-                'last_save': datetime.now().isoformat()
-            }
-            
-            # Guardar en archivo
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            data = serialize_progress(self.quiz_engine, self.achievements)
+            
+            # Guardar en archivo (con bloqueo y fusión) y adoptar el resultado
+            merged = self.progress_file.save(data, indent=2, replace=replace)
+            apply_progress(self.quiz_engine, self.achievements, merged)
+            if self.progress_file.external_changes:
+                # Otra instancia ha cambiado el historial: la próxima sincronización lo revisa entero
+                self.quiz_engine.sync_changes = None
+            self.update_difficult_chars_display()
             
             # Guardar configuración
             self.save_settings()
                 
             self.status_text.set("Datos guardados correctamente")
+            return True
         except Exception as e:
             self.log_error(f"Error al guardar datos: {e}")
+            return False
     
     def on_closing(self):
         """Acciones al cerrar la aplicación"""
@@ -3940,6 +7968,10 @@ class HiraganaTrainer:
             if hasattr(self, 'reminder_thread') and self.reminder_thread.is_alive():
                 self.stop_reminder_thread = True
             
+            # No esperar a que termine un ajuste del modelo de retención en curso
+            if self._retention_executor is not None:
+                self._retention_executor.shutdown(wait=False)
+            
             # Verificar si auto-guardado está activado
             should_save = True
             if hasattr(self, 'auto_save_var'):
@@ -3957,10 +7989,1219 @@ class HiraganaTrainer:
                 self.root.destroy()
             except Exception:
                 pass
+
+# Servicio HTTP/JSON para varios estudiantes (modo --serve)
+PROFILE_NAME_CHARS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-")
+
+class LearnerProfile:
+    """Estado en memoria de un estudiante servido por QuizService"""
+    
+    def __init__(self, name, file_path, hiragana_categories):
+        self.name = name
+        self.file_path = file_path
+        self.engine = QuizEngine(hiragana_categories)
+        self.achievements = create_achievements()
+        self.dirty = False
+        self.progress_file = ProgressFile(file_path)
+        
+        all_hiragana = [hiragana for pairs in hiragana_categories.values() for hiragana, _ in pairs]
+        self.engine.achievement_data['all_hiragana'] = all_hiragana
+        
+        if os.path.exists(file_path):
+            apply_progress(self.engine, self.achievements, self.progress_file.load())
+        
+        params = load_model_params(params_path_for(file_path))
+        if params:
+            apply_model_params(params, self.engine.srs_scheduler, self.engine.adaptive_learning)
+    
+    def stats(self):
+        """Devuelve las estadísticas del estudiante y de su quiz actual"""
+        engine = self.engine
+        stats = compute_study_stats(engine.study_history, engine.hiragana_categories,
+                                    engine.difficult_characters)
+        stats["difficult"] = [[char, rate] for char, rate in stats["difficult"]]
+        stats["quiz"] = {
+            "score": engine.score,
+            "attempts": engine.total_attempts,
+            "accuracy": engine.accuracy(),
+            "streak": engine.streak,
+            "max_streak": engine.max_streak
+        }
+        stats["due_today"] = len(engine.srs_scheduler.get_due_cards(engine.study_history))
+        stats["romanization"] = dict(engine.achievement_data.get('romanization_counts', {}))
+        stats["confused_pairs"] = [[a, b, count] for a, b, count in engine.confusions.top_pairs()]
+        return stats
+
+class QuizService:
+    """Servidor HTTP/JSON mínimo sobre asyncio que sirve quizzes a varios estudiantes
+    
+    Rutas:
+        GET  /api/<perfil>/question  -> siguiente pregunta
+        POST /api/<perfil>/answer    -> {"answer": "ka"} o {"option": 2}
+        POST /api/<perfil>/settings  -> {"mode", "direction", "difficult_only", "srs_mode", "algorithm",
+                                         "categories", "filters"}
+        GET  /api/<perfil>/stats     -> estadísticas del estudiante
+    
+    Los perfiles se mantienen en memoria y se guardan en segundo plano (write-behind)
+    cada `flush_interval` segundos y al detener el servicio.
+    """
+    
+    MAX_HEADER_BYTES = 16384
+    MAX_BODY_BYTES = 65536
+    
+    def __init__(self, profiles_dir="profiles", host="127.0.0.1", port=8765, flush_interval=5.0):
+        self.profiles_dir = profiles_dir
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+        self.hiragana_categories, self.example_words = load_hiragana_content()
+        self.profiles = {}
+        self.requests_served = 0
+        self._server = None
+        self._flush_task = None
+        self._loading = {}  # Perfil -> futuro de la carga en curso
+    
+    def _profile_path(self, name):
+        return os.path.join(self.profiles_dir, f"{name}.json")
+    
+    def get_profile(self, name):
+        """Devuelve el perfil indicado, cargándolo del disco la primera vez"""
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = LearnerProfile(name, self._profile_path(name), self.hiragana_categories)
+            self.profiles[name] = profile
+        return profile
+    
+    async def load_profile(self, name):
+        """Carga un perfil en un hilo auxiliar para que leer y migrar su archivo no bloquee el
+        bucle de eventos; las peticiones simultáneas del mismo perfil esperan a la misma carga
+        """
+        profile = self.profiles.get(name)
+        if profile is not None:
+            return profile
+        loading = self._loading.get(name)
+        if loading is None:
+            loading = asyncio.get_running_loop().run_in_executor(
+                None, LearnerProfile, name, self._profile_path(name), self.hiragana_categories)
+            self._loading[name] = loading
+        try:
+            profile = await loading
+        finally:
+            self._loading.pop(name, None)
+        return self.profiles.setdefault(name, profile)
+    
+    @staticmethod
+    def _profile_name(target):
+        """Perfil de una ruta /api/<perfil>/<acción> con nombre válido, o None"""
+        parts = [part for part in target.split("?", 1)[0].split("/") if part]
+        if len(parts) == 3 and parts[0] == "api" and 0 < len(parts[1]) <= 64 \
+                and set(parts[1]) <= PROFILE_NAME_CHARS:
+            return parts[1]
+        return None
+    
+    def parse_settings(self, data):
+        """Valida una petición de configuración y devuelve los valores a aplicar
+        
+        Se comprueba todo antes de aplicar nada, de modo que una petición con un valor no
+        válido no deja la configuración a medias. Lanza ValueError con el motivo.
+        """
+        settings = {}
+        for key, choices in (("mode", QuizEngine.MODES), ("direction", QuizEngine.DIRECTIONS),
+                             ("algorithm", QuizEngine.ALGORITHMS)):
+            if key in data:
+                if data[key] not in choices:
+                    raise ValueError(f"'{key}' debe ser uno de: {', '.join(choices)}")
+                settings[key] = data[key]
+        for key in ("difficult_only", "srs_mode"):
+            if key in data:
+                if not isinstance(data[key], bool):
+                    raise ValueError(f"'{key}' debe ser true o false")
+                settings[key] = data[key]
+        if "categories" in data:
+            categories = data["categories"]
+            if categories is not None:
+                if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+                    raise ValueError("'categories' debe ser una lista de nombres de categoría o null")
+                unknown = [c for c in categories if c not in self.hiragana_categories]
+                if unknown:
+                    raise ValueError(f"Categorías desconocidas: {', '.join(unknown)}")
+                categories = set(categories)
+            settings["selected_categories"] = categories
+        if "filters" in data:
+            filters = data["filters"]
+            if filters is None:
+                filters = []
+            if not isinstance(filters, list) or not set(filters) <= set(QuizEngine.DYNAMIC_SETS):
+                raise ValueError(f"'filters' debe ser una lista con: {', '.join(QuizEngine.DYNAMIC_SETS)}")
+            settings["filters"] = set(filters)
+        return settings
+    
+    async def start(self):
+        """Inicia el servidor y la tarea de guardado en segundo plano"""
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._flush_task = asyncio.ensure_future(self._flush_loop())
+        logger.info("Servicio de quiz escuchando en %s:%s", self.host, self.port)
+    
+    async def stop(self):
+        """Detiene el servidor y guarda todos los perfiles pendientes"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.flush()
+    
+    async def serve_forever(self):
+        """Ejecuta el servicio hasta recibir SIGINT o SIGTERM y guarda los perfiles al salir"""
+        await self.start()
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: se usa KeyboardInterrupt
+        try:
+            await stop_event.wait()
+        finally:
+            await self.stop()
+    
+    async def _flush_loop(self):
+        """Guarda periódicamente los perfiles modificados"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error al guardar perfiles: {e}")
+    
+    async def flush(self):
+        """Escribe en disco los perfiles modificados sin bloquear el bucle de eventos"""
+        loop = asyncio.get_running_loop()
+        for profile in list(self.profiles.values()):
+            if not profile.dirty:
+                continue
+            # La instantánea se toma en el hilo del bucle; la fusión y escritura van a un hilo auxiliar.
+            # dirty se borra antes de guardar para no perder las respuestas que lleguen mientras
+            # tanto, y se restaura si el guardado falla (se reintenta en el siguiente ciclo)
+            snapshot = copy.deepcopy(serialize_progress(profile.engine, profile.achievements))
+            profile.dirty = False
+            try:
+                await loop.run_in_executor(None, profile.progress_file.save, snapshot, False)
+            except Exception as e:
+                profile.dirty = True
+                logger.error(f"Error al guardar el perfil {profile.name}: {e}")
+    
+    async def _handle_connection(self, reader, writer):
+        """Atiende las peticiones HTTP/1.1 de una conexión (con keep-alive)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                if len(head) > self.MAX_HEADER_BYTES:
+                    await self._send(writer, 431, {"error": "Cabeceras demasiado grandes"}, False)
+                    break
+                
+                lines = head.decode('latin-1').split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._send(writer, 400, {"error": "Petición mal formada"}, False)
+                    break
+                
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send(writer, 400, {"error": "Content-Length no válido"}, False)
+                    break
+                if length > self.MAX_BODY_BYTES:
+                    await self._send(writer, 413, {"error": "Cuerpo demasiado grande"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                name = self._profile_name(target)
+                if name is not None and name not in self.profiles:
+                    try:
+                        await self.load_profile(name)
+                    except Exception as e:
+                        logger.error(f"Error al cargar el perfil {name}: {e}")
+                        await self._send(writer, 500, {"error": "Error interno"}, keep_alive)
+                        if not keep_alive:
+                            break
+                        continue
+                status, payload = self.dispatch(method, target, body)
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Error en conexión del servicio: {e}")
+        finally:
+            writer.close()
+    
+    async def _send(self, writer, status, payload, keep_alive):
+        """Envía una respuesta JSON"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  409: "Conflict", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+                  500: "Internal Server Error"}.get(status, "OK")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    
+    def dispatch(self, method, target, body):
+        """Resuelve una petición y devuelve (código de estado, respuesta JSON)"""
+        self.requests_served += 1
+        path = target.split("?", 1)[0]
+        parts = [part for part in path.split("/") if part]
+        
+        if parts == ["api", "health"]:
+            return 200, {"status": "ok", "profiles": len(self.profiles), "version": APP_VERSION}
+        
+        if len(parts) != 3 or parts[0] != "api":
+            return 404, {"error": "Ruta no encontrada"}
+        
+        _, name, action = parts
+        if not name or len(name) > 64 or not set(name) <= PROFILE_NAME_CHARS:
+            return 400, {"error": "Nombre de perfil no válido"}
+        
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            return 400, {"error": "JSON no válido"}
+        if not isinstance(data, dict):
+            return 400, {"error": "Se esperaba un objeto JSON"}
+        
+        try:
+            profile = self.get_profile(name)
+            engine = profile.engine
+            
+            if action == "question" and method == "GET":
+                try:
+                    question = engine.next_question()
+                except QuizGenerationError as e:
+                    return 409, {"error": str(e), "notices": engine.notices}
+                question.pop("answer")
+                question.pop("correct_index")
+                question["notices"] = engine.notices
+                return 200, question
+            
+            if action == "answer" and method == "POST":
+                try:
+                    if "option" in data:
+                        option = data["option"]
+                        if isinstance(option, bool) or not isinstance(option, int):
+                            raise TypeError("La opción debe ser un número entero")
+                        result = engine.grade_option(option)
+                    else:
+                        result = engine.grade(data.get("answer", ""))
+                except (ValueError, IndexError, TypeError):
+                    return 400, {"error": "Respuesta no válida"}
+                except QuizGenerationError as e:
+                    return 409, {"error": str(e)}
+                # Cada pregunta solo se corrige una vez
+                engine.current_quiz_question = None
+                profile.dirty = True
+                result["streak"] = engine.streak
+                result["score"] = engine.score
+                result["attempts"] = engine.total_attempts
+                return 200, result
+            
+            if action == "settings" and method == "POST":
+                try:
+                    settings = self.parse_settings(data)
+                except ValueError as e:
+                    return 400, {"error": str(e)}
+                for key, value in settings.items():
+                    setattr(engine, key, value)
+                return 200, {"mode": engine.mode, "direction": engine.direction,
+                             "difficult_only": engine.difficult_only, "srs_mode": engine.srs_mode,
+                             "algorithm": engine.algorithm, "filters": sorted(engine.filters)}
+            
+            if action == "stats" and method == "GET":
+                return 200, profile.stats()
+            
+            if action in ("question", "answer", "settings", "stats"):
+                return 405, {"error": "Método no permitido"}
+            return 404, {"error": "Ruta no encontrada"}
+        except Exception as e:
+            logger.error(f"Error al procesar {method} {path}: {e}")
+            return 500, {"error": "Error interno"}
+
+def run_service(host="127.0.0.1", port=8765, profiles_dir="profiles", flush_interval=5.0):
+    """Ejecuta el servicio HTTP/JSON hasta que se interrumpa con Ctrl+C"""
+    service = QuizService(profiles_dir, host, port, flush_interval)
+    print(f"Servicio de Hiragana Trainer en http://{host}:{port}/api/<perfil>/question (Ctrl+C para salir)")
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        print("Cerrando el servicio...")
+
+# Generador de carga para el modo servicio
+async def _load_learner(host, port, name, deadline, latencies):
+    """Simula un estudiante que pide preguntas y responde hasta el tiempo límite"""
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    
+    async def request(method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        start = time.perf_counter()
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.decode('latin-1').split("\r\n"):
+            if line.lower().startswith("content-length:"):
+                length = int(line.split(":", 1)[1])
+        data = await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        return int(head.split(b" ", 2)[1]), json.loads(data.decode('utf-8'))
+    
+    try:
+        await request("POST", f"/api/{name}/settings", {"mode": "multiple"})
+        while time.perf_counter() < deadline:
+            status, question = await request("GET", f"/api/{name}/question")
+            if status != 200:
+                errors += 1
+                continue
+            status, _ = await request("POST", f"/api/{name}/answer",
+                                      {"option": random.randrange(len(question["options"]))})
+            if status != 200:
+                errors += 1
+    finally:
+        writer.close()
+    return errors
+
+async def _run_load(host, port, learners, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    tasks = [_load_learner(host, port, f"carga_{i}", deadline, latencies)
+             for i in range(learners)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    errors = sum(r if isinstance(r, int) else 1 for r in results)
+    return latencies, errors, elapsed
+
+def run_load_generator(host="127.0.0.1", port=8765, learners=200, duration=10.0):
+    """Lanza varios estudiantes simulados contra un servicio y devuelve un resumen de rendimiento"""
+    latencies, errors, elapsed = asyncio.run(_run_load(host, port, learners, duration))
+    latencies.sort()
+    
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    
+    summary = {
+        "learners": learners,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "errors": errors,
+        "p50_ms": round(percentile(0.50), 2),
+        "p95_ms": round(percentile(0.95), 2),
+        "p99_ms": round(percentile(0.99), 2)
+    }
+    return summary
+
+# Analítica de cohortes sobre muchos archivos de progreso (modo --cohort)
+_cohort_categories = None
+
+def _init_cohort_worker(hiragana_categories):
+    """Inicializa cada proceso trabajador con las categorías de hiragana"""
+    global _cohort_categories
+    _cohort_categories = hiragana_categories
+
+def analyze_learner_file(file_path, hiragana_categories=None):
+    """Lee un archivo de progreso y devuelve su resumen y sus agregados por carácter"""
+    categories = hiragana_categories if hiragana_categories is not None else _cohort_categories
+    learner = os.path.splitext(os.path.basename(file_path))[0]
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        study_history = data.get('study_history', {})
+        if not isinstance(study_history, dict):
+            raise DataLoadError("study_history no es un diccionario")
+    except Exception as e:
+        return {"learner": learner, "error": str(e)}
+    
+    difficult = data.get('difficult_characters', [])
+    achievement_data = data.get('achievement_data', {})
+    stats = compute_study_stats(study_history, categories or {}, difficult)
+    
+    # Agregados compactos por carácter: [veces mostrado, correctas, incorrectas]
+    chars = {}
+    srs_levels = defaultdict(int)
+    for char, char_data in study_history.items():
+        chars[char] = [char_data.get("times_shown", 0), char_data.get("correct", 0),
+                       char_data.get("incorrect", 0)]
+        srs_levels[str(char_data.get("srs_level", "none"))] += 1
+    
+    summary = {
+        "learner": learner,
+        "studied_chars": stats["studied_chars"],
+        "total_shown": stats["total_shown"],
+        "total_correct": stats["total_correct"],
+        "total_incorrect": stats["total_incorrect"],
+        "accuracy": round(stats["accuracy"], 2),
+        "difficult": len(difficult),
+        "max_streak": data.get('max_streak', 0),
+        "study_time": achievement_data.get('total_study_time', 0),
+        "sessions": achievement_data.get('sessions_completed', 0)
+    }
+    for category, category_data in stats["categories"].items():
+        summary[f"accuracy_{category}"] = round(category_data["accuracy"], 2)
+    
+    return {"learner": learner, "summary": summary, "chars": chars, "srs_levels": dict(srs_levels)}
+
+def iter_learner_files(directory):
+    """Devuelve ordenados los archivos .json de un directorio"""
+    return sorted(entry.path for entry in os.scandir(directory)
+                  if entry.is_file() and entry.name.endswith(".json"))
+
+def run_cohort_analysis(directory, output_path, workers=None, top_n=10, min_attempts=5):
+    """Analiza en paralelo todos los archivos de progreso de un directorio
+    
+    Los resúmenes de cada estudiante se escriben a medida que llegan de los procesos
+    trabajadores: en CSV (`output.csv` + `output_characters.csv`) o en JSON Lines
+    (`.jsonl`/`.json`, con registros de tipo learner, character y summary).
+    Devuelve el resumen de la cohorte.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    hiragana_categories, _ = load_hiragana_content()
+    files = iter_learner_files(directory)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, min(64, len(files) // (workers * 4) or 1))
+    
+    char_totals = defaultdict(lambda: [0, 0, 0, 0])  # mostrado, correctas, incorrectas, estudiantes
+    srs_distribution = defaultdict(int)
+    totals = {"learners": 0, "errors": 0, "total_shown": 0, "total_correct": 0,
+              "total_incorrect": 0, "study_time": 0.0, "sessions": 0}
+    
+    is_csv = output_path.lower().endswith(".csv")
+    category_columns = [f"accuracy_{category}" for category in hiragana_categories]
+    learner_columns = ["learner", "studied_chars", "total_shown", "total_correct", "total_incorrect",
+                       "accuracy", "difficult", "max_streak", "study_time", "sessions"] + category_columns
+    
+    with open(output_path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.DictWriter(out, fieldnames=learner_columns) if is_csv else None
+        if writer:
+            writer.writeheader()
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_cohort_worker,
+                                 initargs=(hiragana_categories,)) as executor:
+            for result in executor.map(analyze_learner_file, files, chunksize=chunksize):
+                if "error" in result:
+                    totals["errors"] += 1
+                    logger.warning("Archivo de cohorte ignorado (%s): %s", result["learner"], result["error"])
+                    continue
+                
+                summary = result["summary"]
+                totals["learners"] += 1
+                for key in ("total_shown", "total_correct", "total_incorrect", "study_time", "sessions"):
+                    totals[key] += summary[key]
+                for char, (shown, correct, incorrect) in result["chars"].items():
+                    entry = char_totals[char]
+                    entry[0] += shown
+                    entry[1] += correct
+                    entry[2] += incorrect
+                    entry[3] += 1
+                for level, count in result["srs_levels"].items():
+                    srs_distribution[level] += count
+                
+                if writer:
+                    writer.writerow(summary)
+                else:
+                    out.write(json.dumps(dict(summary, type="learner"), ensure_ascii=False) + "\n")
+        
+        # Precisión por carácter en toda la cohorte
+        char_rows = []
+        for char, (shown, correct, incorrect, learners) in char_totals.items():
+            answered = correct + incorrect
+            char_rows.append({
+                "char": char,
+                "learners": learners,
+                "times_shown": shown,
+                "correct": correct,
+                "incorrect": incorrect,
+                "accuracy": round(correct / answered * 100, 2) if answered > 0 else 0.0
+            })
+        char_rows.sort(key=lambda row: row["char"])
+        
+        if not writer:
+            for row in char_rows:
+                out.write(json.dumps(dict(row, type="character"), ensure_ascii=False) + "\n")
+    
+    if is_csv:
+        chars_path = f"{os.path.splitext(output_path)[0]}_characters.csv"
+        with open(chars_path, 'w', newline='', encoding='utf-8') as f:
+            char_writer = csv.DictWriter(f, fieldnames=["char", "learners", "times_shown", "correct",
+                                                        "incorrect", "accuracy"])
+            char_writer.writeheader()
+            char_writer.writerows(char_rows)
+    
+    answered = totals["total_correct"] + totals["total_incorrect"]
+    hardest = sorted((row for row in char_rows if row["correct"] + row["incorrect"] >= min_attempts),
+                     key=lambda row: row["accuracy"])[:top_n]
+    cohort_summary = dict(
+        totals,
+        accuracy=round(totals["total_correct"] / answered * 100, 2) if answered > 0 else 0.0,
+        hardest=[{"char": row["char"], "accuracy": row["accuracy"]} for row in hardest],
+        srs_levels=dict(sorted(srs_distribution.items()))
+    )
+    
+    if not is_csv:
+        with open(output_path, 'a', encoding='utf-8') as out:
+            out.write(json.dumps(dict(cohort_summary, type="summary"), ensure_ascii=False) + "\n")
+    return cohort_summary
+
+# Simulador de estudiantes virtuales (modo --simulate)
+DEFAULT_SIMULATION_CONFIG = {
+    "intervals": [1, 3, 7, 14, 30, 90, 180],  # SRSScheduler.intervals
+    "algorithm": "Estándar",  # o "SRS Avanzado" (prioridad de AdaptiveLearning)
+    "difficulty_weight": 2.0,
+    "recency_weight": 1.5,
+    "new_per_day": 10,  # Caracteres nuevos que se introducen cada día
+    "max_reviews_per_day": 100,  # Respuestas máximas por estudiante y día
+    "first_recall": 0.35,  # Probabilidad de acertar un carácter la primera vez
+    "initial_stability": 3.0,  # Días hasta que la probabilidad de recuerdo cae a 1/e
+    "stability_growth": 3.0,  # Crecimiento de la estabilidad tras un acierto difícil
+    "lapse_factor": 0.4,  # Fracción de estabilidad que se conserva tras un fallo
+}
+
+class SimulatedClock:
+    """Reloj manual que sustituye a datetime.now en el SRS y en el aprendizaje adaptativo"""
+    
+    def __init__(self, start):
+        self.now = start
+    
+    def __call__(self):
+        return self.now
+
+def simulate_learner(seed, days, hiragana_categories, config=None):
+    """Simula a un estudiante durante `days` días con el planificador y la selección reales
+    
+    El recuerdo de cada carácter sigue una curva de olvido p = exp(-t / S), donde t son
+    los días desde el último repaso y S la estabilidad. S depende de la habilidad del
+    estudiante y de la dificultad del carácter; crece tras un acierto (más cuanto menos
+    probable era) y se reduce tras un fallo. Cada día se introducen caracteres nuevos y
+    se responden los pendientes del SRS (hasta un máximo) mediante QuizEngine.
+    Devuelve listas por día con repasos, aciertos, retención y tiempo de cálculo.
+    """
+    config = dict(DEFAULT_SIMULATION_CONFIG, **(config or {}))
+    rng = random.Random(seed)
+    random.seed(seed)  # QuizEngine sortea con el generador global
+    start = datetime(2024, 1, 1, 9, 0)
+    clock = SimulatedClock(start)
+    
+    scheduler = SRSScheduler()
+    scheduler.intervals = list(config["intervals"])
+    scheduler.clock = clock
+    adaptive = AdaptiveLearning()
+    adaptive.difficulty_weight = config["difficulty_weight"]
+    adaptive.recency_weight = config["recency_weight"]
+    adaptive.clock = clock
+    engine = QuizEngine(hiragana_categories, srs_scheduler=scheduler, adaptive_learning=adaptive)
+    engine.srs_mode = True
+    engine.filters = {"due"}
+    engine.algorithm = config["algorithm"]
+    
+    prompts = engine.deck.prompts
+    item_rng = random.Random(len(prompts))  # Misma dificultad por carácter para todos los estudiantes
+    difficulty = {prompt: item_rng.uniform(0.6, 1.6) for prompt in prompts}
+    ability = rng.lognormvariate(0, 0.25)
+    memory = {}  # carácter -> [estabilidad en días, día del último repaso]
+    next_new = 0
+    
+    result = {key: [0] * days for key in ("reviews", "correct", "new", "mature_reviews",
+                                          "mature_correct", "backlog")}
+    result["expected_recall"] = [0.0] * days
+    result["compute_seconds"] = [0.0] * days
+    
+    for day in range(days):
+        clock.now = start + timedelta(days=day)
+        for _ in range(config["new_per_day"]):
+            if next_new >= len(prompts):
+                break
+            engine.study_history.setdefault(prompts[next_new], {"times_shown": 0, "correct": 0, "incorrect": 0})
+            next_new += 1
+            result["new"][day] += 1
+        engine.refresh_due()
+        
+        compute = 0.0
+        reviews = 0
+        while reviews < config["max_reviews_per_day"]:
+            started = time.perf_counter()
+            if not engine.dynamic_set("due"):
+                compute += time.perf_counter() - started
+                break
+            question = engine.next_question()
+            compute += time.perf_counter() - started
+            
+            char = question["question"]
+            state = memory.get(char)
+            recall = config["first_recall"] if state is None else math.exp(-(day - state[1]) / state[0])
+            is_correct = rng.random() < recall
+            
+            started = time.perf_counter()
+            engine.grade(question["answer"] if is_correct else "?")
+            compute += time.perf_counter() - started
+            
+            strength = ability / difficulty[char]
+            if state is None:
+                memory[char] = [config["initial_stability"] * strength, day]
+            else:
+                if is_correct:
+                    state[0] *= 1 + config["stability_growth"] * strength * (1.2 - recall)
+                else:
+                    state[0] = max(config["initial_stability"] * strength * 0.5, state[0] * config["lapse_factor"])
+                state[1] = day
+                result["mature_reviews"][day] += 1
+                result["mature_correct"][day] += is_correct
+            reviews += 1
+            result["correct"][day] += is_correct
+        
+        result["reviews"][day] = reviews
+        result["backlog"][day] = len(engine.dynamic_set("due"))
+        result["compute_seconds"][day] = compute
+        # Probabilidad media de recordar mañana los caracteres ya introducidos
+        if memory:
+            result["expected_recall"][day] = sum(
+                math.exp(-(day + 1 - last) / stability) for stability, last in memory.values()) / len(memory)
+    return result
+
+def _simulate_batch(args):
+    """Simula un lote de estudiantes y suma sus resultados por día (proceso trabajador)"""
+    seeds, days, hiragana_categories, config = args
+    totals = None
+    for seed in seeds:
+        result = simulate_learner(seed, days, hiragana_categories, config)
+        if totals is None:
+            totals = result
+        else:
+            for key, values in result.items():
+                totals[key] = [a + b for a, b in zip(totals[key], values)]
+    return len(seeds), totals
+
+def run_simulation(learners=1000, days=60, config=None, workers=None, seed=0, hiragana_categories=None):
+    """Simula `learners` estudiantes en paralelo y devuelve un informe por día simulado
+    
+    Por día: repasos, caracteres nuevos y pendientes sin hacer por estudiante, precisión,
+    retención de los caracteres ya vistos, recuerdo esperado y coste de cálculo del motor.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    if hiragana_categories is None:
+        hiragana_categories, _ = load_hiragana_content()
+    config = dict(DEFAULT_SIMULATION_CONFIG, **(config or {}))
+    workers = workers or os.cpu_count() or 1
+    batch_size = max(1, min(50, learners // (workers * 4) or 1))
+    seeds = [seed * 1_000_003 + i for i in range(learners)]
+    batches = [(seeds[i:i + batch_size], days, hiragana_categories, config)
+               for i in range(0, learners, batch_size)]
+    
+    started = time.perf_counter()
+    totals = None
+    simulated = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for count, batch in executor.map(_simulate_batch, batches):
+            simulated += count
+            if totals is None:
+                totals = batch
+            else:
+                for key, values in batch.items():
+                    totals[key] = [a + b for a, b in zip(totals[key], values)]
+    wall = time.perf_counter() - started
+    
+    per_day = []
+    for day in range(days):
+        reviews = totals["reviews"][day]
+        mature = totals["mature_reviews"][day]
+        compute = totals["compute_seconds"][day]
+        per_day.append({
+            "day": day + 1,
+            "reviews_per_learner": round(reviews / simulated, 2),
+            "new_per_learner": round(totals["new"][day] / simulated, 2),
+            "backlog_per_learner": round(totals["backlog"][day] / simulated, 2),
+            "accuracy": round(totals["correct"][day] / reviews * 100, 2) if reviews else 0.0,
+            "retention": round(totals["mature_correct"][day] / mature * 100, 2) if mature else 0.0,
+            "expected_recall": round(totals["expected_recall"][day] / simulated * 100, 2),
+            "compute_ms_per_learner": round(compute / simulated * 1000, 3),
+            "us_per_review": round(compute / reviews * 1e6, 2) if reviews else 0.0,
+        })
+    total_reviews = sum(totals["reviews"])
+    return {
+        "learners": simulated,
+        "days": days,
+        "workers": workers,
+        "config": config,
+        "wall_seconds": round(wall, 2),
+        "total_reviews": total_reviews,
+        "reviews_per_second": round(total_reviews / wall, 1) if wall > 0 else 0.0,
+        "engine_seconds": round(sum(totals["compute_seconds"]), 2),
+        "per_day": per_day,
+    }
+
+def run_deck_benchmark(sizes=(100, 5000, 50000), questions=2000):
+    """Mide la construcción del mazo y la latencia de selección y de preguntas según su tamaño
+    
+    Devuelve, por tamaño, los milisegundos de construcción y los microsegundos por
+    operación; con un mazo indexado los tiempos por pregunta deben ser casi constantes.
+    """
+    results = {}
+    for size in sizes:
+        start = time.perf_counter()
+        deck = Deck.synthetic(size)
+        build_ms = (time.perf_counter() - start) * 1000
+        categories = list(deck.category_bits)
+        selection = set(categories[::2])
+        
+        engine = QuizEngine(hiragana_categories={})
+        engine._deck, engine._deck_source = deck, engine.hiragana_categories
+        engine.selected_categories = selection
+        engine.difficult_characters = {deck.prompts[i] for i in range(0, size, 50)}
+        
+        def per_op(func, repeat=questions):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            return (time.perf_counter() - start) / repeat * 1e6
+        
+        def answer_question():
+            engine.next_question()
+            engine.grade(engine.current_quiz_answer)
+        
+        start = time.perf_counter()
+        deck.select(selection)
+        select_cold_us = (time.perf_counter() - start) * 1e6
+        row = {
+            "items": len(deck),
+            "build_ms": round(build_ms, 2),
+            "select_cold_us": round(select_cold_us, 1),
+            "select_us": round(per_op(lambda: deck.select(selection)), 2),
+        }
+        for mode, direction in (("write", "hira_to_rom"), ("multiple", "hira_to_rom"), ("multiple", "rom_to_hira")):
+            engine.mode, engine.direction = mode, direction
+            row[f"question_{mode}_{direction}_us"] = round(per_op(engine.next_question), 2)
+        engine.difficult_only = True
+        row["question_difficult_us"] = round(per_op(engine.next_question, max(1, questions // 10)), 2)
+        engine.difficult_only = False
+        engine.mode, engine.direction = "write", "hira_to_rom"
+        
+        # Categorías ∧ pendientes ∧ difíciles (los elementos sin fecha de repaso cuentan como pendientes)
+        engine.study_history = {deck.prompts[i]: {"times_shown": 1, "correct": 0, "incorrect": 1}
+                                for i in range(0, size, 7)}
+        engine.filters = {"due", "difficult"}
+        row["question_filtered_us"] = round(per_op(engine.next_question, max(1, questions // 10)), 2)
+        engine.filters = set()
+        row["question_and_answer_us"] = round(per_op(answer_question), 2)
+        results[str(size)] = row
+    return results
+
+# Interfaz de terminal (--tui): tarjetas y quiz sin Tkinter
+class PlainScreen:
+    """Pantalla de terminal sin curses: escribe líneas y lee teclas sueltas
+    
+    Si la entrada es un TTY se pone en modo cbreak para que cada tecla llegue sin
+    esperar a Intro; si no (tuberías, pruebas), se lee carácter a carácter igualmente.
+    """
+    
+    def __init__(self, stdin=None, stdout=None):
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self._saved_mode = None
+    
+    def __enter__(self):
+        if termios is not None and self.stdin.isatty():
+            fd = self.stdin.fileno()
+            self._saved_mode = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._restore_mode()
+    
+    def _restore_mode(self):
+        if self._saved_mode is not None:
+            termios.tcsetattr(self.stdin.fileno(), termios.TCSADRAIN, self._saved_mode)
+    
+    def clear(self):
+        self.stdout.write("\x1b[2J\x1b[H" if self.stdout.isatty() else "\n")
+    
+    def write(self, text=""):
+        self.stdout.write(text + "\n")
+        self.stdout.flush()
+    
+    def read_key(self):
+        """Devuelve la tecla pulsada ("" al final de la entrada)"""
+        self.stdout.flush()
+        return self.stdin.read(1)
+    
+    def read_line(self, prompt):
+        """Lee una línea completa con eco (modo canónico); None al final de la entrada"""
+        self.stdout.write(prompt)
+        self.stdout.flush()
+        if self._saved_mode is not None:
+            termios.tcsetattr(self.stdin.fileno(), termios.TCSADRAIN, self._saved_mode)
+        try:
+            line = self.stdin.readline()
+        finally:
+            if self._saved_mode is not None:
+                tty.setcbreak(self.stdin.fileno())
+        return line.rstrip("\r\n") if line else None
+
+class CursesScreen:
+    """Pantalla de terminal sobre curses con la misma interfaz que PlainScreen"""
+    
+    def __init__(self, stdscr, curses_module):
+        self.stdscr = stdscr
+        self.curses = curses_module
+        self.row = 0
+    
+    def clear(self):
+        self.stdscr.erase()
+        self.row = 0
+    
+    def write(self, text=""):
+        height, width = self.stdscr.getmaxyx()
+        for line in text.split("\n"):
+            if self.row < height - 1:
+                self.stdscr.addstr(self.row, 0, line[:width - 1])
+                self.row += 1
+        self.stdscr.refresh()
+    
+    def read_key(self):
+        key = self.stdscr.get_wch()
+        return key if isinstance(key, str) else ""
+    
+    def read_line(self, prompt):
+        self.write(prompt)
+        self.curses.echo()
+        try:
+            line = self.stdscr.getstr(self.row - 1, len(prompt)).decode("utf-8", "replace")
+        finally:
+            self.curses.noecho()
+        return line
+
+class TerminalTrainer:
+    """Tarjetas y quiz en la terminal sobre el mismo motor, SRS y persistencia que la interfaz gráfica
+    
+    El progreso se carga y guarda (con bloqueo y fusión) en el mismo archivo de datos que
+    la aplicación de escritorio, y las respuestas se anotan en el registro de repasos del
+    perfil (por defecto, el que corresponde a `data_file`; False lo desactiva).
+    """
+    
+    def __init__(self, screen, data_file=DATA_FILE, review_log_file=None):
+        self.screen = screen
+        hiragana_categories, self.example_words = load_hiragana_content()
+        self.profile = LearnerProfile("terminal", data_file, hiragana_categories)
+        self.engine = self.profile.engine
+        if review_log_file is None:
+            review_log_file = review_log_path_for(data_file)
+        if review_log_file:
+            self.engine.review_log = ReviewLog(review_log_file)
+    
+    def run(self):
+        """Menú principal; guarda el progreso al salir (también con Ctrl+C)"""
+        try:
+            while True:
+                engine = self.engine
+                self.screen.clear()
+                self.screen.write(f"Entrenador de Hiragana v{APP_VERSION} (terminal)")
+                self.screen.write(
+                    f"Dirección: {'hiragana → romaji' if engine.direction == 'hira_to_rom' else 'romaji → hiragana'}"
+                    f" · Quiz: {'opción múltiple' if engine.mode == 'multiple' else 'escritura'}"
+                    f" · SRS: {'sí' if engine.srs_mode else 'no'}")
+                self.screen.write()
+                self.screen.write("[f] Tarjetas  [q] Quiz  [e] Estadísticas  [x] Salir")
+                self.screen.write("[d] Cambiar dirección  [m] Cambiar tipo de quiz  [s] Activar/desactivar SRS")
+                key = self.screen.read_key().lower()
+                if key in ("x", "\x1b", ""):
+                    break
+                if key == "f":
+                    self.flash_cards()
+                elif key == "q":
+                    self.quiz()
+                elif key == "e":
+                    self.show_stats()
+                elif key == "d":
+                    engine.direction = "rom_to_hira" if engine.direction == "hira_to_rom" else "hira_to_rom"
+                elif key == "m":
+                    engine.mode = "write" if engine.mode == "multiple" else "multiple"
+                elif key == "s":
+                    engine.srs_mode = not engine.srs_mode
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.save()
+    
+    def save(self):
+        """Guarda el progreso si ha cambiado (fusionándolo con lo guardado por otras instancias)"""
+        if not self.profile.dirty:
+            return
+        try:
+            merged = self.profile.progress_file.save(serialize_progress(self.engine, self.profile.achievements),
+                                                     indent=2)
+            apply_progress(self.engine, self.profile.achievements, merged)
+            self.profile.dirty = False
+        except Exception as e:
+            logger.error(f"Error al guardar datos desde la terminal: {e}")
+    
+    def _next_question(self):
+        try:
+            return self.engine.next_question()
+        except QuizGenerationError as e:
+            self.screen.write(str(e))
+            self.screen.read_key()
+            return None
+    
+    def flash_cards(self):
+        """Tarjetas: una tecla muestra la respuesta y otra pasa a la siguiente ([x] vuelve al menú)"""
+        while True:
+            question = self._next_question()
+            if question is None:
+                return
+            self.screen.clear()
+            self.screen.write(f"  {question['question']}")
+            self.screen.write()
+            self.screen.write("[espacio] Mostrar respuesta  [x] Volver")
+            if self.screen.read_key().lower() in ("x", "\x1b", ""):
+                return
+            char = self.engine._hiragana_for_question(question["question"]) or question["question"]
+            self.engine.record_shown(char)
+            self.profile.dirty = True
+            self.screen.write(f"  {question['answer']}")
+            if char in self.example_words:
+                word, romaji, meaning = self.example_words[char]
+                self.screen.write(f"  Ejemplo: {word} ({romaji}) - {meaning}")
+            self.screen.write()
+            self.screen.write("[espacio] Siguiente  [x] Volver")
+            if self.screen.read_key().lower() in ("x", "\x1b", ""):
+                return
+    
+    def quiz(self):
+        """Quiz de escritura u opción múltiple; una respuesta vacía (o [x] en opción múltiple) vuelve al menú"""
+        engine = self.engine
+        while True:
+            question = self._next_question()
+            if question is None:
+                return
+            self.screen.clear()
+            self.screen.write(f"Puntuación: {engine.score}/{engine.total_attempts} · Racha: {engine.streak}")
+            self.screen.write()
+            self.screen.write(f"  {question['question']}")
+            self.screen.write()
+            if engine.mode == "multiple":
+                for i, option in enumerate(question["options"], 1):
+                    self.screen.write(f"  [{i}] {option}")
+                self.screen.write("  [x] Volver")
+                key = self.screen.read_key()
+                while key not in ("x", "X", "\x1b", "") and not (key.isdigit() and 1 <= int(key) <= len(question["options"])):
+                    key = self.screen.read_key()
+                if not key.isdigit():
+                    return
+                result = engine.grade_option(int(key) - 1)
+            else:
+                answer = self.screen.read_line("Respuesta (vacía para volver): ")
+                if not answer or not answer.strip():
+                    return
+                result = engine.grade(answer)
+            self.profile.dirty = True
+            
+            if result["correct"] and result["variant"] not in (None, "item") and result["user_answer"] != result["answer"]:
+                self.screen.write(f"¡Correcto! ({ROMANIZATION_NAMES[result['variant']]}; también: {result['answer']})")
+            elif result["correct"]:
+                self.screen.write("¡Correcto!")
+            else:
+                self.screen.write(f"Incorrecto. La respuesta era: {result['answer']}")
+            if result["mastered"]:
+                self.screen.write(f"¡Has dominado {result['mastered']}! Se quita de difíciles.")
+            self.screen.write("[espacio] Siguiente  [x] Volver")
+            if self.screen.read_key().lower() in ("x", "\x1b", ""):
+                return
+    
+    def show_stats(self):
+        """Resumen de estadísticas y repasos previstos"""
+        stats = self.profile.stats()
+        forecast = self.engine.srs_scheduler.forecast(self.engine.study_history, 7)
+        self.screen.clear()
+        self.screen.write("Estadísticas")
+        self.screen.write()
+        self.screen.write(f"Caracteres estudiados: {stats['studied_chars']}")
+        self.screen.write(f"Repeticiones: {stats['total_shown']} · Correctas: {stats['total_correct']}"
+                          f" · Incorrectas: {stats['total_incorrect']}")
+        self.screen.write(f"Precisión general: {stats['accuracy']:.1f}%")
+        self.screen.write(f"Caracteres difíciles: {len(self.engine.difficult_characters)}")
+        self.screen.write(f"Pendientes hoy: {stats['due_today']} · Próximos 7 días: {sum(forecast['due'])}")
+        romanization = format_romanization_counts(stats["romanization"])
+        if romanization:
+            self.screen.write(f"Romanización usada: {romanization}")
+        if stats["confused_pairs"]:
+            self.screen.write("Más confundidos: " + ", ".join(f"{a}/{b} ({count})"
+                                                              for a, b, count in stats["confused_pairs"]))
+        self.screen.write()
+        self.screen.write("Pulsa una tecla para volver")
+        self.screen.read_key()
+
+def run_tui(data_file=DATA_FILE, plain=False):
+    """Ejecuta la interfaz de terminal: curses si está disponible (y hay TTY), si no texto simple"""
+    curses_module = None
+    if not plain and sys.stdin.isatty() and sys.stdout.isatty() and os.environ.get("TERM", "dumb") != "dumb":
+        try:
+            import curses as curses_module
+        except ImportError:
+            curses_module = None
+    
+    if curses_module is not None:
+        def main(stdscr):
+            curses_module.curs_set(0)
+            TerminalTrainer(CursesScreen(stdscr, curses_module), data_file).run()
+        curses_module.wrapper(main)
+    else:
+        with PlainScreen() as screen:
+            TerminalTrainer(screen, data_file).run()
+
+def parse_arguments(argv=None):
+    """Analiza los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Hiragana Trainer - entrenador de hiragana")
+    parser.add_argument("--serve", action="store_true",
+                        help="Ejecuta el servicio HTTP/JSON para varios estudiantes en lugar de la interfaz")
+    parser.add_argument("--loadtest", action="store_true",
+                        help="Lanza estudiantes simulados contra un servicio en ejecución")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección del servicio (por defecto 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto del servicio (por defecto 8765)")
+    parser.add_argument("--profiles-dir", default="profiles",
+                        help="Carpeta con los archivos de progreso de cada estudiante")
+    parser.add_argument("--flush-interval", type=float, default=5.0,
+                        help="Segundos entre guardados en segundo plano de los perfiles")
+    parser.add_argument("--cohort", metavar="DIR",
+                        help="Analiza todos los archivos de progreso de DIR y escribe el resultado en --output")
+    parser.add_argument("--output", default="cohort.csv",
+                        help="Archivo de salida de --cohort (.csv o .jsonl)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos trabajadores para --cohort (por defecto, uno por núcleo)")
+    parser.add_argument("--sync", metavar="DIR",
+                        help="Sincroniza el archivo de datos con otras instalaciones a través de DIR")
+    parser.add_argument("--data-file", default=DATA_FILE, help="Archivo de datos para --sync, --tui y --replay")
+    parser.add_argument("--tui", action="store_true",
+                        help="Ejecuta las tarjetas y el quiz en la terminal (sin Tkinter)")
+    parser.add_argument("--plain", action="store_true",
+                        help="Con --tui, usa texto simple en lugar de curses")
+    parser.add_argument("--bench-deck", action="store_true",
+                        help="Mide la latencia del mazo y del quiz con 100, 5.000 y 50.000 elementos")
+    parser.add_argument("--learners", type=int, default=200,
+                        help="Estudiantes simulados en --loadtest y --simulate")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Simula --learners estudiantes durante --days días con el SRS y la selección reales")
+    parser.add_argument("--days", type=int, default=60, help="Días simulados en --simulate")
+    parser.add_argument("--sim-config", metavar="FILE", default=None,
+                        help="JSON con parámetros de --simulate (intervals, algorithm, pesos, new_per_day...)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duración en segundos de --loadtest")
+    parser.add_argument("--perf", metavar="FILE", nargs="?", const="hiragana_perf.json", default=None,
+                        help="Mide los tiempos de la interfaz y los guarda en FILE (JSON) al salir")
+    parser.add_argument("--replay", metavar="SOURCE",
+                        help="Reconstruye el progreso a partir de un registro de repasos (.bin, .csv o .jsonl)")
+    parser.add_argument("--replay-configs", metavar="FILE", default=None,
+                        help="JSON con una lista de configuraciones {name, intervals, pesos} para comparar en --replay")
+    parser.add_argument("--replay-output", metavar="FILE", default=None,
+                        help="Archivo de datos donde guardar el progreso reconstruido por --replay")
+    parser.add_argument("--optimize", metavar="LOG", nargs="+",
+                        help="Ajusta pesos e intervalos a uno o varios registros de repasos (.bin, .csv, .jsonl)")
+    parser.add_argument("--optimize-output", metavar="FILE", default=params_path_for(DATA_FILE),
+                        help="Archivo de parámetros del perfil que escribe --optimize")
+    parser.add_argument("--samples", type=int, default=400, help="Combinaciones de pesos que prueba --optimize")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=None,
+                        help="Nivel de logging (por defecto, el de la configuración o INFO)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
     import signal
     import sys
     
+    args = parse_arguments()
+    # El log se configura al ejecutar la aplicación, no al importar el módulo (pruebas, procesos)
+    configure_logging(args.log_level or "INFO")
+    if args.perf:
+        perf_registry.enabled = True
+        atexit.register(perf_registry.dump, args.perf)
+    
+    if args.tui:
+        run_tui(args.data_file, args.plain)
+        sys.exit(0)
+    
+    if args.serve:
+        run_service(args.host, args.port, args.profiles_dir, args.flush_interval)
+        sys.exit(0)
+    
+    if args.cohort:
+        summary = run_cohort_analysis(args.cohort, args.output, args.workers)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        sys.exit(0)
+    
+    if args.sync:
+        print(json.dumps(run_sync(args.sync, args.data_file), ensure_ascii=False, indent=2))
+        sys.exit(0)
+    
+    if args.simulate:
+        sim_config = None
+        if args.sim_config:
+            with open(args.sim_config, 'r', encoding='utf-8') as f:
+                sim_config = json.load(f)
+        report = run_simulation(args.learners, args.days, sim_config, args.workers)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        sys.exit(0)
+    
+    if args.replay:
+        replay_configs = None
+        if args.replay_configs:
+            with open(args.replay_configs, 'r', encoding='utf-8') as f:
+                replay_configs = json.load(f)
+        print(format_replay_report(run_replay(args.replay, replay_configs, args.replay_output,
+                                              data_file=args.data_file)))
+        sys.exit(0)
+    
+    if args.optimize:
+        params = optimize_parameters(args.optimize, args.samples, args.workers)
+        write_json_atomic(args.optimize_output, json.dumps(params, ensure_ascii=False, indent=2))
+        print(json.dumps(params, ensure_ascii=False, indent=2))
+        sys.exit(0)
+    
+    if args.bench_deck:
+        print(json.dumps(run_deck_benchmark(), ensure_ascii=False, indent=2))
+        sys.exit(0)
+    
+    if args.loadtest:
+        summary = run_load_generator(args.host, args.port, args.learners, args.duration)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        sys.exit(1 if summary["errors"] else 0)
+    
     # Función para manejar Ctrl+C
     def signal_handler(sig, frame):
         print("Cerrando la aplicación...")
@@ -3972,8 +9213,10 @@ if __name__ == "__main__":
     # Registrar el manejador para SIGINT (Ctrl+C)
     signal.signal(signal.SIGINT, signal_handler)
     
-    root = tk.Tk()
+    root = load_tk().Tk()
     app = HiraganaTrainer(root)
+    if args.log_level:
+        set_log_level(args.log_level)  # La línea de comandos tiene prioridad sobre la configuración
     
     # Configurar evento de cierre
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hiragana  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    """Cada prueba trabaja en un directorio temporal (cachés y archivos de datos relativos)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def engine():
+    """Motor de quiz sin interfaz con el contenido predeterminado"""
+    return hiragana.QuizEngine(hiragana.DEFAULT_HIRAGANA_CATEGORIES)
+
+
+@pytest.fixture
+def play():
+    """Devuelve una función que responde `count` preguntas del motor (bien o mal)"""
+    def answer(engine, count=1, correct=True):
+        results = []
+        for _ in range(count):
+            engine.next_question()
+            results.append(engine.grade(engine.current_quiz_answer if correct else "???"))
+        return results
+    return answer
@@ -0,0 +1,132 @@
+"""Pruebas del motor de quiz sin interfaz (QuizEngine): preguntas, corrección, SRS y difíciles"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import hiragana
+
+CATEGORIES = {
+    "Vocales": [["あ", "a"], ["い", "i"], ["う", "u"], ["え", "e"], ["お", "o"]],
+    "K": [["か", "ka"], ["き", "ki"], ["く", "ku"], ["け", "ke"], ["こ", "ko"]],
+    "Solo a": [["あ", "a"]],
+}
+ROMAJI = {kana: romaji for pairs in CATEGORIES.values() for kana, romaji in pairs}
+
+
+@pytest.fixture
+def quiz():
+    engine = hiragana.QuizEngine(CATEGORIES)
+    engine.selected_categories = {"Vocales", "K"}
+    return engine
+
+
+def test_hira_to_rom_question_and_correct_answer(quiz):
+    question = quiz.next_question()
+
+    assert question["question"] in ROMAJI and question["answer"] == ROMAJI[question["question"]]
+    result = quiz.grade(question["answer"].upper() + " ")
+    assert result["correct"] and result["question"] == question["question"]
+    assert (quiz.score, quiz.total_attempts, quiz.streak) == (1, 1, 1)
+    assert quiz.study_history[question["question"]]["correct"] == 1
+
+
+def test_rom_to_hira_asks_romaji_and_marks_the_kana_difficult(quiz):
+    quiz.direction = "rom_to_hira"
+    question = quiz.next_question()
+
+    assert ROMAJI[question["answer"]] == question["question"]
+    result = quiz.grade("???")
+    assert not result["correct"] and quiz.streak == 0
+    assert result["marked_difficult"] == question["answer"]
+    assert quiz.difficult_characters == {question["answer"]}
+
+
+@pytest.mark.parametrize("direction", ["hira_to_rom", "rom_to_hira"])
+def test_multiple_choice_offers_four_answer_side_options(quiz, direction):
+    quiz.mode = "multiple"
+    quiz.direction = direction
+    question = quiz.next_question()
+    answers = set(ROMAJI.values()) if direction == "hira_to_rom" else set(ROMAJI)
+
+    assert len(question["options"]) == 4 and set(question["options"]) <= answers
+    assert question["options"][question["correct_index"]] == question["answer"]
+    wrong = next(i for i, option in enumerate(question["options"]) if option != question["answer"])
+    assert not quiz.grade_option(wrong)["correct"]
+    quiz.next_question()
+    assert quiz.grade_option(quiz.correct_option_index)["correct"]
+
+
+def test_grading_needs_a_question_and_an_answer(quiz):
+    with pytest.raises(hiragana.QuizGenerationError):
+        quiz.grade("a")
+    quiz.next_question()
+    with pytest.raises(ValueError):
+        quiz.grade("  ")
+
+
+def test_srs_mode_asks_only_due_characters_and_schedules_them(quiz):
+    now = datetime.now()
+    for kana in ROMAJI:
+        due = now - timedelta(days=1) if kana == "き" else now + timedelta(days=3)
+        quiz.study_history[kana] = {"times_shown": 1, "correct": 1, "incorrect": 0,
+                                    "srs_level": 1, "next_review": due.isoformat()}
+    quiz.srs_mode = True
+
+    question = quiz.next_question()
+    assert question["question"] == "き"
+    quiz.grade("ki")
+
+    record = quiz.study_history["き"]
+    assert record["srs_level"] == 2
+    assert datetime.fromisoformat(record["next_review"]) > now + timedelta(days=2)
+
+
+def test_srs_mode_falls_back_when_no_selected_character_is_due(quiz):
+    quiz.srs_mode = True
+    quiz.selected_categories = {"K"}
+    quiz.study_history["あ"] = {"times_shown": 1, "correct": 0, "incorrect": 1,
+                                "next_review": (datetime.now() - timedelta(days=1)).isoformat()}
+
+    assert quiz.next_question()["question"] in {"か", "き", "く", "け", "こ"}
+    assert "srs_empty" in quiz.notices and not quiz.srs_mode
+
+
+def test_difficult_character_is_mastered_after_three_correct_answers_in_a_row(quiz):
+    quiz.selected_categories = {"Solo a"}
+    quiz.next_question()
+    quiz.grade("x")
+    assert quiz.difficult_characters == {"あ"}
+
+    # Un fallo en medio reinicia la cuenta
+    for answer in ("a", "a", "x", "a", "a"):
+        quiz.next_question()
+        assert not quiz.grade(answer)["mastered"]
+    quiz.next_question()
+
+    assert quiz.grade("a")["mastered"] == "あ"
+    assert quiz.difficult_characters == set()
+
+
+def test_difficult_only_uses_the_difficult_set_or_warns(quiz):
+    quiz.difficult_only = True
+    quiz.next_question()
+    assert "no_difficult" in quiz.notices and not quiz.difficult_only
+
+    quiz.difficult_characters = {"け"}
+    quiz.difficult_only = True
+    assert quiz.next_question()["question"] == "け"
+
+
+def test_studied_characters_are_listed_once(quiz):
+    quiz.record_shown("あ")
+    quiz.record_shown("あ")
+    quiz.selected_categories = {"Solo a"}
+    quiz.next_question()
+    quiz.grade("a")
+    assert quiz.achievement_data['studied_chars'] == ["あ"]
+
+    # Una lista nueva (al cargar o importar) sustituye a la consultada hasta ahora
+    quiz.achievement_data['studied_chars'] = ["い"]
+    quiz.record_shown("い")
+    quiz.record_shown("う")
+    assert quiz.achievement_data['studied_chars'] == ["い", "う"]
@@ -0,0 +1,87 @@
+"""Pruebas de la exportación: ida y vuelta de cada formato (CSV, JSON y JSON Lines, con compresión)"""
+import csv
+import gzip
+import lzma
+
+import pytest
+
+import hiragana
+
+HISTORY = {
+    "あ": {"times_shown": 4, "correct": 3, "incorrect": 1, "srs_level": 2,
+           "last_shown": "2024-03-01T10:00:00", "next_review": "2024-03-05T10:00:00"},
+    "き": {"times_shown": 2, "correct": 0, "incorrect": 2, "last_review": "2024-03-02T09:30:00"},
+    "ん": {"times_shown": 1, "correct": 1, "incorrect": 0},
+}
+DIFFICULT = {"き"}
+ACHIEVEMENT_DATA = {"sessions_completed": 3, "total_study_time": 1.5, "perfect_quiz_count": 1,
+                    "max_streak": 7, "study_dates": ["2024-03-01", "2024-03-02"],
+                    "studied_chars": ["あ", "き", "ん"]}
+
+
+def export(path, **kwargs):
+    return hiragana.export_study_data(str(path), HISTORY, DIFFICULT, ACHIEVEMENT_DATA, **kwargs)
+
+
+@pytest.mark.parametrize("name", ["datos.json", "datos.jsonl", "datos.json.gz", "datos.jsonl.xz"])
+def test_export_then_import_restores_the_progress(work_dir, name):
+    path = work_dir / name
+    assert export(path) == len(HISTORY)
+
+    summary, changes = hiragana.import_study_data(str(path), {}, set(), {}, mode="replace")
+
+    assert summary["records"] == len(HISTORY) and summary["invalid"] == 0
+    assert changes["records"] == HISTORY
+    assert changes["difficult"] == DIFFICULT
+    assert changes["achievement_data"] == ACHIEVEMENT_DATA
+
+
+@pytest.mark.parametrize("name", ["datos.json", "datos.jsonl.xz"])
+def test_iter_import_records_yields_every_exported_record(work_dir, name):
+    path = work_dir / name
+    export(path)
+
+    records = list(hiragana.iter_import_records(str(path)))
+
+    assert {key: value for kind, key, value in records if kind == "character"} == HISTORY
+    assert {key for kind, key, _ in records if kind == "difficult"} == DIFFICULT
+    fields = {key: value for kind, key, value in records if kind == "field"}
+    assert fields["achievement_data"] == ACHIEVEMENT_DATA
+
+
+@pytest.mark.parametrize("name, opener", [("datos.json.gz", gzip.open), ("datos.jsonl.xz", lzma.open)])
+def test_compressed_exports_are_really_compressed(work_dir, name, opener):
+    path = work_dir / name
+    export(path)
+
+    with opener(path, 'rt', encoding='utf-8') as f:
+        assert "あ" in f.read()
+
+
+@pytest.mark.parametrize("name", ["datos.csv", "datos.csv.gz"])
+def test_csv_export_lists_the_statistics_of_each_character(work_dir, name):
+    path = work_dir / name
+    export(path)
+
+    with hiragana.open_export_file(str(path), 'r') as f:
+        rows = list(csv.reader(f))
+
+    assert rows[0] == hiragana.STATS_CSV_HEADER
+    assert rows[1:] == [["あ", "4", "3", "1", "75.0%", "No"],
+                        ["き", "2", "0", "2", "0.0%", "Sí"],
+                        ["ん", "1", "1", "0", "100.0%", "No"]]
+
+
+def test_export_format_can_be_forced_and_progress_is_reported(work_dir):
+    path = work_dir / "datos.txt"
+    calls = []
+
+    assert export(path, format_type="jsonl", progress=lambda done, total: calls.append((done, total)),
+                  progress_every=2) == 3
+    assert calls == [(2, 3), (3, 3)]
+    assert path.read_text(encoding="utf-8").count("\n") == len(HISTORY) + 2
+
+
+def test_unknown_export_format_is_rejected(work_dir):
+    with pytest.raises(ValueError, match="desconocido"):
+        export(work_dir / "datos.csv", format_type="xml")
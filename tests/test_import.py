@@ -0,0 +1,90 @@
+"""Pruebas de la importación: validación de registros, fusión, simulación y reemplazo"""
+import json
+
+import pytest
+
+import hiragana
+
+
+def counters(history):
+    """Suma de cada contador del historial"""
+    return {key: sum(record.get(key, 0) for record in history.values())
+            for key in hiragana.STUDY_COUNTER_FIELDS}
+
+
+def test_validate_study_record_keeps_known_fields():
+    record = hiragana.validate_study_record("あ", {
+        "times_shown": 3, "correct": 2, "incorrect": 1, "srs_level": 2,
+        "last_shown": "2024-01-02T10:00:00", "extra": "se ignora"})
+
+    assert record == {"times_shown": 3, "correct": 2, "incorrect": 1, "srs_level": 2,
+                      "last_shown": "2024-01-02T10:00:00"}
+
+
+@pytest.mark.parametrize("char, data", [
+    ("", {"times_shown": 1}),
+    ("あ", ["no", "es", "un", "objeto"]),
+    ("あ", {"times_shown": -1}),
+    ("あ", {"correct": True}),
+    ("あ", {"correct": 1.5}),
+    ("あ", {"last_shown": "ayer"}),
+    ("あ", {"srs_level": -2}),
+])
+def test_validate_study_record_rejects_invalid_data(char, data):
+    with pytest.raises(ValueError):
+        hiragana.validate_study_record(char, data)
+
+
+def write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write((record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)) + "\n")
+
+
+def test_import_merge_counts_invalid_records_and_sums_counters(work_dir):
+    path = str(work_dir / "import.jsonl")
+    write_jsonl(path, [
+        {"type": "character", "char": "あ", "times_shown": 4, "correct": 3, "incorrect": 1, "difficult": True},
+        {"type": "character", "char": "い", "times_shown": -1},
+        "{no es json",
+        {"type": "character", "char": "う", "times_shown": 1, "correct": 1, "incorrect": 0},
+    ])
+    history = {"あ": {"times_shown": 1, "correct": 1, "incorrect": 0}}
+
+    summary, changes = hiragana.import_study_data(path, history, set(), {}, mode="merge")
+
+    assert (summary["records"], summary["invalid"], summary["new"], summary["updated"]) == (2, 2, 1, 1)
+    assert summary["difficult_added"] == 1
+    difficult = set()
+    hiragana.apply_import_changes(changes, history, difficult, {})
+    assert history["あ"] == {"times_shown": 5, "correct": 4, "incorrect": 1}
+    assert difficult == {"あ"}
+
+
+def test_import_dry_run_does_not_keep_records(work_dir):
+    path = str(work_dir / "import.jsonl")
+    write_jsonl(path, [{"type": "character", "char": "あ", "times_shown": 1, "correct": 1, "incorrect": 0}])
+
+    summary, changes = hiragana.import_study_data(path, {}, set(), {}, dry_run=True)
+
+    assert summary["new"] == 1 and changes is None
+
+
+def test_replace_import_keeps_answers_given_while_importing(engine, play, work_dir):
+    play(engine, 4)
+    achievements = hiragana.create_achievements()
+    path = str(work_dir / "import.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        # Un carácter fuera del mazo: no puede coincidir con las respuestas de la prueba
+        json.dump({"study_history": {"ゐ": {"times_shown": 7, "correct": 7, "incorrect": 0}}}, f)
+
+    snapshot = hiragana.snapshot_progress(engine, achievements)
+    summary, changes = hiragana.import_study_data(
+        path, snapshot['study_history'], set(snapshot['difficult_characters']),
+        snapshot['achievement_data'], mode="replace")
+    play(engine, 2)  # Respuestas mientras el hilo importa
+    merged = hiragana.merge_import_result(snapshot, hiragana.serialize_progress(engine, achievements), changes)
+
+    assert summary["removed"] == len(snapshot['study_history'])
+    assert merged['study_history']["ゐ"]["times_shown"] == 7
+    assert counters(merged['study_history'])["times_shown"] == 7 + 2
@@ -0,0 +1,57 @@
+"""Pruebas del ajuste de parámetros (--optimize): sesgo del modelo adaptativo y pesos aplicados"""
+import pytest
+
+import hiragana
+
+np = pytest.importorskip("numpy")
+
+
+def features(seed, recall, count=3000):
+    """Respuestas con el carácter visto hace más de una semana (recency = 1), como en un uso real"""
+    rng = np.random.default_rng(seed)
+    return {
+        "error_rate": rng.uniform(0, 0.4, count),
+        "recency": np.ones(count),
+        "frequency": 1.0 / (1 + rng.integers(1, 50, count)),
+        "recalled": rng.random(count) < recall,
+    }
+
+
+def brute_force(features, weights):
+    """Mejor log-verosimilitud sobre una rejilla de sesgos"""
+    priority = (weights[0] * features["error_rate"] + weights[1] * features["recency"]
+                + weights[2] * features["frequency"])
+    recalled = features["recalled"]
+    best = -np.inf
+    for bias in np.linspace(-10, 20, 3001):
+        z = bias - priority
+        best = max(best, -(np.logaddexp(0, -z[recalled]).sum() + np.logaddexp(0, z[~recalled]).sum()))
+    return best
+
+
+@pytest.mark.parametrize("seed, recall", [(0, 0.95), (1, 0.85), (2, 0.6)])
+@pytest.mark.parametrize("weights", [(2.0, 1.5, 0.0), (0.5, 4.0, 3.0)])
+def test_bias_fit_reaches_the_brute_force_optimum(seed, recall, weights):
+    data = features(seed, recall)
+
+    log_likelihood, bias = hiragana.adaptive_log_likelihood(data, *weights)
+
+    assert -10 < bias < 20
+    assert log_likelihood == pytest.approx(brute_force(data, weights), abs=0.01)
+
+
+def test_bias_fit_stays_finite_when_everything_is_recalled():
+    data = features(0, 1.0)
+
+    log_likelihood, bias = hiragana.adaptive_log_likelihood(data, 2.0, 1.5, 0.0)
+
+    assert np.isfinite(bias) and -1e-3 < log_likelihood <= 0
+
+
+def test_negative_weights_are_not_applied():
+    adaptive = hiragana.AdaptiveLearning()
+
+    hiragana.apply_model_params({"adaptive": {"difficulty_weight": 1.2, "frequency_weight": -0.69}},
+                                adaptive_learning=adaptive)
+
+    assert adaptive.difficulty_weight == 1.2 and adaptive.frequency_weight == 0.0
@@ -0,0 +1,105 @@
+"""Pruebas de persistencia: fusión a tres bandas y guardado desde varios procesos"""
+import copy
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import hiragana
+
+
+def counters(history):
+    """Suma de cada contador del historial"""
+    return {key: sum(record.get(key, 0) for record in history.values())
+            for key in hiragana.STUDY_COUNTER_FIELDS}
+
+
+# Fusión a tres bandas (ProgressFile)
+
+def test_merge_adds_local_and_disk_increments(engine, play):
+    play(engine, 5)
+    base = copy.deepcopy(hiragana.serialize_progress(engine, []))
+    disk = copy.deepcopy(base)
+    char = next(iter(disk['study_history']))
+    disk['study_history'][char]['times_shown'] += 2
+    disk['study_history'][char]['correct'] += 2
+    play(engine, 3, correct=False)
+
+    merged = hiragana.merge_progress(base, hiragana.serialize_progress(engine, []), disk)
+
+    assert counters(merged['study_history']) == {
+        "times_shown": 5 + 3 + 2, "correct": 5 + 2, "incorrect": 3}
+
+
+def test_merge_applies_local_difficult_changes_over_disk():
+    base = {'difficult_characters': ["あ", "い"]}
+    local = {'difficult_characters': ["い", "う"]}
+    disk = {'difficult_characters': ["あ", "い", "え"]}
+
+    merged = hiragana.merge_progress(base, local, disk)
+
+    assert merged['difficult_characters'] == ["い", "う", "え"]
+
+
+def test_merge_confusions_adds_local_increments():
+    store = hiragana.ConfusionStore()
+    store.record("ぬ", "め", 2)
+    base = store.to_dict()
+    store.record("ぬ", "め", 3)
+    disk = hiragana.ConfusionStore.from_dict(base)
+    disk.record("ぬ", "め", 1)
+
+    merged = hiragana.ConfusionStore.from_dict(
+        hiragana.merge_confusions(base, store.to_dict(), disk.to_dict()))
+
+    assert merged.count("ぬ", "め") == 2 + 3 + 1
+
+
+def test_save_merges_writers_and_replace_overwrites(work_dir):
+    path = str(work_dir / "progress.json")
+    first, second = hiragana.ProgressFile(path), hiragana.ProgressFile(path)
+    first.load()
+    second.load()
+
+    first.save({'study_history': {"あ": {"times_shown": 1, "correct": 1, "incorrect": 0}}})
+    merged = second.save({'study_history': {"い": {"times_shown": 2, "correct": 0, "incorrect": 2}}})
+    assert set(merged['study_history']) == {"あ", "い"}
+
+    second.save({'study_history': {"う": {"times_shown": 1, "correct": 1, "incorrect": 0}}}, replace=True)
+    with open(path, encoding='utf-8') as f:
+        assert set(json.load(f)['study_history']) == {"う"}
+
+
+def save_repeatedly(file_path, worker_id, iterations, save_every):
+    """Proceso de la prueba de estrés: incrementa contadores y guarda con fusión cada `save_every`"""
+    progress_file = hiragana.ProgressFile(file_path)
+    data = progress_file.load()
+    chars = [kana for kana, _ in hiragana.DEFAULT_HIRAGANA_CATEGORIES["Básicos"]]
+    for i in range(iterations):
+        record = data.setdefault('study_history', {}).setdefault(
+            chars[(worker_id + i) % len(chars)], {"times_shown": 0, "correct": 0, "incorrect": 0})
+        record["times_shown"] += 1
+        record["correct" if i % 2 else "incorrect"] += 1
+        achievement_data = data.setdefault('achievement_data', {})
+        achievement_data['sessions_completed'] = achievement_data.get('sessions_completed', 0) + 1
+        if (i + 1) % save_every == 0:
+            data = progress_file.save(data)
+    progress_file.save(data)
+
+
+@pytest.mark.skipif(hiragana.fcntl is None, reason="sin bloqueo de archivos en esta plataforma")
+@pytest.mark.parametrize("processes, iterations, save_every", [(4, 60, 3), (8, 40, 1)])
+def test_concurrent_saves_from_several_processes_add_up(work_dir, processes, iterations, save_every):
+    path = str(work_dir / "stress.json")
+    # fork: los procesos hijos no tienen que volver a importar este módulo de pruebas
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("fork")) as executor:
+        for future in [executor.submit(save_repeatedly, path, worker_id, iterations, save_every)
+                       for worker_id in range(processes)]:
+            future.result()
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    totals = counters(data['study_history'])
+    assert totals["times_shown"] == totals["correct"] + totals["incorrect"] == processes * iterations
+    assert data['achievement_data']['sessions_completed'] == processes * iterations
@@ -0,0 +1,100 @@
+"""Pruebas de la reproducción del historial (--replay) frente al motor en vivo"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import hiragana
+
+
+class FakeClock:
+    """Reloj que avanza `step` en cada respuesta"""
+
+    def __init__(self, start=datetime(2024, 3, 1, 9, 0), step=timedelta(hours=7)):
+        self.now = start
+        self.step = step
+
+    def __call__(self):
+        return self.now
+
+    def tick(self):
+        self.now += self.step
+
+
+# Secuencias de aciertos (True) y fallos (False) por carácter; None es una tarjeta mostrada
+SEQUENCES = {
+    "あ": [True, True, True, True],
+    "い": [False, True, True],
+    "う": [False, True, True, True, True],
+    "え": [True, False, True, None, True, False, True, True, True],
+    "お": [False, True, False, True, True, None, True],
+    "か": [None, None, True],
+    "き": [False, False, True, True, False],
+}
+
+
+@pytest.fixture
+def live(engine, work_dir):
+    """Responde SEQUENCES en vivo (intercaladas) y devuelve el motor y su registro de repasos"""
+    clock = FakeClock()
+    engine.srs_scheduler.clock = clock
+    engine.srs_mode = True
+    engine.review_log = hiragana.ReviewLog(str(work_dir / "reviews.bin"))
+    answers = dict(zip(engine.deck.prompts, engine.deck.answers))
+    for step in range(max(len(sequence) for sequence in SEQUENCES.values())):
+        for char, sequence in SEQUENCES.items():
+            if step >= len(sequence):
+                continue
+            clock.tick()
+            if sequence[step] is None:
+                engine.record_shown(char)
+                continue
+            engine.current_quiz_question = char
+            engine.current_quiz_answer = answers[char]
+            engine.grade(answers[char] if sequence[step] else "???")
+    return engine
+
+
+def test_replay_reproduces_live_state(live):
+    events = hiragana.load_review_events(live.review_log.file_path)
+    data = hiragana.replay_review_events(events, live.srs_scheduler.intervals)
+
+    assert set(data['difficult_characters']) == live.difficult_characters
+    assert data['max_streak'] == live.max_streak
+    for char, record in live.study_history.items():
+        assert data['study_history'][char] == record, char
+
+
+def test_difficult_rule_matches_engine(live):
+    # Un fallo marca el carácter; tres aciertos mientras es difícil lo quitan
+    assert live.difficult_characters == {"い", "き"}
+
+
+@pytest.mark.skipif(hiragana.np is None, reason="la ruta vectorizada necesita NumPy")
+def test_numpy_and_python_replay_agree(live, monkeypatch):
+    events = hiragana.load_review_events(live.review_log.file_path)
+    with_numpy = hiragana.replay_review_events(events)
+    monkeypatch.setattr(hiragana, "np", None)
+    plain_events = tuple(list(column) if i < 3 else column for i, column in enumerate(events))
+    without_numpy = hiragana.replay_review_events(plain_events)
+
+    assert with_numpy['difficult_characters'] == without_numpy['difficult_characters']
+    assert with_numpy['study_history'] == without_numpy['study_history']
+
+
+def test_replay_compares_more_than_one_config_by_default(live, work_dir):
+    report = hiragana.run_replay(live.review_log.file_path, data_file=str(work_dir / "datos.json"))
+
+    assert len(report["configs"]) >= 2
+    assert len({config["name"] for config in report["configs"]}) == len(report["configs"])
+
+
+def test_replay_adds_the_fitted_profile_params(work_dir):
+    data_file = str(work_dir / "datos.json")
+    with open(hiragana.params_path_for(data_file), 'w', encoding='utf-8') as f:
+        f.write('{"format": %d, "srs": {"intervals": [1, 4, 9, 20, 45, 100, 200]},'
+                ' "adaptive": {"difficulty_weight": 1.2, "recency_weight": 0.8}}' % hiragana.MODEL_PARAMS_FORMAT)
+
+    fitted = hiragana.default_replay_configs(data_file)[-1]
+
+    assert fitted == {"name": "ajustada", "intervals": [1, 4, 9, 20, 45, 100, 200],
+                      "difficulty_weight": 1.2, "recency_weight": 0.8}
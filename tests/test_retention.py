@@ -0,0 +1,47 @@
+"""Pruebas del modelo de retención (RetentionModel): recuperación de curvas de olvido sintéticas"""
+import numpy as np
+import pytest
+
+import hiragana
+
+STABILITY = {"あ": 2.0, "い": 10.0, "う": 40.0}
+
+
+def synthetic_events(stability, answers=400, seed=0):
+    """Eventos con el formato de load_review_events: aciertos con probabilidad exp(-t / S)"""
+    rng = np.random.default_rng(seed)
+    names = list(stability)
+    ts, items, results = [], [], []
+    for code, name in enumerate(names):
+        day = 0.0
+        for _ in range(answers + 1):
+            gap = rng.uniform(0.2, 3 * stability[name])
+            day += gap
+            ts.append(day * hiragana.DAY_MS)
+            items.append(code)
+            recalled = rng.random() < np.exp(-gap / stability[name])
+            results.append(hiragana.REVIEW_CORRECT if recalled else hiragana.REVIEW_INCORRECT)
+    order = np.argsort(ts, kind="stable")
+    return (np.asarray(ts, dtype=np.int64)[order], np.asarray(items, dtype=np.int64)[order],
+            np.asarray(results, dtype=np.uint8)[order], names)
+
+
+@pytest.mark.parametrize("decay", [None, 1.0])
+def test_fit_recovers_the_stability_of_each_character(decay):
+    # Con la recencia por defecto cada carácter conserva su propia estabilidad
+    events = synthetic_events(STABILITY)
+    model = hiragana.RetentionModel.fit(events) if decay is None else hiragana.RetentionModel.fit(events, decay=decay)
+
+    fitted = dict(zip(model.names, model.stability))
+    for name, expected in STABILITY.items():
+        assert fitted[name] == pytest.approx(expected, rel=0.2)
+
+
+def test_characters_with_few_answers_stay_near_the_global_stability():
+    ts, items, results, names = synthetic_events({**STABILITY, "え": 0.5})
+    # "え" se queda con dos respuestas (acertadas): sin la penalización se iría al máximo
+    keep = np.sort(np.r_[np.flatnonzero(items != 3), np.flatnonzero(items == 3)[:3]])
+    model = hiragana.RetentionModel.fit((ts[keep], items[keep], results[keep], names))
+
+    fitted = dict(zip(model.names, model.stability))
+    assert fitted["え"] == pytest.approx(model.global_stability, rel=0.5)
@@ -0,0 +1,60 @@
+"""Pruebas de la transliteración romaji -> hiragana y de la corrección por romanización"""
+import pytest
+
+import hiragana
+
+
+@pytest.mark.parametrize("romaji, kana", [
+    ("sushi", "すし"), ("susi", "すし"), ("tsukue", "つくえ"), ("tukue", "つくえ"),
+    ("kitte", "きって"), ("matcha", "まっちゃ"), ("kyouto", "きょうと"), ("jya", "じゃ"),
+    ("shinbun", "しんぶん"), ("hon", "ほん"), ("hon'ya", "ほんや"), ("honn", "ほん"),
+    # Como en los IME, tras "nn" la segunda n aún puede empezar sílaba
+    ("onna", "おんな"), ("konnichiha", "こんにちは"), ("konnnichiha", "こんにちは"),
+    ("kannji", "かんじ"), ("nnnn", "んん"),
+    ("ye", "いぇ"), ("vaiorin", "ゔぁいおりん"), ("vi", "ゔぃ"), ("vu", "ゔ"), ("ve", "ゔぇ"), ("vo", "ゔぉ"),
+    ("xtu", "っ"), ("lya", "ゃ"), ("ra-men", "らーめん"),
+])
+def test_romaji_to_kana(romaji, kana):
+    assert hiragana.romaji_to_kana(romaji) == kana
+
+
+@pytest.mark.parametrize("word", ["konnichiha", "kannji", "onna", "konnnichiha", "kyouto", "matcha"])
+def test_incremental_conversion_matches_whole_word(word):
+    # El campo del quiz se convierte en cada pulsación sobre el texto ya convertido
+    text = ""
+    for letter in word:
+        text = hiragana.romaji_to_kana(text + letter, final=False)
+    assert hiragana.romaji_to_kana(text) == hiragana.romaji_to_kana(word)
+
+
+def test_pending_prefix_stays_in_romaji_while_typing():
+    assert hiragana.romaji_to_kana("ky", final=False) == "ky"
+    assert hiragana.romaji_to_kana("kon", final=False) == "こn"
+    assert hiragana.romaji_to_kana("konn", final=False) == "こnn"
+
+
+def question(engine, direction, prompt, answer):
+    engine.direction = direction
+    engine.current_quiz_question = prompt
+    engine.current_quiz_answer = answer
+
+
+@pytest.mark.parametrize("typed", ["ji", "じ", "ぢ", "di"])
+def test_rom_to_hira_accepts_every_kana_with_the_prompt_romaji(engine, typed):
+    question(engine, "rom_to_hira", "ji", "ぢ")
+    assert engine.grade(typed)["correct"]
+
+
+def test_rom_to_hira_rejects_other_kana(engine):
+    question(engine, "rom_to_hira", "ji", "ぢ")
+    result = engine.grade("zu")
+    assert not result["correct"]
+    assert result["user_answer"] == "ず"
+
+
+@pytest.mark.parametrize("typed, variant", [("shi", "hepburn"), ("si", "kunrei")])
+def test_hira_to_rom_accepts_other_romanizations(engine, typed, variant):
+    question(engine, "hira_to_rom", "し", "shi")
+    result = engine.grade(typed)
+    assert result["correct"] and result["variant"] == variant
+    assert engine.achievement_data['romanization_counts'][variant] == 1
@@ -0,0 +1,165 @@
+"""Pruebas de las versiones del archivo de datos: registro de migraciones, VersionedHistory y upgrade_progress"""
+import copy
+import json
+import pickle
+
+import pytest
+
+import hiragana
+
+V1_RECORDS = {
+    "あ": {"times_shown": 3, "correct": 2, "next_review": "2030-01-01T00:00:00"},
+    "い": {"times_shown": 1, "incorrect": -4},
+    "う": {"times_shown": 2, "correct": "2", "incorrect": 0, "srs_level": 3,
+           "next_review": "2030-01-01T00:00:00"},
+}
+MIGRATED = {
+    "あ": {"times_shown": 3, "correct": 2, "incorrect": 0, "srs_level": 0,
+           "next_review": "2030-01-01T00:00:00"},
+    "い": {"times_shown": 1, "correct": 0, "incorrect": 0},
+    "う": {"times_shown": 2, "correct": 0, "incorrect": 0, "srs_level": 3,
+           "next_review": "2030-01-01T00:00:00"},
+}
+
+
+def v1_history():
+    return hiragana.VersionedHistory(copy.deepcopy(V1_RECORDS), from_version=1)
+
+
+def raw(history, key):
+    """Registro tal como está guardado, sin pasar por la migración perezosa"""
+    return dict.__getitem__(history, key)
+
+
+# Registro de migraciones
+
+def test_version_one_migrations_are_registered():
+    assert hiragana.SCHEMA_VERSION == 2
+    assert hiragana.RECORD_MIGRATIONS[1] is hiragana._migrate_record_v1
+    assert hiragana.FILE_MIGRATIONS[1] is hiragana._migrate_file_v1
+
+
+def test_registered_migrations_are_chained_up_to_the_current_version(monkeypatch):
+    monkeypatch.setattr(hiragana, "SCHEMA_VERSION", 3)
+    monkeypatch.setattr(hiragana, "RECORD_MIGRATIONS", dict(hiragana.RECORD_MIGRATIONS))
+    monkeypatch.setattr(hiragana, "FILE_MIGRATIONS", dict(hiragana.FILE_MIGRATIONS))
+
+    @hiragana.record_migration(2)
+    def add_ease(record):
+        record["ease"] = 2.5
+
+    @hiragana.file_migration(2)
+    def add_goal(data):
+        data["daily_goal"] = 10
+
+    assert hiragana.RECORD_MIGRATIONS[2] is add_ease and hiragana.FILE_MIGRATIONS[2] is add_goal
+    record = hiragana.migrate_record({"times_shown": 1, "next_review": "2030-01-01"}, 1)
+    assert record == {"times_shown": 1, "correct": 0, "incorrect": 0, "srs_level": 0,
+                      "next_review": "2030-01-01", "ease": 2.5}
+
+    data = hiragana.upgrade_progress({"schema_version": 2, "study_history": {"あ": {"correct": 1}}}, lazy=False)
+    assert data["schema_version"] == 3 and data["daily_goal"] == 10
+    assert data["study_history"]["あ"] == {"correct": 1, "ease": 2.5}
+
+
+# upgrade_progress
+
+def test_upgrade_from_v1_migrates_fields_now_and_records_lazily():
+    data = hiragana.upgrade_progress({"difficult_characters": ["あ", "い", "あ"],
+                                      "study_history": copy.deepcopy(V1_RECORDS)})
+
+    assert data["schema_version"] == hiragana.SCHEMA_VERSION
+    assert data["difficult_characters"] == ["あ", "い"]
+    history = data["study_history"]
+    assert isinstance(history, hiragana.VersionedHistory) and history.pending == set(V1_RECORDS)
+    assert raw(history, "い") == V1_RECORDS["い"]
+
+
+def test_eager_upgrade_migrates_every_record():
+    data = hiragana.upgrade_progress({"study_history": copy.deepcopy(V1_RECORDS)}, lazy=False)
+
+    assert type(data["study_history"]) is dict
+    assert data["study_history"] == MIGRATED
+
+
+def test_current_version_is_left_as_is():
+    history = {"い": {"times_shown": 1}}
+    data = hiragana.upgrade_progress({"schema_version": hiragana.SCHEMA_VERSION, "study_history": history})
+
+    assert data["study_history"] is history and history["い"] == {"times_shown": 1}
+
+
+@pytest.mark.parametrize("version", [hiragana.SCHEMA_VERSION + 1, "2", None])
+def test_newer_or_invalid_versions_are_rejected(version):
+    with pytest.raises(hiragana.DataLoadError, match="no compatible"):
+        hiragana.upgrade_progress({"schema_version": version, "study_history": {}})
+
+
+def test_v1_file_is_rewritten_in_the_new_format_on_save(work_dir):
+    path = work_dir / "v1.json"
+    path.write_text(json.dumps({"difficult_characters": ["う", "う"], "study_history": V1_RECORDS},
+                               ensure_ascii=False), encoding="utf-8")
+    progress = hiragana.ProgressFile(str(path))
+
+    data = progress.load()
+    # Cargar no reescribe el archivo
+    assert "schema_version" not in json.loads(path.read_text(encoding="utf-8"))
+    data["study_history"]["い"]["times_shown"] += 1
+    progress.save(data)
+
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert saved["schema_version"] == hiragana.SCHEMA_VERSION
+    assert saved["difficult_characters"] == ["う"]
+    assert saved["study_history"] == {**MIGRATED, "い": {**MIGRATED["い"], "times_shown": 2}}
+
+
+# VersionedHistory
+
+@pytest.mark.parametrize("read", [
+    lambda history: history.get("あ"),
+    lambda history: history["あ"],
+    lambda history: history.setdefault("あ", {}),
+    lambda history: history.pop("あ"),
+])
+def test_reading_a_record_migrates_only_that_record(read):
+    history = v1_history()
+
+    assert read(history) == MIGRATED["あ"]
+    assert history.pending == {"い", "う"}
+    assert raw(history, "い") == V1_RECORDS["い"]
+
+
+def test_missing_keys_and_new_records():
+    history = v1_history()
+
+    assert history.get("ん") is None and history.get("ん", 0) == 0
+    assert history.setdefault("ん", {"times_shown": 1}) == {"times_shown": 1}
+    # Un registro asignado ya está en el formato nuevo y no se vuelve a migrar
+    history["い"] = {"times_shown": 5}
+    assert "い" not in history.pending and history["い"] == {"times_shown": 5}
+    assert history.pop("ぬ", None) is None
+
+
+@pytest.mark.parametrize("method", ["items", "values"])
+def test_iterating_records_migrates_them_all(method):
+    history = v1_history()
+
+    list(getattr(history, method)())
+
+    assert not history.pending and dict(history) == MIGRATED
+
+
+def test_copies_keep_the_records_to_migrate():
+    history = v1_history()
+    history.get("あ")
+
+    clone = copy.deepcopy(history)
+    assert isinstance(clone, hiragana.VersionedHistory)
+    assert clone.from_version == 1 and clone.pending == {"い", "う"}
+    assert raw(clone, "い") == V1_RECORDS["い"]
+    assert clone["い"] == MIGRATED["い"] and raw(history, "い") == V1_RECORDS["い"]
+
+    # copy() y pickle devuelven registros ya migrados
+    for other in (history.copy(), pickle.loads(pickle.dumps(history))):
+        assert isinstance(other, hiragana.VersionedHistory) and not other.pending
+        assert dict(other) == MIGRATED
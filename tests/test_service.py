@@ -0,0 +1,142 @@
+"""Pruebas del servicio HTTP/JSON (--serve) sin abrir sockets: dispatch, guardado y carga de perfiles"""
+import asyncio
+import json
+
+import pytest
+
+import hiragana
+
+
+@pytest.fixture
+def service(work_dir):
+    return hiragana.QuizService(str(work_dir / "profiles"))
+
+
+def post_settings(service, payload, name="ana"):
+    return service.dispatch("POST", f"/api/{name}/settings", json.dumps(payload).encode('utf-8'))
+
+
+def test_settings_are_applied(service):
+    status, payload = post_settings(service, {
+        "mode": "multiple", "direction": "rom_to_hira", "algorithm": "SRS Avanzado",
+        "srs_mode": True, "categories": ["Básicos"], "filters": ["due"]})
+
+    assert status == 200
+    engine = service.profiles["ana"].engine
+    assert (engine.mode, engine.direction, engine.algorithm, engine.srs_mode) == (
+        "multiple", "rom_to_hira", "SRS Avanzado", True)
+    assert engine.selected_categories == {"Básicos"} and engine.filters == {"due"}
+    assert payload["filters"] == ["due"]
+
+
+@pytest.mark.parametrize("payload", [
+    {"mode": "dictado"},
+    {"direction": "hira_to_kata"},
+    {"algorithm": "otro"},
+    {"srs_mode": "false"},
+    {"difficult_only": 1},
+    {"categories": "Básicos"},
+    {"categories": ["No existe"]},
+    {"filters": "due"},
+    {"filters": ["due", "otro"]},
+])
+def test_invalid_settings_are_rejected_without_applying_anything(service, payload):
+    # srs_mode es válido salvo que la petición lo sustituya: no debe aplicarse si algo falla
+    status, payload_out = post_settings(service, {"srs_mode": True, **payload})
+
+    assert status == 400 and "error" in payload_out
+    engine = service.profiles["ana"].engine
+    assert engine.mode == "write" and engine.srs_mode is False and engine.filters == set()
+
+
+def test_answer_marks_profile_dirty_and_flush_saves_it(service, work_dir):
+    service.dispatch("GET", "/api/ana/question", b"")
+    status, _ = service.dispatch("POST", "/api/ana/answer", b'{"answer": "x"}')
+    assert status == 200 and service.profiles["ana"].dirty
+
+    (work_dir / "profiles").mkdir()
+    asyncio.run(service.flush())
+
+    assert not service.profiles["ana"].dirty
+    with open(work_dir / "profiles" / "ana.json", encoding='utf-8') as f:
+        assert sum(r["times_shown"] for r in json.load(f)['study_history'].values()) == 1
+
+
+def test_failed_flush_keeps_profile_dirty(service, monkeypatch):
+    profile = service.get_profile("ana")
+    profile.dirty = True
+
+    def fail(*args, **kwargs):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(profile.progress_file, "save", fail)
+    asyncio.run(service.flush())
+
+    assert profile.dirty
+
+
+def test_profiles_load_once_off_the_event_loop(service):
+    async def load_twice():
+        return await asyncio.gather(service.load_profile("ana"), service.load_profile("ana"))
+
+    first, second = asyncio.run(load_twice())
+
+    assert first is second is service.profiles["ana"]
+    assert service._loading == {}
+
+
+@pytest.mark.parametrize("option", [-1, 4, "1", 1.0, True])
+def test_answer_rejects_options_outside_the_question(service, option):
+    post_settings(service, {"mode": "multiple"})
+    service.dispatch("GET", "/api/ana/question", b"")
+
+    status, _ = service.dispatch("POST", "/api/ana/answer", json.dumps({"option": option}).encode('utf-8'))
+
+    assert status == 400
+    engine = service.profiles["ana"].engine
+    assert engine.total_attempts == 0 and engine.current_quiz_question is not None
+
+
+class FakeWriter:
+    """Escritor de asyncio que guarda lo enviado"""
+
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def handle(service, request):
+    """Pasa una petición HTTP en bruto por _handle_connection y devuelve la respuesta"""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(request)
+        reader.feed_eof()
+        writer = FakeWriter()
+        await service._handle_connection(reader, writer)
+        return writer
+    writer = asyncio.run(run())
+    assert writer.closed
+    return writer.data.decode('utf-8')
+
+
+@pytest.mark.parametrize("length", ["-5", "abc", "1e3"])
+def test_invalid_content_length_gets_a_400(service, length):
+    response = handle(service, f"POST /api/ana/answer HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode())
+
+    assert response.startswith("HTTP/1.1 400 ")
+    assert "Content-Length" in response.split("\r\n\r\n", 1)[1]
+
+
+def test_valid_request_through_the_connection_handler(service):
+    response = handle(service, b"GET /api/ana/question HTTP/1.1\r\nConnection: close\r\n\r\n")
+
+    assert response.startswith("HTTP/1.1 200 ")
+    assert "question" in json.loads(response.split("\r\n\r\n", 1)[1])
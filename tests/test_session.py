@@ -0,0 +1,37 @@
+"""Pruebas de la sesión inteligente: ritmo medido y planificación dentro del tiempo pedido"""
+import pytest
+
+import hiragana
+
+
+def test_seconds_per_item_come_from_the_current_session():
+    # 100 tarjetas en 10 minutos: 6 s por tarjeta
+    assert hiragana.estimate_seconds_per_item(None, 600, 100) == pytest.approx(6.0)
+
+
+def test_seconds_per_item_fall_back_to_review_log_latency():
+    review_stats = {
+        "あ": {"reviews": 3, "correct": 2, "incorrect": 1, "mean_latency_ms": 4000.0, "last_ts": 0},
+        "い": {"reviews": 2, "correct": 1, "incorrect": 0, "mean_latency_ms": 8000.0, "last_ts": 0},
+        "う": {"reviews": 4, "correct": 0, "incorrect": 0, "mean_latency_ms": 0.0, "last_ts": 0},
+    }
+
+    # Pocas tarjetas en la sesión: (3 × 4 s + 1 × 8 s) / 4 respuestas
+    assert hiragana.estimate_seconds_per_item(review_stats, 20, 2) == pytest.approx(5.0)
+    assert hiragana.estimate_seconds_per_item({}, 0, 0) == hiragana.DEFAULT_SECONDS_PER_ITEM
+
+
+@pytest.mark.parametrize("minutes", [5, 10, 15])
+def test_planned_session_fits_the_requested_minutes(engine, play, minutes):
+    play(engine, 40)
+    play(engine, 10, correct=False)
+    seconds_per_item = hiragana.estimate_seconds_per_item(None, 600, 100)
+
+    plan = hiragana.plan_smart_session(engine.deck, engine.study_history, minutes,
+                                       seconds_per_item=seconds_per_item)
+
+    assert plan["seconds"] <= minutes * 60
+    assert len(plan["items"]) * seconds_per_item <= minutes * 60
+    # Con 6 s por tarjeta caben muchas más de una por minuto (cada una cuesta como mucho 12 s)
+    assert len(plan["items"]) >= minutes * 60 / (2 * seconds_per_item) - 1
+    assert len(set(plan["items"])) == len(plan["items"])
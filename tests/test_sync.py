@@ -0,0 +1,156 @@
+"""Pruebas de la sincronización por carpeta compartida y del diario de su estado"""
+import json
+import os
+
+import hiragana
+
+
+def counters(history):
+    """Suma de cada contador del historial"""
+    return {key: sum(record.get(key, 0) for record in history.values())
+            for key in hiragana.STUDY_COUNTER_FIELDS}
+
+
+def test_sync_between_two_devices_converges_and_is_idempotent(work_dir, play):
+    sync_dir = work_dir / "sync"
+    sync_dir.mkdir()
+    devices = []
+    for name in ("a", "b"):
+        engine = hiragana.QuizEngine(hiragana.DEFAULT_HIRAGANA_CATEGORIES)
+        devices.append((engine, hiragana.SyncState(str(work_dir / f"sync_{name}.json"))))
+
+    def sync(device):
+        engine, state = device
+        return hiragana.sync_with_directory(str(sync_dir), engine.study_history, engine.difficult_characters,
+                                            engine.achievement_data, state)
+
+    play(devices[0][0], 6)
+    play(devices[1][0], 3, correct=False)
+    sync(devices[0])
+    sync(devices[1])
+    sync(devices[0])
+
+    expected = {"times_shown": 9, "correct": 6, "incorrect": 3}
+    for engine, _ in devices:
+        assert counters(engine.study_history) == expected
+    assert devices[0][0].difficult_characters == devices[1][0].difficult_characters
+
+    # Repetir la sincronización sin cambios no vuelve a sumar nada
+    summary = sync(devices[1])
+    assert summary["exported"] == 0 and summary["imported_chars"] == 0
+    assert counters(devices[1][0].study_history) == expected
+
+
+def test_sync_uses_the_engine_change_set(work_dir, play):
+    sync_dir = work_dir / "sync"
+    sync_dir.mkdir()
+    engine = hiragana.QuizEngine(hiragana.DEFAULT_HIRAGANA_CATEGORIES)
+    state = hiragana.SyncState(str(work_dir / "sync_state.json"))
+
+    def sync():
+        summary = hiragana.sync_with_directory(str(sync_dir), engine.study_history, engine.difficult_characters,
+                                               engine.achievement_data, state, engine.sync_changes)
+        engine.sync_changes = set()
+        return summary
+
+    play(engine, 20)
+    assert engine.sync_changes is None  # Primera sincronización: se revisa todo
+    first = sync()
+    assert first["exported"] == len(engine.study_history)
+    results = play(engine, 3, correct=False)
+    assert engine.sync_changes == {result["question"] for result in results}
+
+    # Un cambio que no ha pasado por el motor no se revisa hasta la próxima vez que se recorra todo
+    untracked = next(char for char in engine.study_history if char not in engine.sync_changes)
+    engine.study_history[untracked]["times_shown"] += 1
+    second = sync()
+
+    assert second["exported"] == len({result["question"] for result in results})
+
+
+def test_save_reports_history_changed_by_other_writers(work_dir):
+    path = str(work_dir / "progress.json")
+    mine, other = hiragana.ProgressFile(path), hiragana.ProgressFile(path)
+    record = {"times_shown": 1, "correct": 1, "incorrect": 0}
+    mine.save({'study_history': {"あ": dict(record)}})
+    mine.save({'study_history': {"あ": dict(record)}})
+    assert not mine.external_changes
+
+    other.load()
+    other.save({'study_history': {"あ": dict(record), "い": dict(record)}})
+    mine.save({'study_history': {"あ": dict(record)}})
+    assert mine.external_changes
+
+
+def sync_engine(sync_dir, engine, state):
+    summary = hiragana.sync_with_directory(str(sync_dir), engine.study_history, engine.difficult_characters,
+                                           engine.achievement_data, state, engine.sync_changes)
+    engine.sync_changes = set()
+    state.save()
+    return summary
+
+
+def test_state_saves_append_only_the_changed_characters(work_dir, play):
+    sync_dir = work_dir / "sync"
+    sync_dir.mkdir()
+    engine = hiragana.QuizEngine(hiragana.DEFAULT_HIRAGANA_CATEGORIES)
+    state = hiragana.SyncState(str(work_dir / "sync_state.json"))
+    play(engine, 60)
+    sync_engine(sync_dir, engine, state)
+    state.compact()
+    snapshot = os.path.getsize(state.file_path)
+
+    results = play(engine, 2, correct=False)
+    sync_engine(sync_dir, engine, state)
+
+    assert os.path.getsize(state.file_path) == snapshot
+    with open(state.journal_path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 1
+    assert set(entries[0]["chars"]) == {result["question"] for result in results}
+    reloaded = hiragana.SyncState(state.file_path)
+    assert reloaded.load() == state.data
+    assert reloaded.flagged == engine.difficult_characters
+
+
+def test_journal_is_compacted_once_it_outgrows_the_state(work_dir, play, monkeypatch):
+    monkeypatch.setattr(hiragana, "SYNC_JOURNAL_MIN_BYTES", 0)
+    sync_dir = work_dir / "sync"
+    sync_dir.mkdir()
+    engine = hiragana.QuizEngine(hiragana.DEFAULT_HIRAGANA_CATEGORIES)
+    state = hiragana.SyncState(str(work_dir / "sync_state.json"))
+
+    for _ in range(10):
+        play(engine, 5)
+        sync_engine(sync_dir, engine, state)
+
+    # Sin diario previo el estado solo existe si se ha compactado
+    assert os.path.exists(state.file_path)
+    assert hiragana.SyncState(state.file_path).load() == state.data
+
+
+def test_torn_journal_line_is_ignored(work_dir, play):
+    sync_dir = work_dir / "sync"
+    sync_dir.mkdir()
+    engine = hiragana.QuizEngine(hiragana.DEFAULT_HIRAGANA_CATEGORIES)
+    state = hiragana.SyncState(str(work_dir / "sync_state.json"))
+    play(engine, 5)
+    sync_engine(sync_dir, engine, state)
+    with open(state.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"meta": {"seq": 99}, "cha')
+
+    assert hiragana.SyncState(state.file_path).load() == state.data
+
+
+def test_run_sync_rewrites_the_data_file_only_when_something_arrives(work_dir):
+    sync_dir = work_dir / "sync"
+    sync_dir.mkdir()
+    data_file = work_dir / "datos.json"
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump({"study_history": {"あ": {"times_shown": 2, "correct": 1, "incorrect": 1}}}, f)
+    before = os.stat(data_file).st_mtime_ns
+
+    summary = hiragana.run_sync(str(sync_dir), str(data_file), str(work_dir / "estado.json"))
+
+    assert summary["exported"] == 1 and summary["imported_files"] == 0
+    assert os.stat(data_file).st_mtime_ns == before
@@ -0,0 +1,111 @@
+"""Pruebas de la interfaz de terminal (--tui): PlainScreen con entrada guionizada y un pseudo-terminal"""
+import io
+import json
+import os
+import select
+import sys
+import time
+
+import pytest
+
+import hiragana
+
+
+def run_trainer(work_dir, keys, data_file="perfil.json"):
+    """Ejecuta el entrenador con `keys` como entrada y devuelve la salida y el archivo de datos"""
+    stdout = io.StringIO()
+    data_file = str(work_dir / data_file)
+    with hiragana.PlainScreen(io.StringIO(keys), stdout) as screen:
+        hiragana.TerminalTrainer(screen, data_file).run()
+    return stdout.getvalue(), data_file
+
+
+def saved_counters(data_file):
+    with open(data_file, encoding='utf-8') as f:
+        history = json.load(f)['study_history']
+    return {key: sum(record.get(key, 0) for record in history.values())
+            for key in hiragana.STUDY_COUNTER_FIELDS}
+
+
+def test_review_log_path_follows_the_data_file(work_dir):
+    assert hiragana.review_log_path_for(hiragana.DATA_FILE) == hiragana.REVIEW_LOG_FILE
+    assert hiragana.review_log_path_for(str(work_dir / "ana.json")) == str(work_dir / "ana_reviews.bin")
+
+
+def test_write_quiz_grades_answers_and_saves_on_exit(work_dir):
+    # q: quiz; dos respuestas incorrectas; x: volver; e: estadísticas; x: salir
+    output, data_file = run_trainer(work_dir, "q???\n ???\nxe x")
+
+    assert output.count("Incorrecto. La respuesta era:") == 2
+    assert "Repeticiones: 2 · Correctas: 0 · Incorrectas: 2" in output
+    assert saved_counters(data_file) == {"times_shown": 2, "correct": 0, "incorrect": 2}
+
+
+def test_review_log_is_kept_next_to_the_data_file(work_dir):
+    _, data_file = run_trainer(work_dir, "q???\nxx")
+
+    log_path = hiragana.review_log_path_for(data_file)
+    assert os.path.exists(log_path)
+    assert not os.path.exists(work_dir / hiragana.REVIEW_LOG_FILE)
+    assert len(hiragana.load_review_events(log_path)[0]) == 1
+
+
+def test_multiple_choice_and_flash_cards(work_dir):
+    # m: opción múltiple; q1: primera opción; f: una tarjeta vista
+    output, data_file = run_trainer(work_dir, "mq1xf xx")
+
+    assert "Quiz: opción múltiple" in output
+    assert "  [4] " in output and "  [x] Volver" in output
+    assert saved_counters(data_file)["times_shown"] == 2
+
+
+def test_end_of_input_leaves_the_menu_and_saves(work_dir):
+    output, data_file = run_trainer(work_dir, "q???\n")
+
+    assert "Incorrecto." in output
+    assert saved_counters(data_file)["incorrect"] == 1
+
+
+@pytest.mark.skipif(hiragana.termios is None, reason="sin pseudo-terminales en esta plataforma")
+def test_plain_tui_on_a_pseudo_terminal(work_dir):
+    import pty
+
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hiragana.py")
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.execv(sys.executable, [sys.executable, script, "--tui", "--plain", "--data-file", "pty.json"])
+
+    output = b""
+
+    def expect(text, timeout=20):
+        """Lee del terminal hasta que aparece `text` (en la salida posterior a lo ya visto)"""
+        nonlocal output
+        start = len(output)
+        deadline = time.time() + timeout
+        while text.encode('utf-8') not in output[start:]:
+            ready, _, _ = select.select([fd], [], [], max(0, deadline - time.time()))
+            if not ready:
+                raise AssertionError(f"no apareció {text!r}: {output[-300:]!r}")
+            output += os.read(fd, 65536)
+
+    try:
+        # Cada tecla llega sin Intro (cbreak) y la respuesta se lee en modo canónico
+        expect("[x] Salir")
+        os.write(fd, b"q")
+        expect("Respuesta (vacía para volver): ")
+        os.write(fd, b"???\n")
+        expect("[espacio] Siguiente")
+        os.write(fd, b"x")
+        expect("[x] Salir")
+        os.write(fd, b"x")
+        _, status = os.waitpid(pid, 0)
+    except BaseException:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+        raise
+    finally:
+        os.close(fd)
+
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert saved_counters(str(work_dir / "pty.json"))["incorrect"] == 1
+    assert os.path.exists(work_dir / "pty_reviews.bin")